@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,6 +9,79 @@ class Settings(BaseSettings):
     DEFAULT_PAGE_SIZE: int = 10
     MAX_PAGE_SIZE: int = 50
 
+    # Upper bound on queries accepted by one POST /data/batch call.
+    MAX_BATCH_QUERIES: int = 10
+
+    # Upper bound on `points` for analytics downsampling.
+    MAX_AGGREGATE_POINTS: int = 1000
+
+    # Upper bound on parsed datasets kept in memory (estimated bytes).
+    DATASET_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Data files at least this large are scanned incrementally (bounded
+    # memory, no indexes) instead of being loaded and cached (0 disables).
+    STREAMING_MIN_FILE_BYTES: int = 512 * 1024 * 1024
+
+    # Data files with at least this many rows are held in a compact column
+    # store (dictionary-encoded enums, timestamps as epoch ints) instead of
+    # one dict per row (0 disables).
+    COMPACT_RECORDS_MIN_ROWS: int = 100_000
+
+    # Connector engine: "json" serves data/*.json through in-memory indexes;
+    # "sqlite" serves the same schemas from the SQLITE_PATH database (build it
+    # with `python -m app.connectors.sqlite_connector`) through a pool of
+    # SQLITE_POOL_SIZE read-only connections.
+    CONNECTOR_BACKEND: Literal["json", "sqlite"] = "json"
+    SQLITE_PATH: str = "data/udc.sqlite3"
+    SQLITE_POOL_SIZE: int = 4
+
+    # Serve data files from fresh compiled snapshots (`*.snap`, built with
+    # `python -m app.connectors.snapshot`) instead of parsing the JSON.
+    SNAPSHOTS_ENABLED: bool = True
+
+    # Multi-worker mode: a connector that finds its snapshot missing or stale
+    # compiles it (one process at a time) and every worker maps that file, so
+    # the data is held once in the page cache rather than once per process.
+    # Data changes are published as a new snapshot swapped in by rename.
+    SHARED_DATASETS: bool = False
+
+    # How often the background watcher checks data files for changes, in
+    # seconds (inotify is used instead when available; 0 disables watching).
+    DATA_WATCH_INTERVAL_SECONDS: float = 1.0
+
+    # Per-stage latency histograms and row/cache counters served on /metrics.
+    # When off, the instrumentation calls are no-ops.
+    METRICS_ENABLED: bool = True
+
+    # On-demand request profiling (cProfile). When enabled, a request is
+    # profiled if its `x-profile` header equals PROFILING_TOKEN, or as 1 in
+    # PROFILING_SAMPLE_RATE requests (0 = no sampling). Profiles are written to
+    # PROFILING_DIR/<x-request-id>.prof and summarized in the log.
+    PROFILING_ENABLED: bool = False
+    PROFILING_TOKEN: str | None = None
+    PROFILING_SAMPLE_RATE: int = 0
+    PROFILING_DIR: str = "profiles"
+
+    # Logging. LOG_FORMAT is "text" (`key=value` fields) or "json" (one object
+    # per line). With LOG_QUEUE_ENABLED, callers only enqueue records and a
+    # background thread formats and writes them. The access log keeps 1 in
+    # ACCESS_LOG_SAMPLE_RATE requests (0 = none); 5xx responses are always logged.
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_QUEUE_ENABLED: bool = True
+    ACCESS_LOG_SAMPLE_RATE: int = 1
+
+    # Serialized /data responses kept for repeat queries (0 disables).
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+
+    # Identical /data queries arriving while one is being computed (same
+    # source, parameters and dataset version) wait for that result instead of
+    # running the pipeline again.
+    REQUEST_COALESCING_ENABLED: bool = True
+
+    # Worker threads for blocking connector calls made from async routes.
+    CONNECTOR_MAX_THREADS: int = 8
+
     OPENAI_API_KEY: str | None = None
     OPENAI_BASE_URL: str | None = None
     OPENAI_MODEL: str | None = None
@@ -1,55 +1,184 @@
-import json
 from pathlib import Path
-from datetime import date, datetime, timezone
-from typing import List, Dict, Any
+from datetime import date
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-from .base import BaseConnector
+from .columnar import AnalyticsColumns, MetricSeries
+from .dataset import Dataset
+from .file_connector import FileConnector
+from .snapshot import Snapshot, open_snapshot
+from .stream import iter_json_array, match_rows, use_streaming
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_PATH = BASE_DIR / "data" / "analytics.json"
 
+SOURCE = "analytics"
+PRIMARY_KEY = ("metric", "date")
+INDEX_FIELDS = ("metric",)
+SORT_FIELDS = ("metric", "date", "value")
 
-class AnalyticsConnector(BaseConnector):
 
-    def fetch(
-        self,
-        metric: str | None = None,
-        start_date: date | str | None = None,
-        end_date: date | str | None = None,
-        **kwargs,
-    ) -> List[Dict[str, Any]]:
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        if metric:
-            data = [d for d in data if d.get("metric") == metric]
-
-        # Optional ISO date-range filtering (YYYY-MM-DD)
-        if start_date or end_date:
-            if isinstance(start_date, str):
-                start_date = date.fromisoformat(start_date)
-            if isinstance(end_date, str):
-                end_date = date.fromisoformat(end_date)
-
-            def within_range(d: Dict[str, Any]) -> bool:
-                try:
-                    d_date = date.fromisoformat(str(d.get("date")))
-                except Exception:
-                    return False
-                if start_date and d_date < start_date:
-                    return False
-                if end_date and d_date > end_date:
-                    return False
-                return True
-
-            data = [d for d in data if within_range(d)]
-
-        return data
-
-    def last_updated(self) -> datetime | None:
+def build_dataset(records: List[Dict[str, Any]]) -> Dataset:
+    """
+    Store analytics in per-metric columns when the rows fit the schema, so date
+    ranges become binary searches; otherwise keep the plain row dataset.
+    """
+    columns = AnalyticsColumns.from_records(records)
+    if columns is None:
+        return Dataset(
+            records,
+            index_fields=INDEX_FIELDS,
+            sort_fields=SORT_FIELDS,
+            primary_key=PRIMARY_KEY,
+        )
+    return Dataset(
+        columns,
+        index_fields=INDEX_FIELDS,
+        sort_fields=SORT_FIELDS,
+        primary_key=PRIMARY_KEY,
+        tiebreak=columns.tiebreak,
+    )
+
+
+def columns_from_snapshot(snapshot: Snapshot) -> Optional[AnalyticsColumns]:
+    """Typed analytics columns decoded from a snapshot, or None if off-schema."""
+    if sorted(snapshot.header["fields"]) != sorted(AnalyticsColumns.FIELDS):
+        return None
+    metric_codes, metric_names = snapshot.column("metric")
+    date_codes, dates = snapshot.column("date")
+    values, value_dictionary = snapshot.column("value")
+    if metric_names is None or dates is None or value_dictionary is not None:
+        return None
+    if -1 in metric_codes or -1 in date_codes:
+        return None
+
+    names = list(metric_names)
+    day_ordinals = []
+    for raw_date in dates:
         try:
-            ts = DATA_PATH.stat().st_mtime
-        except OSError:
+            day = date.fromisoformat(raw_date)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(raw_date, str) or day.isoformat() != raw_date:
+            return None
+        day_ordinals.append(day.toordinal())
+    if not all(isinstance(name, str) for name in names):
+        return None
+
+    return AnalyticsColumns.from_columns(
+        names,
+        metric_codes,
+        [day_ordinals[code] for code in date_codes],
+        values,
+    )
+
+
+def load_snapshot(path: Path) -> Optional[Dataset]:
+    """`DatasetCache` loader: the analytics dataset from a fresh snapshot, or None."""
+    snapshot = open_snapshot(path, PRIMARY_KEY, INDEX_FIELDS, SORT_FIELDS)
+    if snapshot is None:
+        return None
+    columns = columns_from_snapshot(snapshot)
+    if columns is None:
+        return snapshot.dataset(INDEX_FIELDS, SORT_FIELDS)
+    return snapshot.dataset(INDEX_FIELDS, SORT_FIELDS, records=columns, tiebreak=columns.tiebreak)
+
+
+def _parse_range(
+    start_date: date | str | None,
+    end_date: date | str | None,
+) -> Tuple[Optional[date], Optional[date]]:
+    # Optional ISO date-range filtering (YYYY-MM-DD); empty means unbounded.
+    if isinstance(start_date, str):
+        start_date = date.fromisoformat(start_date) if start_date else None
+    if isinstance(end_date, str):
+        end_date = date.fromisoformat(end_date) if end_date else None
+    return start_date or None, end_date or None
+
+
+def within_range(d: Dict[str, Any], start_date: Optional[date], end_date: Optional[date]) -> bool:
+    try:
+        d_date = date.fromisoformat(str(d.get("date")))
+    except Exception:
+        return False
+    if start_date and d_date < start_date:
+        return False
+    if end_date and d_date > end_date:
+        return False
+    return True
+
+
+class AnalyticsConnector(FileConnector):
+
+    source = SOURCE
+    data_path = DATA_PATH
+    primary_key = PRIMARY_KEY
+    index_fields = INDEX_FIELDS
+    sort_fields = SORT_FIELDS
+    build_dataset = staticmethod(build_dataset)
+    load_snapshot = staticmethod(load_snapshot)
+
+    def _match(
+        self,
+        dataset: Dataset,
+        metric: str | None,
+        start_date: date | str | None,
+        end_date: date | str | None,
+    ) -> Optional[List[int]]:
+        start_date, end_date = _parse_range(start_date, end_date)
+        has_range = bool(start_date or end_date)
+
+        if has_range and isinstance(dataset.records, AnalyticsColumns):
+            # Binary search over each metric's date-sorted ordinals.
+            return dataset.records.range_row_ids(metric or None, start_date, end_date)
+
+        row_ids = dataset.match(metric=metric or None)
+
+        if has_range:
+            records = dataset.records
+            if row_ids is None:
+                row_ids = range(len(records))
+            row_ids = [i for i in row_ids if within_range(records[i], start_date, end_date)]
+
+        return row_ids
+
+    def _stream(self, filters: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        start_date, end_date = _parse_range(filters.get("start_date"), filters.get("end_date"))
+        rows = match_rows(iter_json_array(self.data_path), metric=filters.get("metric") or None)
+        if not (start_date or end_date):
+            return rows
+        return (row for row in rows if within_range(row, start_date, end_date))
+
+    def _select(self, dataset: Dataset, filters: Dict[str, Any]) -> Optional[List[int]]:
+        return self._match(
+            dataset,
+            filters.get("metric"),
+            filters.get("start_date"),
+            filters.get("end_date"),
+        )
+
+    def series(self, metric: str) -> Optional[MetricSeries]:
+        """Date-ordered columns for one metric (built from rows if not columnar)."""
+        if use_streaming(self.data_path):
+            points = [
+                (date.fromisoformat(str(r["date"])).toordinal(), r["value"], row_id)
+                for row_id, r in enumerate(iter_json_array(self.data_path))
+                if r.get("metric") == metric
+            ]
+            if not points:
+                return None
+            return MetricSeries.from_points(*(list(column) for column in zip(*points)))
+
+        dataset = self._dataset()
+        if isinstance(dataset.records, AnalyticsColumns):
+            return dataset.records.series.get(metric)
+
+        row_ids = dataset.match(metric=metric) or []
+        if not row_ids:
             return None
-        return datetime.fromtimestamp(ts, tz=timezone.utc)
+        rows = dataset.rows(row_ids)
+        return MetricSeries.from_points(
+            [date.fromisoformat(str(r["date"])).toordinal() for r in rows],
+            [r["value"] for r in rows],
+            row_ids,
+        )
@@ -1,19 +1,96 @@
 
+import asyncio
+import contextvars
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from app.config import settings
+from app.utils.profiling import profiled
+
+from .query import QueryPlan, QueryResult, execute_in_python
+
+
+T = TypeVar("T")
+
+# Bounded pool for blocking connector work (file I/O, parsing, index scans),
+# kept separate from the event loop and from Starlette's default threadpool.
+_connector_pool = ThreadPoolExecutor(
+    max_workers=settings.CONNECTOR_MAX_THREADS,
+    thread_name_prefix="connector",
+)
+
+
+async def run_in_connector_pool(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking callable on the connector pool, keeping context vars."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_connector_pool, partial(ctx.run, profiled(func), *args, **kwargs))
 
 
 class BaseConnector(ABC):
 
+    # Fields that identify a record; used as the sort tie-breaker so keyset
+    # cursors stay stable. Empty means ties keep source order.
+    primary_key: Tuple[str, ...] = ()
+
+    # Local file backing the connector, if any; watched for changes.
+    data_path: Optional[Path] = None
+
     @abstractmethod
     def fetch(self, **filters) -> List[Dict[str, Any]]:
         pass
 
+    def execute(self, plan: QueryPlan) -> QueryResult:
+        """
+        Run a full query plan and return only the requested page plus the
+        total match count. Connectors that can filter/sort/paginate natively
+        (indexes, SQL, remote APIs) override this; the default runs `fetch`
+        and does the rest in Python, sorting only as far as the page window.
+        """
+        return execute_in_python(self.fetch(**plan.filters), plan, self.primary_key)
+
+    def iter_rows(self, plan: QueryPlan) -> Iterator[Dict[str, Any]]:
+        """
+        Rows of `plan` one at a time, for bulk export. Filtering happens when
+        this is called; rows are produced lazily as the caller iterates.
+        Connectors override this to avoid building the full result; the
+        default materializes it through `execute`.
+        """
+        return iter(self.execute(plan).rows)
+
+    # Async contract used by the routes. Sync connectors get these for free via
+    # the connector pool; natively async connectors override them directly.
+
+    async def afetch(self, **filters) -> List[Dict[str, Any]]:
+        return await run_in_connector_pool(self.fetch, **filters)
+
+    async def aexecute(self, plan: QueryPlan) -> QueryResult:
+        return await run_in_connector_pool(self.execute, plan)
+
+    async def aiter_rows(self, plan: QueryPlan) -> Iterator[Dict[str, Any]]:
+        return await run_in_connector_pool(self.iter_rows, plan)
+
+    def refresh(self) -> bool:
+        """
+        Bring cached data up to date with the source and keep it pinned there
+        (called by the data watcher). Returns whether a new version was loaded.
+        """
+        return False
+
+    def data_version(self) -> Optional[str]:
+        """
+        Opaque token that changes whenever the underlying data changes. Used to
+        key response caches and ETags; None disables caching for the source.
+        """
+        return None
+
     def last_updated(self) -> Optional[datetime]:
         """
         Best-effort timestamp indicating when the underlying datasource last changed.
         Used for freshness/staleness indicators in voice contexts.
         """
         return None
-
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.utils.logging import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# (st_mtime_ns, st_size, st_ino) — the same stat call `last_updated()` relies on.
+FileSignature = Tuple[int, int, int]
+
+
+def file_signature(path: Path) -> FileSignature:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def load_json_records(path: Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Rough in-memory footprint of a cached value, in bytes.
+    Objects that know their own size expose `nbytes`; lists of flat dicts are
+    walked one level deep (keys are shared across rows, so only values count).
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return int(nbytes)
+
+    total = sys.getsizeof(value)
+    if isinstance(value, list):
+        for item in value:
+            total += sys.getsizeof(item)
+            if isinstance(item, dict):
+                total += sum(sys.getsizeof(v) for v in item.values())
+    return total
+
+
+class _Entry:
+    __slots__ = ("signature", "value", "nbytes")
+
+    def __init__(self, signature: FileSignature, value: Any, nbytes: int):
+        self.signature = signature
+        self.value = value
+        self.nbytes = nbytes
+
+
+class DatasetCache:
+    """
+    Process-wide cache of parsed data files.
+
+    An entry is served for as long as the file's stat signature is unchanged;
+    any change to mtime, size or inode triggers a reload. Entries are evicted
+    least-recently-used first once the total estimated size exceeds `max_bytes`.
+    Cached values are shared between callers and must be treated as read-only.
+
+    Paths kept current by a watcher (`refresh`) are pinned instead: `get`
+    serves them without a stat call or lock, and a new version replaces the
+    old one in a single assignment once it is ready. Those lookups are
+    counted in `pinned_hits` (unlocked, so approximate under heavy thread
+    contention). Pinned entries count towards `max_bytes` too; when unpinned
+    entries alone cannot make room, the oldest pinned paths are released
+    back to on-demand (LRU) caching and the watcher stops refreshing them.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Path, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Path, threading.Lock] = {}
+        self._pinned: Dict[Path, _Entry] = {}
+        self._released: Set[Path] = set()
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.pinned_hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        path: Path,
+        build: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+        load: Optional[Callable[[Path], Any]] = None,
+    ) -> Any:
+        """
+        Return the cached value for `path`, (re)loading it if the file changed.
+        `build` turns freshly parsed records into the stored value (e.g. an
+        indexed dataset), so derived structures are rebuilt with the data.
+        `load`, when given, is tried first and may produce the stored value
+        without parsing the file (e.g. from a snapshot); it returns None to
+        fall back to parsing + `build`.
+        """
+        pinned = self._pinned.get(path)
+        if pinned is not None:
+            self.pinned_hits += 1
+            return pinned.value
+
+        signature = file_signature(path)
+
+        entry = self._lookup(path, signature)
+        if entry is not None:
+            return entry.value
+
+        with self._load_lock(path):
+            entry = self._lookup(path, signature, count=False)
+            if entry is not None:
+                return entry.value
+
+            value = self._load(path, build, load)
+            self._store(path, _Entry(signature, value, estimate_size(value)))
+            return value
+
+    def refresh(
+        self,
+        path: Path,
+        build: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+        load: Optional[Callable[[Path], Any]] = None,
+        update: Optional[Callable[[Any, List[Dict[str, Any]]], Any]] = None,
+    ) -> bool:
+        """
+        Pin `path` and bring it up to date with the file; returns whether a new
+        version was installed. `update(current, records)` may derive the new
+        value from the current one (incremental maintenance) or return None to
+        fall back to `load` / `build`. Readers keep getting the current value
+        until the new one is swapped in. Paths released to stay within the
+        budget are left to `get` and return False.
+        """
+        with self._load_lock(path):
+            signature = file_signature(path)
+            with self._lock:
+                if path in self._released:
+                    return False
+                current = self._pinned.get(path)
+                if current is None:
+                    current = self._entries.pop(path, None)
+                    if current is not None:
+                        self._pinned[path] = current
+            if current is not None and current.signature == signature:
+                return False
+
+            value = None
+            if current is not None and update is not None:
+                value = update(current.value, load_json_records(path))
+            if value is None:
+                value = self._load(path, build, load)
+            entry = _Entry(signature, value, estimate_size(value))
+            with self._lock:
+                self._discard(path)
+                self._pinned[path] = entry
+                self._total_bytes += entry.nbytes
+                if current is None:
+                    self.misses += 1
+                else:
+                    self.reloads += 1
+                released = self._enforce_budget(keep=path)
+            self._warn(path, entry, released)
+            return True
+
+    def unpin(self, path: Path) -> None:
+        with self._lock:
+            entry = self._pinned.pop(path, None)
+            if entry is not None:
+                self._total_bytes -= entry.nbytes
+            self._released.discard(path)
+
+    def signature(self, path: Path) -> FileSignature:
+        """The signature of the version being served for `path` (pinned or on disk)."""
+        pinned = self._pinned.get(path)
+        return pinned.signature if pinned is not None else file_signature(path)
+
+    def _load_lock(self, path: Path) -> threading.Lock:
+        # One loader per path; concurrent callers wait and then re-check.
+        with self._lock:
+            return self._load_locks.setdefault(path, threading.Lock())
+
+    @staticmethod
+    def _load(
+        path: Path,
+        build: Optional[Callable[[List[Dict[str, Any]]], Any]],
+        load: Optional[Callable[[Path], Any]],
+    ) -> Any:
+        value = load(path) if load is not None else None
+        if value is None:
+            value = load_json_records(path)
+            if build is not None:
+                value = build(value)
+        return value
+
+    def _lookup(self, path: Path, signature: FileSignature, count: bool = True) -> _Entry | None:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(path)
+                if count:
+                    self.hits += 1
+                return entry
+
+            if count:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.reloads += 1
+            return None
+
+    def _store(self, path: Path, entry: _Entry) -> None:
+        with self._lock:
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self._total_bytes -= previous.nbytes
+
+            self._entries[path] = entry
+            self._total_bytes += entry.nbytes
+            released = self._enforce_budget(keep=path)
+        self._warn(path, entry, released)
+
+    def _discard(self, path: Path) -> None:
+        # Caller holds self._lock.
+        for entries in (self._pinned, self._entries):
+            entry = entries.pop(path, None)
+            if entry is not None:
+                self._total_bytes -= entry.nbytes
+
+    def _enforce_budget(self, keep: Path) -> List[Path]:
+        """
+        Evict until the total fits `max_bytes`: least recently used unpinned
+        entries first, then the oldest pinned ones (released to `get`). Never
+        `keep`, so a dataset larger than the whole budget stays cached on its
+        own rather than being rebuilt on every request. Caller holds the lock;
+        returns the released paths.
+        """
+        for path in [p for p in self._entries if p != keep]:
+            if self._total_bytes <= self.max_bytes:
+                return []
+            self._total_bytes -= self._entries.pop(path).nbytes
+            self.evictions += 1
+
+        released = []
+        for path in [p for p in self._pinned if p != keep]:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._total_bytes -= self._pinned.pop(path).nbytes
+            self._released.add(path)
+            self.evictions += 1
+            released.append(path)
+        return released
+
+    def _warn(self, path: Path, entry: _Entry, released: List[Path]) -> None:
+        if released:
+            logger.warning(
+                "Pinned datasets exceed DATASET_CACHE_MAX_BYTES; releasing them to on-demand caching",
+                extra={"paths": [str(p) for p in released], "max_bytes": self.max_bytes},
+            )
+        if entry.nbytes > self.max_bytes:
+            logger.warning(
+                "Dataset exceeds DATASET_CACHE_MAX_BYTES; keeping it as the only cached dataset",
+                extra={"path": path, "bytes": entry.nbytes, "max_bytes": self.max_bytes},
+            )
+
+    def invalidate(self, path: Path | None = None) -> None:
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._pinned.clear()
+                self._released.clear()
+                self._total_bytes = 0
+                return
+            self._discard(path)
+            self._released.discard(path)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "pinned": len(self._pinned),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "pinned_hits": self.pinned_hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+            }
+
+
+dataset_cache = DatasetCache(max_bytes=settings.DATASET_CACHE_MAX_BYTES)
@@ -0,0 +1,570 @@
+from __future__ import annotations
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+from app.config import settings
+
+from .dataset import Dataset
+
+try:  # optional: vectorized columns when NumPy is installed
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when NumPy is absent
+    np = None
+
+
+def int_column(values: Sequence[int]):
+    if isinstance(values, memoryview):
+        return shared_column(values)
+    if np is not None:
+        return np.asarray(values, dtype=np.int64)
+    return array("q", values)
+
+
+def value_column(values: Sequence[Union[int, float]]):
+    if isinstance(values, memoryview):
+        return shared_column(values)
+    integral = all(isinstance(v, int) for v in values)
+    if np is not None:
+        return np.asarray(values, dtype=np.int64 if integral else np.float64)
+    return array("q" if integral else "d", values)
+
+
+def shared_column(view: memoryview):
+    """A typed ("q" or "d") buffer, e.g. a snapshot mapping, used in place rather than copied."""
+    if np is not None:
+        return np.frombuffer(view, dtype=np.int64 if view.format == "q" else np.float64)
+    return view
+
+
+def prefix_sum_column(values):
+    """Running totals with a leading 0: sum(values[i:j]) == prefix[j] - prefix[i]."""
+    if np is not None and isinstance(values, np.ndarray):
+        return np.concatenate((np.zeros(1, dtype=values.dtype), np.cumsum(values)))
+    return array(values.typecode, accumulate(values, initial=0))
+
+
+def column_nbytes(column) -> int:
+    if np is not None and isinstance(column, np.ndarray):
+        return int(column.nbytes)
+    return sys.getsizeof(column)
+
+
+def search(column, value: int, side: str = "left") -> int:
+    """Binary search in an ascending column (numpy.searchsorted semantics)."""
+    if np is not None and isinstance(column, np.ndarray):
+        return int(np.searchsorted(column, value, side=side))
+    return (bisect_left if side == "left" else bisect_right)(column, value)
+
+
+class MetricSeries:
+    """
+    One metric's points ordered by date: day ordinals, values and source row
+    ids, plus prefix sums of the values so any windowed sum/average is O(1).
+    """
+
+    __slots__ = ("dates", "values", "row_ids", "prefix")
+
+    def __init__(self, dates, values, row_ids):
+        self.dates = dates
+        self.values = values
+        self.row_ids = row_ids
+        self.prefix = prefix_sum_column(values)
+
+    @classmethod
+    def from_points(
+        cls,
+        ordinals: Sequence[int],
+        values: Sequence[Union[int, float]],
+        row_ids: Sequence[int],
+    ) -> "MetricSeries":
+        """Build a series from unsorted points (sorted here by date, then row id)."""
+        order = sorted(range(len(ordinals)), key=lambda i: (ordinals[i], row_ids[i]))
+        return cls(
+            dates=int_column([ordinals[i] for i in order]),
+            values=value_column([values[i] for i in order]),
+            row_ids=int_column([row_ids[i] for i in order]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def span(self, start: Optional[date], end: Optional[date]) -> Tuple[int, int]:
+        """[lo, hi) positions of the points within the inclusive date range."""
+        lo = 0 if start is None else search(self.dates, start.toordinal(), "left")
+        hi = len(self.dates) if end is None else search(self.dates, end.toordinal(), "right")
+        return lo, max(lo, hi)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            column_nbytes(self.dates)
+            + column_nbytes(self.values)
+            + column_nbytes(self.row_ids)
+            + column_nbytes(self.prefix)
+        )
+
+
+class _Tiebreak(Sequence):
+    """(metric, date) primary key per row, computed from the columns on access."""
+
+    def __init__(self, columns: "AnalyticsColumns"):
+        self._columns = columns
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def __getitem__(self, row_id):
+        columns = self._columns
+        return (
+            columns.metric_names[columns.metric_codes[row_id]],
+            date.fromordinal(int(columns.date_ordinals[row_id])).isoformat(),
+        )
+
+
+class AnalyticsColumns(Sequence):
+    """
+    Column-oriented analytics table. Rows keep their file order (row id =
+    position in the file) and are rebuilt as dicts only when accessed; each
+    metric also gets a date-sorted `MetricSeries` for range lookups.
+    """
+
+    FIELDS = ("metric", "date", "value")
+
+    def __init__(
+        self,
+        metric_names: List[str],
+        metric_codes,
+        date_ordinals,
+        values,
+        series: Dict[str, MetricSeries],
+    ):
+        self.metric_names = metric_names
+        self.metric_codes = metric_codes
+        self.date_ordinals = date_ordinals
+        self.values = values
+        self.series = series
+        self.tiebreak = _Tiebreak(self)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> Optional["AnalyticsColumns"]:
+        """
+        Build columns from parsed JSON rows, or return None when the rows do not
+        fit the `{metric, date, value}` schema exactly or mix int and float
+        values (the caller then keeps the plain row representation).
+        """
+        metric_names: List[str] = []
+        metric_lookup: Dict[str, int] = {}
+        codes: List[int] = []
+        ordinals: List[int] = []
+        values: List[Union[int, float]] = []
+
+        for record in records:
+            if set(record) != set(cls.FIELDS):
+                return None
+            metric, raw_date, value = record["metric"], record["date"], record["value"]
+            if not isinstance(metric, str) or isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+            try:
+                day = date.fromisoformat(raw_date)
+            except (TypeError, ValueError):
+                return None
+            # Rows are re-rendered from the ordinal; only accept canonical dates.
+            if day.isoformat() != raw_date:
+                return None
+
+            code = metric_lookup.get(metric)
+            if code is None:
+                code = metric_lookup[metric] = len(metric_names)
+                metric_names.append(metric)
+            codes.append(code)
+            ordinals.append(day.toordinal())
+            values.append(value)
+
+        # A typed column holds one numeric type: mixing ints and floats would
+        # render 872 as 872.0, so those tables stay row-based (as snapshots do).
+        if not (
+            all(type(v) is int and -(2 ** 63) <= v < 2 ** 63 for v in values)
+            or all(type(v) is float for v in values)
+        ):
+            return None
+        return cls.from_columns(metric_names, codes, ordinals, values)
+
+    @classmethod
+    def from_columns(
+        cls,
+        metric_names: List[str],
+        codes: Sequence[int],
+        ordinals: Sequence[int],
+        values: Sequence[Union[int, float]],
+    ) -> "AnalyticsColumns":
+        """Build from already-decoded columns (metric codes index `metric_names`)."""
+        per_metric: Dict[int, List[int]] = {}
+        for row_id, code in enumerate(codes):
+            per_metric.setdefault(code, []).append(row_id)
+
+        series = {
+            metric_names[code]: MetricSeries.from_points(
+                [ordinals[i] for i in row_ids],
+                [values[i] for i in row_ids],
+                row_ids,
+            )
+            for code, row_ids in per_metric.items()
+        }
+
+        return cls(
+            metric_names,
+            int_column(codes),
+            int_column(ordinals),
+            value_column(values),
+            series,
+        )
+
+    def __len__(self) -> int:
+        return len(self.metric_codes)
+
+    def _metric(self, row_id: int) -> str:
+        return self.metric_names[self.metric_codes[row_id]]
+
+    def _date(self, row_id: int) -> str:
+        return date.fromordinal(int(self.date_ordinals[row_id])).isoformat()
+
+    def _value(self, row_id: int) -> Union[int, float]:
+        value = self.values[row_id]
+        return value.item() if hasattr(value, "item") else value
+
+    def _row(self, row_id: int) -> Dict[str, Any]:
+        return {"metric": self._metric(row_id), "date": self._date(row_id), "value": self._value(row_id)}
+
+    def row_builder(self, fields: Sequence[str]) -> Callable[[int], Dict[str, Any]]:
+        """Row id -> dict of just `fields`; other columns are never decoded."""
+        getters = {"metric": self._metric, "date": self._date, "value": self._value}
+        selected = [(field, getters[field]) for field in fields if field in getters]
+        return lambda row_id: {field: get(row_id) for field, get in selected}
+
+    @overload
+    def __getitem__(self, row_id: int) -> Dict[str, Any]: ...
+
+    @overload
+    def __getitem__(self, row_id: slice) -> List[Dict[str, Any]]: ...
+
+    def __getitem__(self, row_id):
+        if isinstance(row_id, slice):
+            return [self._row(i) for i in range(*row_id.indices(len(self)))]
+        if row_id < 0:
+            row_id += len(self)
+        if not 0 <= row_id < len(self):
+            raise IndexError(row_id)
+        return self._row(row_id)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row_id in range(len(self)):
+            yield self._row(row_id)
+
+    def range_row_ids(
+        self,
+        metric: Optional[str],
+        start: Optional[date],
+        end: Optional[date],
+    ) -> List[int]:
+        """Ascending row ids of points in [start, end], for one metric or all."""
+        if metric is not None:
+            selected = [self.series[metric]] if metric in self.series else []
+        else:
+            selected = list(self.series.values())
+
+        row_ids: List[int] = []
+        for series in selected:
+            lo, hi = series.span(start, end)
+            chunk = series.row_ids[lo:hi]
+            row_ids.extend(chunk.tolist() if hasattr(chunk, "tolist") else chunk)
+        row_ids.sort()
+        return row_ids
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            sum(sys.getsizeof(name) for name in self.metric_names)
+            + column_nbytes(self.metric_codes)
+            + column_nbytes(self.date_ordinals)
+            + column_nbytes(self.values)
+            + sum(series.nbytes for series in self.series.values())
+        )
+
+
+# -----------------------
+# COMPACT RECORD STORE (CRM / support rows)
+# -----------------------
+
+# Marks a field absent from a row (distinct from an explicit null).
+_MISSING: Any = object()
+
+
+class _ObjectColumn:
+    """Values kept as-is (high-cardinality strings, mixed types)."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: List[Any]):
+        self.values = values
+
+    def __getitem__(self, row_id: int) -> Any:
+        return self.values[row_id]
+
+    def decoded(self) -> Sequence[Any]:
+        return [None if v is _MISSING else v for v in self.values]
+
+    @property
+    def nbytes(self) -> int:
+        # Strings are counted once even when rows share the same object.
+        distinct = {id(v): v for v in self.values if v is not _MISSING}
+        return sys.getsizeof(self.values) + sum(sys.getsizeof(v) for v in distinct.values())
+
+
+class _IntColumn:
+    """Plain ints in a typed array (present in every row)."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: Sequence[int]):
+        self.values = array("q", values)
+
+    def __getitem__(self, row_id: int) -> int:
+        return self.values[row_id]
+
+    def decoded(self) -> Sequence[Any]:
+        return self.values
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.values)
+
+
+class _EnumColumn:
+    """Dictionary-encoded values: one small code per row, each distinct value stored once."""
+
+    __slots__ = ("codes", "dictionary")
+
+    def __init__(self, codes: List[int], dictionary: List[Any]):
+        size = len(dictionary)
+        self.codes = array("b" if size < 2 ** 7 else "h" if size < 2 ** 15 else "i", codes)
+        self.dictionary = dictionary
+
+    def __getitem__(self, row_id: int) -> Any:
+        code = self.codes[row_id]
+        return _MISSING if code < 0 else self.dictionary[code]
+
+    def decoded(self) -> Sequence[Any]:
+        dictionary = self.dictionary
+        return [None if code < 0 else dictionary[code] for code in self.codes]
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.codes) + sum(sys.getsizeof(v) for v in self.dictionary)
+
+
+class _TimestampColumn:
+    """
+    ISO-8601 timestamps parsed once to epoch microseconds. Only built when
+    every value is present, re-renders to the exact original string and
+    shares one UTC offset and string length, so epoch order is also the
+    string order the sort index would use.
+    """
+
+    __slots__ = ("micros", "epoch")
+
+    def __init__(self, micros: Sequence[int], epoch: datetime):
+        self.micros = array("q", micros)
+        self.epoch = epoch
+
+    def __getitem__(self, row_id: int) -> str:
+        return self.render(self.micros[row_id])
+
+    def render(self, micros: int) -> str:
+        return (self.epoch + timedelta(microseconds=micros)).isoformat()
+
+    def decoded(self) -> Sequence[Any]:
+        return [self.render(m) for m in self.micros]
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.micros)
+
+
+def _int_column(values: List[Any]) -> Optional[_IntColumn]:
+    if all(type(v) is int and -(2 ** 63) <= v < 2 ** 63 for v in values):
+        return _IntColumn(values)
+    return None
+
+
+def _enum_column(values: List[Any]) -> Optional[_EnumColumn]:
+    dictionary: List[Any] = []
+    # Keyed by type too, so 1 / 1.0 / True stay distinct values.
+    lookup: Dict[Tuple[type, Any], int] = {}
+    codes: List[int] = []
+    for value in values:
+        if value is _MISSING:
+            codes.append(-1)
+            continue
+        try:
+            key = (type(value), value)
+            code = lookup.get(key)
+        except TypeError:  # unhashable (nested object/array)
+            return None
+        if code is None:
+            code = lookup[key] = len(dictionary)
+            dictionary.append(value)
+        codes.append(code)
+    return _EnumColumn(codes, dictionary)
+
+
+def _timestamp_column(values: List[Any]) -> Optional[_TimestampColumn]:
+    if not values or not all(isinstance(v, str) for v in values):
+        return None
+    length = len(values[0])
+    micros: List[int] = []
+    epoch: Optional[datetime] = None
+    for value in values:
+        if len(value) != length:
+            return None
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        if epoch is None:
+            epoch = datetime(1970, 1, 1, tzinfo=moment.tzinfo)
+        elif moment.utcoffset() != epoch.utcoffset():
+            return None
+        delta = moment - epoch
+        micros.append((delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds)
+        if (epoch + timedelta(microseconds=micros[-1])).isoformat() != value:
+            return None
+    return _TimestampColumn(micros, epoch)
+
+
+class _KeyTuples(Sequence):
+    """Primary-key tuple per row, read from the key columns on access."""
+
+    def __init__(self, columns: Sequence[Any], length: int):
+        self._columns = columns
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, row_id):
+        return tuple(None if (v := column[row_id]) is _MISSING else v for column in self._columns)
+
+
+class RecordColumns(Sequence):
+    """
+    Column store for flat records (CRM customers, support tickets). Ints go
+    in typed arrays, `enum_fields` are dictionary-encoded (one small code per
+    row, each distinct string kept once), `timestamp_fields` are parsed once
+    to epoch microseconds, and everything else is kept as a plain list. Rows
+    are rebuilt as dicts (in first-seen field order) only when accessed.
+    """
+
+    def __init__(self, fields: List[str], columns: Dict[str, Any], length: int):
+        self.fields = fields
+        self.columns = columns
+        self._length = length
+        self._all = [(field, columns[field]) for field in fields]
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Sequence[Dict[str, Any]],
+        enum_fields: Sequence[str] = (),
+        timestamp_fields: Sequence[str] = (),
+    ) -> "RecordColumns":
+        fields: List[str] = list(dict.fromkeys(field for record in records for field in record))
+        columns: Dict[str, Any] = {}
+        for field in fields:
+            values = [record.get(field, _MISSING) for record in records]
+            column = None
+            if _MISSING not in values:
+                if field in timestamp_fields:
+                    column = _timestamp_column(values)
+                if column is None:
+                    column = _int_column(values)
+            if column is None and field in enum_fields:
+                column = _enum_column(values)
+            columns[field] = column or _ObjectColumn(values)
+        return cls(fields, columns, len(records))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _row(self, row_id: int, columns: Optional[List[Tuple[str, Any]]] = None) -> Dict[str, Any]:
+        row: Dict[str, Any] = {}
+        for field, column in self._all if columns is None else columns:
+            value = column[row_id]
+            if value is not _MISSING:
+                row[field] = value
+        return row
+
+    def __getitem__(self, row_id):
+        if isinstance(row_id, slice):
+            return [self._row(i) for i in range(*row_id.indices(len(self)))]
+        if row_id < 0:
+            row_id += len(self)
+        if not 0 <= row_id < len(self):
+            raise IndexError(row_id)
+        return self._row(row_id)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row_id in range(len(self)):
+            yield self._row(row_id)
+
+    def row_builder(self, fields: Sequence[str]) -> Callable[[int], Dict[str, Any]]:
+        """Row id -> dict of just `fields`; other columns are never read."""
+        columns = [(field, self.columns[field]) for field in fields if field in self.columns]
+        return lambda row_id: self._row(row_id, columns)
+
+    def column_values(self, field: str) -> Sequence[Any]:
+        """`record.get(field)` for every row, straight from the column."""
+        column = self.columns.get(field)
+        return [None] * len(self) if column is None else column.decoded()
+
+    def sort_keys(self, field: str) -> Optional[Tuple[Sequence[Any], Callable[[Any], Any]]]:
+        """
+        (encoded keys, decode) for fields whose encoding sorts like the
+        decoded values, so a sort index can hold the compact keys.
+        """
+        column = self.columns.get(field)
+        if isinstance(column, _TimestampColumn):
+            return column.micros, column.render
+        return None
+
+    def primary_keys(self, primary_key: Sequence[str]) -> Sequence[Tuple[Any, ...]]:
+        missing = _ObjectColumn([_MISSING] * len(self))
+        return _KeyTuples([self.columns.get(field, missing) for field in primary_key], len(self))
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.fields) + sum(column.nbytes for column in self.columns.values())
+
+
+def compact_dataset(
+    records: List[Dict[str, Any]],
+    index_fields: Sequence[str] = (),
+    sort_fields: Sequence[str] = (),
+    primary_key: Sequence[str] = (),
+    enum_fields: Sequence[str] = (),
+    timestamp_fields: Sequence[str] = (),
+) -> Dataset:
+    """
+    `Dataset` over `records`, held as `RecordColumns` once the file has at
+    least COMPACT_RECORDS_MIN_ROWS rows. Smaller files keep the plain row
+    list, which also keeps incremental reloads (`Dataset.with_changes`);
+    column stores are rebuilt on change.
+    """
+    threshold = settings.COMPACT_RECORDS_MIN_ROWS
+    if threshold > 0 and len(records) >= threshold:
+        records = RecordColumns.from_records(records, enum_fields, timestamp_fields)
+    return Dataset(records, index_fields=index_fields, sort_fields=sort_fields, primary_key=primary_key)
@@ -0,0 +1,517 @@
+from __future__ import annotations
+
+import heapq
+from itertools import islice
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.services.business_rules import value_key
+
+from .cache import estimate_size
+from .query import (
+    CursorError,
+    QueryPlan,
+    QueryResult,
+    SortPosition,
+    execute_in_python,
+    project_row,
+)
+
+
+# value -> ascending row ids
+Postings = Dict[Any, List[int]]
+
+
+def field_values(records: Sequence[Dict[str, Any]], field: str) -> Sequence[Any]:
+    """`record.get(field)` per row; column stores answer without building rows."""
+    column_values = getattr(records, "column_values", None)
+    if column_values is not None:
+        return column_values(field)
+    return [record.get(field) for record in records]
+
+
+def build_index(records: Sequence[Dict[str, Any]], field: str) -> Postings:
+    index: Postings = {}
+    for row_id, value in enumerate(field_values(records, field)):
+        index.setdefault(value, []).append(row_id)
+    return index
+
+
+def intersect(postings: List[List[int]]) -> List[int]:
+    """
+    Intersect ascending id lists. Walks the shortest list and bisects forward
+    through the others, so cost follows the smallest list rather than the table.
+    """
+    if not postings:
+        return []
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for other in postings[1:]:
+        matched: List[int] = []
+        lo = 0
+        for row_id in result:
+            lo = bisect_left(other, row_id, lo)
+            if lo == len(other):
+                break
+            if other[lo] == row_id:
+                matched.append(row_id)
+        result = matched
+        if not result:
+            break
+    return result
+
+
+class DecodedValues(Sequence):
+    """Sort-index values kept encoded and decoded on access (still bisectable)."""
+
+    def __init__(self, encoded: Sequence[Any], decode: Callable[[Any], Any]):
+        self._encoded = encoded
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return len(self._encoded)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._decode(v) for v in self._encoded[i]]
+        return self._decode(self._encoded[i])
+
+
+class SortIndex:
+    """
+    Presorted row order for one field, using the shared sort rule
+    (`value_key`: missing/None first). Ties are broken by the dataset's tie-breaker (primary
+    key) ascending in both directions, which gives every row a unique,
+    seekable position for keyset pagination.
+    """
+
+    def __init__(
+        self,
+        records: Sequence[Dict[str, Any]],
+        field: str,
+        tiebreak: Sequence[Tuple[Any, ...]],
+    ):
+        # Column stores may hand over compact keys that sort like the values
+        # (e.g. epoch ints for timestamps); the index then decodes on access.
+        sort_keys = getattr(records, "sort_keys", None)
+        encoded = sort_keys(field) if sort_keys is not None else None
+        values: Optional[Sequence[Any]] = None
+        if encoded is None:
+            values = field_values(records, field)
+            keys: Sequence[Any] = [value_key(value) for value in values]
+        else:
+            keys, decode = encoded
+        self.tiebreak = tiebreak
+        self._rank(sorted(range(len(keys)), key=lambda i: (keys[i], tiebreak[i])), keys, values)
+        if encoded is not None:
+            self.values = DecodedValues(self.values, decode)
+
+    def _rank(self, order: List[int], keys: Sequence[Any], values: Optional[Sequence[Any]] = None) -> None:
+        self.order: List[int] = order
+        # Dense rank per row id: equal keys share a rank; values[rank] is the
+        # group's value (`values[row_id]`, or the key itself when not given).
+        self.ranks: List[int] = [0] * len(keys)
+        self.values: List[Any] = []
+        last = None
+        for row_id in order:
+            key = keys[row_id]
+            if not self.values or key != last:
+                self.values.append(key if values is None else values[row_id])
+                last = key
+            self.ranks[row_id] = len(self.values) - 1
+
+        self._descending: Optional[List[int]] = None
+
+    @classmethod
+    def from_parts(
+        cls,
+        order: Sequence[int],
+        ranks: Sequence[int],
+        values: Sequence[Any],
+        tiebreak: Sequence[Tuple[Any, ...]],
+    ) -> "SortIndex":
+        """Rebuild an index from a previously computed order/ranks/values (e.g. a snapshot)."""
+        index = cls.__new__(cls)
+        index.tiebreak = tiebreak
+        index.order = order
+        index.ranks = ranks
+        index.values = values
+        index._descending = None
+        return index
+
+    def updated(
+        self,
+        records: Sequence[Dict[str, Any]],
+        field: str,
+        tiebreak: Sequence[Tuple[Any, ...]],
+        remap: Sequence[int],
+        changed: Sequence[int],
+    ) -> "SortIndex":
+        """
+        The index after a `Dataset.with_changes` edit: `remap` maps old row ids
+        to new ones (-1 for removed rows) and `changed` lists new row ids whose
+        records were inserted or modified. Untouched rows keep their relative
+        order, so the result is a merge instead of a full re-sort.
+        """
+        changed_set = set(changed)
+        values: List[Any] = [None] * len(records)
+        kept: List[int] = []
+        for old_id in self.order:
+            new_id = remap[old_id]
+            if new_id >= 0 and new_id not in changed_set:
+                values[new_id] = self.values[self.ranks[old_id]]
+                kept.append(new_id)
+        for row_id in changed:
+            values[row_id] = records[row_id].get(field)
+        keys = [value_key(value) for value in values]
+
+        def key(i: int) -> Tuple[Any, Any]:
+            return keys[i], tiebreak[i]
+
+        index = SortIndex.__new__(SortIndex)
+        index.tiebreak = tiebreak
+        index._rank(list(heapq.merge(kept, sorted(changed, key=key), key=key)), keys, values)
+        return index
+
+    @property
+    def descending_order(self) -> List[int]:
+        # Reverse the rank groups but keep tie-breaker order inside each group.
+        if self._descending is None:
+            groups: List[List[int]] = []
+            ranks = self.ranks
+            for row_id in self.order:
+                if groups and ranks[groups[-1][0]] == ranks[row_id]:
+                    groups[-1].append(row_id)
+                else:
+                    groups.append([row_id])
+            self._descending = [row_id for group in reversed(groups) for row_id in group]
+        return self._descending
+
+    def _sort_key(self, descending: bool):
+        ranks, tiebreak = self.ranks, self.tiebreak
+        if descending:
+            return lambda i: (-ranks[i], tiebreak[i])
+        return lambda i: (ranks[i], tiebreak[i])
+
+    def _seek_key(self, after: SortPosition, descending: bool) -> Tuple[Any, Any]:
+        """Translate a (value, tie-breaker) position into this index's key space."""
+        value, tiebreak = after
+        target = value_key(value)
+        tiebreak = tuple(tiebreak)
+        try:
+            rank: float = bisect_left(self.values, target, key=value_key)
+            if len(self.tiebreak):
+                # Fail here rather than mid-scan if the key types don't match.
+                tiebreak < self.tiebreak[0]  # noqa: B015
+        except TypeError:
+            raise CursorError("Cursor does not match the sort field or primary key.")
+        if rank >= len(self.values) or value_key(self.values[int(rank)]) != target:
+            # Value no longer present: seek between its neighbours.
+            rank -= 0.5
+        return (-rank if descending else rank), tiebreak
+
+    def iter_order(
+        self,
+        descending: bool,
+        row_ids: Optional[List[int]] = None,
+        after: Optional[SortPosition] = None,
+    ) -> Iterable[int]:
+        """Every selected row id in sort order, without copying the presorted order."""
+        key = self._sort_key(descending)
+        if row_ids is None:
+            order = self.descending_order if descending else self.order
+            start = 0
+            if after is not None:
+                start = bisect_right(order, self._seek_key(after, descending), key=key)
+            return islice(order, start, None)
+
+        if after is not None:
+            target = self._seek_key(after, descending)
+            row_ids = [i for i in row_ids if key(i) > target]
+        return sorted(row_ids, key=key)
+
+    def position(self, row_id: int) -> SortPosition:
+        return self.values[self.ranks[row_id]], self.tiebreak[row_id]
+
+    def select(
+        self,
+        descending: bool,
+        row_ids: Optional[List[int]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[SortPosition] = None,
+    ) -> Tuple[List[int], bool]:
+        """
+        Row ids for one window in sort order, optionally restricted to
+        `row_ids` and starting after the `after` position, plus whether more
+        rows follow. Unfiltered windows are a bisect plus a slice of the
+        presorted order; filtered ones are a bounded heap selection.
+        """
+        key = self._sort_key(descending)
+        end = None if limit is None else offset + limit
+
+        if row_ids is None:
+            order = self.descending_order if descending else self.order
+            start = 0
+            if after is not None:
+                start = bisect_right(order, self._seek_key(after, descending), key=key)
+            stop = None if end is None else start + end
+            return order[start + offset:stop], stop is not None and stop < len(order)
+
+        candidates = row_ids
+        if after is not None:
+            target = self._seek_key(after, descending)
+            candidates = [i for i in row_ids if key(i) > target]
+
+        if end is None or end >= len(candidates):
+            selected = sorted(candidates, key=key)
+        else:
+            selected = heapq.nsmallest(end, candidates, key=key)
+        return selected[offset:], end is not None and end < len(candidates)
+
+
+class Dataset:
+    """
+    Parsed records of one data file plus the equality and sort indexes built
+    at load time. Instances live in the dataset cache and are shared; treat
+    them as read-only.
+    """
+
+    def __init__(
+        self,
+        records: Sequence[Dict[str, Any]],
+        index_fields: Iterable[str] = (),
+        sort_fields: Iterable[str] = (),
+        primary_key: Sequence[str] = (),
+        tiebreak: Optional[Sequence[Tuple[Any, ...]]] = None,
+        indexes: Optional[Dict[str, Postings]] = None,
+        sort_indexes: Optional[Dict[str, SortIndex]] = None,
+    ):
+        # A list of dicts, or any row sequence that builds dicts on access
+        # (e.g. a column store); `tiebreak` lets such stores supply keys lazily,
+        # and `indexes` / `sort_indexes` supply prebuilt indexes (snapshots).
+        indexes = indexes or {}
+        sort_indexes = sort_indexes or {}
+        self.records = records
+        self.primary_key = tuple(primary_key)
+        # Sort tie-breaker per row: the primary key, or file position without one.
+        if tiebreak is None:
+            if not self.primary_key:
+                tiebreak = [(i,) for i in range(len(records))]
+            elif hasattr(records, "primary_keys"):
+                tiebreak = records.primary_keys(self.primary_key)
+            else:
+                tiebreak = [tuple(record.get(f) for f in self.primary_key) for record in records]
+        self.tiebreak = tiebreak
+        self.indexes: Dict[str, Postings] = {
+            field: indexes[field] if field in indexes else build_index(records, field)
+            for field in index_fields
+        }
+        self.sort_indexes: Dict[str, SortIndex] = {
+            field: sort_indexes[field] if field in sort_indexes else SortIndex(records, field, self.tiebreak)
+            for field in sort_fields
+        }
+        self.nbytes = (
+            estimate_size(records)
+            + estimate_size(self.tiebreak)
+            + sum(estimate_size(ids) for index in self.indexes.values() for ids in index.values())
+            # order + ranks, plus the lazily built descending order
+            + sum(3 * estimate_size(s.order) for s in self.sort_indexes.values())
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def with_changes(self, records: List[Dict[str, Any]]) -> Optional["Dataset"]:
+        """
+        A new dataset holding `records` (the file's new contents), derived from
+        this one by diffing on the primary key and patching the indexes for
+        just the inserted, updated and deleted rows. Kept rows stay in their
+        current relative order and inserts are appended.
+
+        This dataset is left untouched, so readers can keep using it until the
+        new one is swapped in. Returns None when a rebuild is needed instead:
+        no primary key, non-list storage, duplicate keys, or too many changes.
+        """
+        if not self.primary_key or not isinstance(self.records, list):
+            return None
+
+        old = self.records
+        old_ids = {key: row_id for row_id, key in enumerate(self.tiebreak)}
+        new_rows: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for record in records:
+            new_rows[tuple(record.get(f) for f in self.primary_key)] = record
+        if len(old_ids) != len(old) or len(new_rows) != len(records):
+            return None
+
+        deleted = {row_id for key, row_id in old_ids.items() if key not in new_rows}
+        updated: Dict[int, Dict[str, Any]] = {}
+        inserted: List[Tuple[Tuple[Any, ...], Dict[str, Any]]] = []
+        for key, record in new_rows.items():
+            row_id = old_ids.get(key)
+            if row_id is None:
+                inserted.append((key, record))
+            elif old[row_id] != record:
+                updated[row_id] = record
+
+        if not (deleted or updated or inserted):
+            return self
+        if len(deleted) + len(updated) + len(inserted) > len(old) // 2:
+            return None
+
+        remap = [-1] * len(old)
+        merged: List[Dict[str, Any]] = []
+        tiebreak: List[Tuple[Any, ...]] = []
+        for row_id, record in enumerate(old):
+            if row_id in deleted:
+                continue
+            remap[row_id] = len(merged)
+            merged.append(updated.get(row_id, record))
+            tiebreak.append(self.tiebreak[row_id])
+        changed = sorted(remap[row_id] for row_id in updated)
+        for key, record in inserted:
+            changed.append(len(merged))
+            merged.append(record)
+            tiebreak.append(key)
+
+        touched = set(updated) | deleted
+        indexes: Dict[str, Postings] = {}
+        for field, postings in self.indexes.items():
+            patched: Postings = {}
+            for value, row_ids in postings.items():
+                kept = [remap[i] for i in row_ids if i not in touched]
+                if kept:
+                    patched[value] = kept
+            for row_id in changed:
+                insort(patched.setdefault(merged[row_id].get(field), []), row_id)
+            indexes[field] = patched
+
+        return Dataset(
+            merged,
+            index_fields=self.indexes,
+            sort_fields=self.sort_indexes,
+            primary_key=self.primary_key,
+            tiebreak=tiebreak,
+            indexes=indexes,
+            sort_indexes={
+                field: index.updated(merged, field, tiebreak, remap, changed)
+                for field, index in self.sort_indexes.items()
+            },
+        )
+
+    def match(self, **equals: Any) -> Optional[List[int]]:
+        """
+        Row ids whose fields equal every non-None value given, in file order.
+        Returns None when no filter applies (i.e. every row matches).
+        """
+        equals = {field: value for field, value in equals.items() if value is not None}
+        if not equals:
+            return None
+
+        postings = []
+        unindexed = {}
+        for field, value in equals.items():
+            index = self.indexes.get(field)
+            if index is None:
+                unindexed[field] = value
+            else:
+                postings.append(index.get(value, []))
+
+        if postings:
+            row_ids = intersect(postings)
+        else:
+            row_ids = list(range(len(self.records)))
+
+        if unindexed:
+            records = self.records
+            row_ids = [
+                i for i in row_ids
+                if all(records[i].get(f) == v for f, v in unindexed.items())
+            ]
+        return row_ids
+
+    def rows(self, row_ids: Optional[List[int]]) -> List[Dict[str, Any]]:
+        records = self.records
+        if row_ids is None:
+            return records if isinstance(records, list) else list(records)
+        return [records[i] for i in row_ids]
+
+    def execute(self, row_ids: Optional[List[int]], plan: QueryPlan) -> QueryResult:
+        """
+        Apply the sort/window/projection parts of `plan` to the rows already
+        selected by the filters (`row_ids`; None means every row). Only the
+        returned page is materialized.
+        """
+        total = len(self.records) if row_ids is None else len(row_ids)
+        end = plan.end
+
+        if plan.sort_key is None:
+            if row_ids is None:
+                page_ids: Sequence[int] = range(total)[plan.offset:end]
+            else:
+                page_ids = row_ids[plan.offset:end]
+            return QueryResult(
+                rows=self.project_rows(page_ids, plan.fields),
+                total=total,
+                has_more=end is not None and end < total,
+            )
+
+        sort_index = self.sort_indexes.get(plan.sort_key)
+        if sort_index is None:
+            return execute_in_python(self.rows(row_ids), plan, self.primary_key)
+
+        selected, has_more = sort_index.select(
+            plan.descending,
+            row_ids,
+            offset=plan.offset,
+            limit=plan.limit,
+            after=plan.after,
+        )
+        return QueryResult(
+            rows=self.project_rows(selected, plan.fields),
+            total=total,
+            has_more=has_more,
+            last_key=sort_index.position(selected[-1]) if selected else None,
+        )
+
+    def iter_rows(self, row_ids: Optional[List[int]], plan: QueryPlan) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily yield the rows of `plan` among `row_ids`. Only row ids are held
+        in memory; each record is projected as it is consumed.
+        """
+        if plan.sort_key is None:
+            ordered: Iterable[int] = range(len(self.records)) if row_ids is None else row_ids
+        else:
+            sort_index = self.sort_indexes.get(plan.sort_key)
+            if sort_index is None:
+                return iter(execute_in_python(self.rows(row_ids), plan, self.primary_key).rows)
+            ordered = sort_index.iter_order(plan.descending, row_ids, plan.after)
+        return self._iter_projected(islice(ordered, plan.offset, plan.end), plan.fields)
+
+    def _iter_projected(
+        self,
+        row_ids: Iterable[int],
+        fields: Optional[Sequence[str]],
+    ) -> Iterator[Dict[str, Any]]:
+        build = self.row_builder(fields)
+        for row_id in row_ids:
+            yield build(row_id)
+
+    def row_builder(self, fields: Optional[Sequence[str]]) -> Callable[[int], Dict[str, Any]]:
+        """
+        Row id -> record restricted to `fields` (every field when None).
+        Column-backed records (snapshots, analytics columns) provide their
+        own builder and only decode the requested columns; plain dict rows
+        are copied key by key.
+        """
+        records = self.records
+        if fields is None:
+            return records.__getitem__
+        builder = getattr(records, "row_builder", None)
+        if builder is not None:
+            return builder(fields)
+        return lambda row_id: project_row(records[row_id], fields)
+
+    def project_rows(self, row_ids: Iterable[int], fields: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+        build = self.row_builder(fields)
+        return [build(row_id) for row_id in row_ids]
@@ -0,0 +1,104 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+from .base import BaseConnector
+from .cache import dataset_cache
+from .dataset import Dataset
+from .query import QueryPlan, QueryResult
+from .stream import execute_stream, iter_json_array, iter_stream, match_rows, use_streaming
+
+
+class FileConnector(BaseConnector):
+    """
+    A connector over one JSON data file: served from the shared dataset cache
+    (built by `build_dataset`, or loaded by `load_snapshot` when a fresh
+    snapshot exists), or scanned per query once the file is too large to load.
+
+    Subclasses set the class attributes below. Filters on `index_fields` are
+    answered from the equality indexes; sources with other filters override
+    `_select` (loaded dataset) and `_stream` (streaming scan).
+    """
+
+    source: str = ""
+    data_path: Path
+    index_fields: Tuple[str, ...] = ()
+    sort_fields: Tuple[str, ...] = ()
+
+    # Records -> stored value, and path -> value or None (wrap plain functions
+    # in staticmethod so they are not bound).
+    build_dataset: Callable[[List[Dict[str, Any]]], Dataset]
+    load_snapshot: Callable[[Path], Optional[Dataset]]
+
+    def _dataset(self) -> Dataset:
+        return dataset_cache.get(self.data_path, build=self.build_dataset, load=self.load_snapshot)
+
+    def refresh(self) -> bool:
+        if use_streaming(self.data_path):
+            # Too large to hold: queries scan the file, so nothing is loaded
+            # or pinned (and a version pinned before it grew is dropped).
+            dataset_cache.invalidate(self.data_path)
+            return False
+        # Shared datasets reload from the published snapshot instead of
+        # patching a per-process copy; column stores are always rebuilt
+        # (`with_changes` only patches row lists). Either way the swap is
+        # copy-on-write.
+        return dataset_cache.refresh(
+            self.data_path,
+            build=self.build_dataset,
+            load=self.load_snapshot,
+            update=None if settings.SHARED_DATASETS else Dataset.with_changes,
+        )
+
+    def _equals(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: filters.get(field) or None for field in self.index_fields}
+
+    def _stream(self, filters: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        return match_rows(iter_json_array(self.data_path), **self._equals(filters))
+
+    def _select(self, dataset: Dataset, filters: Dict[str, Any]) -> Optional[Sequence[int]]:
+        return dataset.match(**self._equals(filters))
+
+    def fetch(self, **filters) -> List[Dict[str, Any]]:
+        if use_streaming(self.data_path):
+            return list(self._stream(filters))
+        dataset = self._dataset()
+        return dataset.rows(self._select(dataset, filters))
+
+    def execute(self, plan: QueryPlan) -> QueryResult:
+        start = metrics.clock()
+        # Files too large to load are scanned once per query instead.
+        if use_streaming(self.data_path):
+            result = execute_stream(self._stream(plan.filters), plan, self.primary_key)
+            metrics.lap(self.source, "scan", start)
+        else:
+            dataset = self._dataset()
+            start = metrics.lap(self.source, "load", start)
+            row_ids = self._select(dataset, plan.filters)
+            start = metrics.lap(self.source, "filter", start)
+            result = dataset.execute(row_ids, plan)
+            metrics.lap(self.source, "sort_page", start)
+        metrics.count_rows(self.source, scanned=result.total, returned=len(result.rows))
+        return result
+
+    def iter_rows(self, plan: QueryPlan) -> Iterator[Dict[str, Any]]:
+        if use_streaming(self.data_path):
+            return iter_stream(self._stream(plan.filters), plan, self.primary_key)
+        dataset = self._dataset()
+        return dataset.iter_rows(self._select(dataset, plan.filters), plan)
+
+    def data_version(self) -> str | None:
+        try:
+            return "-".join(str(part) for part in dataset_cache.signature(self.data_path))
+        except OSError:
+            return None
+
+    def last_updated(self) -> datetime | None:
+        try:
+            ts = self.data_path.stat().st_mtime
+        except OSError:
+            return None
+        return datetime.fromtimestamp(ts, tz=timezone.utc)
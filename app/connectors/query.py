@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.business_rules import top_k, value_key
+
+
+# (sort value, primary-key tuple) of a row; what a keyset cursor points at.
+SortPosition = Tuple[Any, Tuple[Any, ...]]
+
+
+class CursorError(ValueError):
+    """A keyset position (`QueryPlan.after`) that cannot be compared with the data."""
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    Everything a connector needs to answer one `/data` request: equality/range
+    filters, sort order, the page window and the fields to return.
+    `limit=None` means "to the end"; `fields=None` means every field.
+    With `after` set (keyset pagination), the window starts right after that
+    sort position instead of at the beginning; `offset` is applied from there.
+    """
+
+    filters: Dict[str, Any] = field(default_factory=dict)
+    sort_key: Optional[str] = None
+    descending: bool = False
+    offset: int = 0
+    limit: Optional[int] = None
+    fields: Optional[Tuple[str, ...]] = None
+    after: Optional[SortPosition] = None
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.limit is None else self.offset + self.limit
+
+
+@dataclass
+class QueryResult:
+    rows: List[Dict[str, Any]]
+    total: int
+    # Whether rows follow this page, and the sort position of its last row
+    # (only set for sorted plans; used to build the next cursor).
+    has_more: bool = False
+    last_key: Optional[SortPosition] = None
+    # False when the source stopped reading once the page was full, in which
+    # case `total` is only a lower bound.
+    total_exact: bool = True
+
+
+def project_row(row: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return row
+    return {f: row[f] for f in fields if f in row}
+
+
+def project(
+    rows: Sequence[Dict[str, Any]],
+    fields: Optional[Sequence[str]],
+) -> List[Dict[str, Any]]:
+    if fields is None:
+        return list(rows)
+    return [{f: row[f] for f in fields if f in row} for row in rows]
+
+
+def is_after(position: SortPosition, after: SortPosition, descending: bool) -> bool:
+    """Whether `position` comes strictly after `after`; ties order by key ascending."""
+    value, tiebreak = value_key(position[0]), position[1]
+    after_value, after_tiebreak = value_key(after[0]), after[1]
+    try:
+        if value == after_value:
+            return tiebreak > after_tiebreak
+        return value < after_value if descending else value > after_value
+    except TypeError:
+        raise CursorError("Cursor does not match the sort field or primary key.")
+
+
+def execute_in_python(
+    data: List[Dict[str, Any]],
+    plan: QueryPlan,
+    primary_key: Sequence[str] = (),
+) -> QueryResult:
+    """
+    Generic plan execution over already-filtered records. Ties are broken by
+    `primary_key` (file order when empty), and only the page window is sorted.
+    """
+    total = len(data)
+    end = plan.end
+
+    if plan.sort_key is None:
+        page = data[plan.offset:end]
+        return QueryResult(
+            rows=project(page, plan.fields),
+            total=total,
+            has_more=end is not None and end < total,
+        )
+
+    def position(row: Dict[str, Any]) -> SortPosition:
+        return row.get(plan.sort_key), tuple(row.get(f) for f in primary_key)
+
+    if primary_key:
+        data = sorted(data, key=lambda row: position(row)[1])
+    if plan.after is not None:
+        data = [row for row in data if is_after(position(row), plan.after, plan.descending)]
+
+    remaining = len(data)
+    window = top_k(data, plan.sort_key, plan.descending, remaining if end is None else end)
+    page = window[plan.offset:]
+
+    return QueryResult(
+        rows=project(page, plan.fields),
+        total=total,
+        has_more=end is not None and end < remaining,
+        last_key=position(page[-1]) if page else None,
+    )
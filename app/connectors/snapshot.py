@@ -0,0 +1,564 @@
+"""
+Compiled binary snapshots of the JSON data files.
+
+A snapshot stores a data file column by column, together with the equality
+indexes and sort orders the connector would otherwise build at load time.
+It is memory-mapped on load, so a fresh snapshot is usable almost
+immediately: no JSON parsing, and rows are decoded only when accessed.
+
+Layout (integers little-endian on the build machine; see `byteorder`):
+
+    MAGIC | u64 header length | JSON header | sections, each 8-byte aligned
+
+The header records the source file's size, mtime and BLAKE2b digest. A
+snapshot is used only while these still match the file.
+
+Build snapshots with:
+
+    python -m app.connectors.snapshot [crm|support|analytics ...]
+
+With SHARED_DATASETS, connectors publish a missing or stale snapshot
+themselves (one process at a time, under `<name>.snap.lock`), so every
+worker maps the same file instead of parsing its own copy of the data.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.config import settings
+from app.utils.logging import get_logger
+
+from .dataset import Dataset, Postings, SortIndex
+
+try:  # optional: cross-process build lock (POSIX)
+    import fcntl
+except ImportError:  # pragma: no cover - exercised where fcntl is absent
+    fcntl = None
+
+
+logger = get_logger(__name__)
+
+MAGIC = b"UDCSNAP1"
+FORMAT_VERSION = 2
+
+_HEADER_LENGTH = struct.Struct("<Q")
+_ALIGN = 8
+
+# Decoded values kept per LazyValues (per process); the rest are decoded
+# from the mapping again when next read.
+DECODED_VALUES_CACHE_SIZE = 4096
+
+# Section = [offset, byte length, array typecode]
+Section = List[Any]
+
+
+def snapshot_path(path: Path) -> Path:
+    return path.with_suffix(".snap")
+
+
+@contextlib.contextmanager
+def snapshot_lock(path: Path) -> Iterator[None]:
+    """
+    Hold the exclusive build lock for data file `path`'s snapshot. Processes
+    serialize on it so a snapshot is compiled once, not once per worker.
+    """
+    if fcntl is None:
+        yield
+        return
+    snap = snapshot_path(path)
+    with open(snap.with_name(snap.name + ".lock"), "wb") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode_value(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+# -----------------------
+# WRITING
+# -----------------------
+
+class _SectionWriter:
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def add(self, data: bytes, typecode: str = "B") -> Section:
+        padding = -self.size % _ALIGN
+        if padding:
+            self.chunks.append(b"\0" * padding)
+            self.size += padding
+        section = [self.size, len(data), typecode]
+        self.chunks.append(data)
+        self.size += len(data)
+        return section
+
+    def add_array(self, typecode: str, values: Sequence[Any]) -> Section:
+        return self.add(array(typecode, values).tobytes(), typecode)
+
+    def add_values(self, values: Sequence[Any]) -> Dict[str, Section]:
+        """A list of JSON values as an offsets array plus one blob (decoded per entry)."""
+        encoded = [_encode_value(v) for v in values]
+        offsets = [0]
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        return {"offsets": self.add_array("q", offsets), "blob": self.add(b"".join(encoded))}
+
+
+def _encode_column(writer: _SectionWriter, records: List[Dict[str, Any]], field: str) -> Dict[str, Any]:
+    present = [field in record for record in records]
+    values = [record.get(field) for record in records]
+
+    if all(present):
+        if all(type(v) is int for v in values) and all(-(2 ** 63) <= v < 2 ** 63 for v in values):
+            return {"kind": "int", "data": writer.add_array("q", values)}
+        if all(type(v) is float for v in values):
+            return {"kind": "float", "data": writer.add_array("d", values)}
+
+    # Everything else is dictionary-encoded; code -1 marks a missing field.
+    dictionary: List[Any] = []
+    lookup: Dict[bytes, int] = {}
+    codes: List[int] = []
+    for has_field, value in zip(present, values):
+        if not has_field:
+            codes.append(-1)
+            continue
+        key = _encode_value(value)
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(dictionary)
+            dictionary.append(value)
+        codes.append(code)
+    return {"kind": "dict", "data": writer.add_array("q", codes), "dictionary": writer.add_values(dictionary)}
+
+
+def _encode_postings(writer: _SectionWriter, postings: Postings) -> Dict[str, Any]:
+    keys = list(postings)
+    starts = [0]
+    row_ids: List[int] = []
+    for key in keys:
+        row_ids.extend(postings[key])
+        starts.append(len(row_ids))
+    return {
+        "keys": writer.add_values(keys),
+        "starts": writer.add_array("q", starts),
+        "row_ids": writer.add_array("q", row_ids),
+    }
+
+
+def compile_snapshot(
+    path: Path,
+    primary_key: Sequence[str] = (),
+    index_fields: Sequence[str] = (),
+    sort_fields: Sequence[str] = (),
+    output: Optional[Path] = None,
+) -> Path:
+    """Compile the JSON array at `path` into a snapshot file; returns its path."""
+    output = output or snapshot_path(path)
+    mtime_ns = os.stat(path).st_mtime_ns
+    raw = path.read_bytes()
+    records: List[Dict[str, Any]] = json.loads(raw)
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError(f"{path} is not a JSON array of objects")
+
+    fields: List[str] = []
+    seen = set()
+    for record in records:
+        for field in record:
+            if field not in seen:
+                seen.add(field)
+                fields.append(field)
+
+    writer = _SectionWriter()
+    dataset = Dataset(
+        records,
+        index_fields=index_fields,
+        sort_fields=sort_fields,
+        primary_key=primary_key,
+    )
+    header = {
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "source": {
+            "size": len(raw),
+            "mtime_ns": mtime_ns,
+            "blake2b": hashlib.blake2b(raw, digest_size=16).hexdigest(),
+        },
+        "rows": len(records),
+        "primary_key": list(primary_key),
+        "fields": fields,
+        "columns": {field: _encode_column(writer, records, field) for field in fields},
+        "indexes": {
+            field: _encode_postings(writer, postings) for field, postings in dataset.indexes.items()
+        },
+        "sort_indexes": {
+            field: {
+                "order": writer.add_array("q", index.order),
+                "ranks": writer.add_array("q", index.ranks),
+                "values": writer.add_values(index.values),
+            }
+            for field, index in dataset.sort_indexes.items()
+        },
+    }
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix_size = len(MAGIC) + _HEADER_LENGTH.size + len(header_bytes)
+    prefix_size += -prefix_size % _ALIGN
+    prefix = (MAGIC + _HEADER_LENGTH.pack(len(header_bytes)) + header_bytes).ljust(prefix_size, b"\0")
+
+    # Write-then-rename so readers never map a half-written snapshot.
+    tmp = output.with_name(output.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(prefix)
+        for chunk in writer.chunks:
+            f.write(chunk)
+    os.replace(tmp, output)
+    return output
+
+
+# -----------------------
+# READING
+# -----------------------
+
+class LazyValues(Sequence):
+    """
+    JSON values from a snapshot, decoded from the mapping on access. Only the
+    most recently used ones are kept decoded, so a process holds no per-value
+    state for large dictionaries beyond that bounded cache.
+    """
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+        self._length = len(offsets) - 1
+        self._decode = functools.lru_cache(maxsize=DECODED_VALUES_CACHE_SIZE)(self._decode_at)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _decode_at(self, i: int) -> Any:
+        return json.loads(bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError(i)
+        return self._decode(i)
+
+
+class SnapshotRecords(Sequence):
+    """Rows of a snapshot, rebuilt as dicts (in header field order) on access."""
+
+    def __init__(self, snapshot: "Snapshot"):
+        self.snapshot = snapshot
+        self.fields: List[str] = snapshot.header["fields"]
+        self._columns = [(field, *snapshot.column(field)) for field in self.fields]
+        self._length = snapshot.header["rows"]
+        self.nbytes = snapshot.nbytes
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _row(self, row_id: int, columns: Optional[List[tuple]] = None) -> Dict[str, Any]:
+        row: Dict[str, Any] = {}
+        for field, data, dictionary in self._columns if columns is None else columns:
+            value = data[row_id]
+            if dictionary is None:
+                row[field] = value
+            elif value >= 0:
+                row[field] = dictionary[value]
+        return row
+
+    def row_builder(self, fields: Sequence[str]) -> Callable[[int], Dict[str, Any]]:
+        """Row id -> dict of just `fields`; other columns are never read."""
+        by_field = {column[0]: column for column in self._columns}
+        columns = [by_field[field] for field in fields if field in by_field]
+        return lambda row_id: self._row(row_id, columns)
+
+    def __getitem__(self, row_id):
+        if isinstance(row_id, slice):
+            return [self._row(i) for i in range(*row_id.indices(len(self)))]
+        if row_id < 0:
+            row_id += len(self)
+        if not 0 <= row_id < len(self):
+            raise IndexError(row_id)
+        return self._row(row_id)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row_id in range(len(self)):
+            yield self._row(row_id)
+
+
+class _PrimaryKeys(Sequence):
+    """Primary-key tuple per row, read straight from the key columns."""
+
+    def __init__(self, snapshot: "Snapshot", primary_key: Sequence[str]):
+        self._columns = [snapshot.column(field) for field in primary_key]
+        self._length = snapshot.header["rows"]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, row_id):
+        return tuple(
+            data[row_id] if dictionary is None else (dictionary[data[row_id]] if data[row_id] >= 0 else None)
+            for data, dictionary in self._columns
+        )
+
+
+class Snapshot:
+    """A memory-mapped snapshot file. Views into it stay valid while it is referenced."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        (length,) = _HEADER_LENGTH.unpack_from(view, len(MAGIC))
+        start = len(MAGIC) + _HEADER_LENGTH.size
+        self.header: Dict[str, Any] = json.loads(bytes(view[start:start + length]))
+        data_start = start + length
+        data_start += -data_start % _ALIGN
+        self._data = view[data_start:]
+        self.nbytes = len(self._mmap)
+
+        if self.header.get("format") != FORMAT_VERSION or self.header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"{path} was built by an incompatible version or machine")
+
+    def array(self, section: Section) -> memoryview:
+        offset, length, typecode = section
+        return self._data[offset:offset + length].cast(typecode)
+
+    def values(self, sections: Dict[str, Section]) -> LazyValues:
+        return LazyValues(self.array(sections["offsets"]), self.array(sections["blob"]))
+
+    def column(self, field: str) -> Tuple[memoryview, Optional[LazyValues]]:
+        """(data, dictionary) for a column; dictionary is None for plain int/float columns."""
+        column = self.header["columns"][field]
+        dictionary = self.values(column["dictionary"]) if column["kind"] == "dict" else None
+        return self.array(column["data"]), dictionary
+
+    def is_fresh(self, source: Path) -> bool:
+        stamp = self.header["source"]
+        st = os.stat(source)
+        if st.st_size != stamp["size"]:
+            return False
+        if st.st_mtime_ns == stamp["mtime_ns"]:
+            return True
+        # Same size, new mtime (touched or copied): compare contents.
+        return file_digest(source) == stamp["blake2b"]
+
+    def records(self) -> SnapshotRecords:
+        return SnapshotRecords(self)
+
+    def primary_keys(self) -> _PrimaryKeys:
+        return _PrimaryKeys(self, self.header["primary_key"])
+
+    def indexes(self) -> Dict[str, Postings]:
+        indexes: Dict[str, Postings] = {}
+        for field, sections in self.header["indexes"].items():
+            keys = self.values(sections["keys"])
+            starts = self.array(sections["starts"])
+            row_ids = self.array(sections["row_ids"])
+            indexes[field] = {
+                keys[i]: row_ids[starts[i]:starts[i + 1]] for i in range(len(keys))
+            }
+        return indexes
+
+    def sort_indexes(self, tiebreak: Sequence[Tuple[Any, ...]]) -> Dict[str, SortIndex]:
+        return {
+            field: SortIndex.from_parts(
+                self.array(sections["order"]),
+                self.array(sections["ranks"]),
+                self.values(sections["values"]),
+                tiebreak,
+            )
+            for field, sections in self.header["sort_indexes"].items()
+        }
+
+    def dataset(
+        self,
+        index_fields: Sequence[str] = (),
+        sort_fields: Sequence[str] = (),
+        records: Optional[Sequence[Dict[str, Any]]] = None,
+        tiebreak: Optional[Sequence[Tuple[Any, ...]]] = None,
+    ) -> Dataset:
+        """
+        A `Dataset` over this snapshot using its prebuilt indexes. `records` /
+        `tiebreak` replace the generic row view (e.g. with typed columns).
+        """
+        primary_key = self.header["primary_key"]
+        if records is None:
+            records = self.records()
+        if tiebreak is None:
+            tiebreak = self.primary_keys() if primary_key else [(i,) for i in range(len(records))]
+        return Dataset(
+            records,
+            index_fields=index_fields,
+            sort_fields=sort_fields,
+            primary_key=primary_key,
+            tiebreak=tiebreak,
+            indexes=self.indexes(),
+            sort_indexes=self.sort_indexes(tiebreak),
+        )
+
+    def covers(
+        self,
+        primary_key: Sequence[str],
+        index_fields: Sequence[str],
+        sort_fields: Sequence[str],
+    ) -> bool:
+        """Whether the snapshot was built with (at least) these keys and indexes."""
+        return (
+            list(primary_key) == self.header["primary_key"]
+            and set(index_fields) <= set(self.header["indexes"])
+            and set(sort_fields) <= set(self.header["sort_indexes"])
+        )
+
+
+def _open_fresh(
+    path: Path,
+    primary_key: Sequence[str],
+    index_fields: Sequence[str],
+    sort_fields: Sequence[str],
+) -> Optional[Snapshot]:
+    snap = snapshot_path(path)
+    if not snap.exists():
+        return None
+    try:
+        snapshot = Snapshot(snap)
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable snapshot: %s", exc, extra={"path": snap})
+        return None
+    if not snapshot.covers(primary_key, index_fields, sort_fields) or not snapshot.is_fresh(path):
+        logger.info("Snapshot is stale", extra={"path": snap})
+        return None
+    return snapshot
+
+
+def publish_snapshot(
+    path: Path,
+    primary_key: Sequence[str] = (),
+    index_fields: Sequence[str] = (),
+    sort_fields: Sequence[str] = (),
+) -> Optional[Snapshot]:
+    """
+    Map a fresh snapshot of `path`, compiling it first unless another process
+    already did. The new file replaces the old one by rename: processes still
+    mapping the previous version keep reading it until they reload. Returns
+    None if the snapshot cannot be built (the caller parses the JSON).
+    """
+    with snapshot_lock(path):
+        snapshot = _open_fresh(path, primary_key, index_fields, sort_fields)
+        if snapshot is not None:
+            return snapshot
+        try:
+            output = compile_snapshot(path, primary_key, index_fields, sort_fields)
+        except (OSError, ValueError) as exc:
+            logger.warning("Snapshot build failed: %s", exc, extra={"path": path})
+            return None
+        logger.info("Snapshot published", extra={"path": output})
+        return _open_fresh(path, primary_key, index_fields, sort_fields)
+
+
+def open_snapshot(
+    path: Path,
+    primary_key: Sequence[str] = (),
+    index_fields: Sequence[str] = (),
+    sort_fields: Sequence[str] = (),
+) -> Optional[Snapshot]:
+    """
+    The snapshot for data file `path` if one exists, is fresh and was built
+    with the given keys/indexes. Otherwise it is published first when
+    SHARED_DATASETS is on, or None is returned (the caller parses the JSON).
+    """
+    if not settings.SNAPSHOTS_ENABLED:
+        return None
+    snapshot = _open_fresh(path, primary_key, index_fields, sort_fields)
+    if snapshot is None and settings.SHARED_DATASETS:
+        snapshot = publish_snapshot(path, primary_key, index_fields, sort_fields)
+    return snapshot
+
+
+def load_dataset(
+    path: Path,
+    primary_key: Sequence[str] = (),
+    index_fields: Sequence[str] = (),
+    sort_fields: Sequence[str] = (),
+) -> Optional[Dataset]:
+    """`DatasetCache` loader: a `Dataset` served from a fresh snapshot, or None."""
+    snapshot = open_snapshot(path, primary_key, index_fields, sort_fields)
+    if snapshot is None:
+        return None
+    return snapshot.dataset(index_fields, sort_fields)
+
+
+# -----------------------
+# CLI
+# -----------------------
+
+def _sources() -> Dict[str, Any]:
+    # Imported here: the connector modules import this one.
+    from . import analytics_connector, crm_connector, support_connector
+
+    return {
+        "crm": crm_connector,
+        "support": support_connector,
+        "analytics": analytics_connector,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    sources = _sources()
+    parser = argparse.ArgumentParser(description="Compile data files into binary snapshots.")
+    parser.add_argument("sources", nargs="*", metavar="SOURCE", help=f"{', '.join(sorted(sources))} (default: all)")
+    args = parser.parse_args(argv)
+    unknown = set(args.sources) - set(sources)
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(sorted(unknown))}")
+
+    for name in args.sources or sorted(sources):
+        module = sources[name]
+        start = time.perf_counter()
+        with snapshot_lock(module.DATA_PATH):
+            output = compile_snapshot(
+                module.DATA_PATH,
+                primary_key=module.PRIMARY_KEY,
+                index_fields=module.INDEX_FIELDS,
+                sort_fields=module.SORT_FIELDS,
+            )
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{name}: {output} ({output.stat().st_size} bytes, {elapsed_ms:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+SQLite-backed connectors for the CRM, support and analytics schemas.
+
+Each source is one table whose columns come from its pydantic model
+(`app/models/*.py`), with indexes on the filter fields and on every sort
+field (plus the primary key, so keyset pages are index seeks). Filtering,
+ordering, LIMIT/OFFSET and COUNT all run in SQL; only the page comes back.
+
+Build or refresh the database from `data/*.json` with:
+
+    python -m app.connectors.sqlite_connector [crm support analytics] [--db PATH]
+
+and set CONNECTOR_BACKEND=sqlite. The database uses WAL mode, so an import
+can replace a table while readers keep answering from the previous version.
+Fields not in the model are not stored.
+"""
+
+from __future__ import annotations
+
+import argparse
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.models.analytics import AnalyticsMetric
+from app.models.crm import CRMCustomer
+from app.models.support import SupportTicket
+from app.utils.metrics import metrics
+
+from . import analytics_connector, crm_connector, support_connector
+from .base import BaseConnector
+from .cache import file_signature
+from .columnar import MetricSeries
+from .query import CursorError, QueryPlan, QueryResult, project
+from .stream import iter_json_array
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+# Rows per executemany() call when importing.
+IMPORT_BATCH_SIZE = 10_000
+
+
+def database_path() -> Path:
+    path = Path(settings.SQLITE_PATH)
+    return path if path.is_absolute() else BASE_DIR / path
+
+
+# -----------------------
+# SCHEMA
+# -----------------------
+
+@dataclass(frozen=True)
+class SQLiteTable:
+    """One source's table: columns from `model`, keys/indexes from its JSON connector."""
+
+    name: str
+    model: Type[BaseModel]
+    primary_key: Tuple[str, ...]
+    index_fields: Tuple[str, ...]
+    sort_fields: Tuple[str, ...]
+    json_path: Path
+    # Column filtered by the `start_date` / `end_date` range filters, if any.
+    date_field: Optional[str] = None
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(self.model.model_fields)
+
+    def column_type(self, column: str) -> str:
+        annotation = self.model.model_fields[column].annotation
+        if annotation is int:
+            return "INTEGER"
+        if annotation is float:
+            return "REAL"
+        # Dates/timestamps stay ISO strings, exactly as in the JSON files.
+        return "TEXT"
+
+
+CRM_TABLE = SQLiteTable(
+    name="crm",
+    model=CRMCustomer,
+    primary_key=crm_connector.PRIMARY_KEY,
+    index_fields=crm_connector.INDEX_FIELDS,
+    sort_fields=crm_connector.SORT_FIELDS,
+    json_path=crm_connector.DATA_PATH,
+)
+SUPPORT_TABLE = SQLiteTable(
+    name="support",
+    model=SupportTicket,
+    primary_key=support_connector.PRIMARY_KEY,
+    index_fields=support_connector.INDEX_FIELDS,
+    sort_fields=support_connector.SORT_FIELDS,
+    json_path=support_connector.DATA_PATH,
+)
+ANALYTICS_TABLE = SQLiteTable(
+    name="analytics",
+    model=AnalyticsMetric,
+    primary_key=analytics_connector.PRIMARY_KEY,
+    index_fields=analytics_connector.INDEX_FIELDS,
+    sort_fields=analytics_connector.SORT_FIELDS,
+    json_path=analytics_connector.DATA_PATH,
+    date_field="date",
+)
+
+TABLES = {table.name: table for table in (CRM_TABLE, SUPPORT_TABLE, ANALYTICS_TABLE)}
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+# -----------------------
+# CONNECTIONS
+# -----------------------
+
+def connect(path: Path, readonly: bool = True) -> sqlite3.Connection:
+    # Connections are handed between connector-pool threads, never shared at once.
+    if readonly:
+        return sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class ConnectionPool:
+    """Up to `size` read-only connections, opened on first use and reused."""
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, size))
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = connect(self.path)
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != database_path():
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(database_path(), settings.SQLITE_POOL_SIZE)
+        return _pool
+
+
+# -----------------------
+# QUERIES
+# -----------------------
+
+def _date_bound(value: date | str) -> str:
+    # Same validation as the JSON connector (ValueError on bad input).
+    return (value if isinstance(value, date) else date.fromisoformat(value)).isoformat()
+
+
+def where_clause(table: SQLiteTable, filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Equality filters on known columns plus the optional date range; empty values are ignored."""
+    conditions: List[str] = []
+    params: List[Any] = []
+    for field, value in filters.items():
+        if not value:
+            continue
+        if table.date_field is not None and field in ("start_date", "end_date"):
+            op = ">=" if field == "start_date" else "<="
+            conditions.append(f"{_quote(table.date_field)} {op} ?")
+            params.append(_date_bound(value))
+        elif field in table.columns:
+            conditions.append(f"{_quote(field)} = ?")
+            params.append(value)
+    return " AND ".join(conditions), params
+
+
+class SQLiteConnector(BaseConnector):
+    """`BaseConnector` over one table of the SQLite database."""
+
+    def __init__(self, table: SQLiteTable):
+        self.table = table
+        self.primary_key = table.primary_key
+
+    def _select_sql(self, plan: QueryPlan) -> Tuple[str, List[Any], Tuple[str, ...]]:
+        """SELECT for the plan's rows (no window), its params and selected columns."""
+        table = self.table
+        where, params = where_clause(table, plan.filters)
+        conditions = [where] if where else []
+
+        columns = table.columns if plan.fields is None else tuple(f for f in plan.fields if f in table.columns)
+        if plan.sort_key is None:
+            order_by = "rowid"  # file order
+        else:
+            if plan.sort_key not in table.columns:
+                raise ValueError(f"Unknown sort field {plan.sort_key!r}.")
+            sort = _quote(plan.sort_key)
+            keys = ", ".join(_quote(f) for f in table.primary_key)
+            # Ties always break on the primary key ascending, as in `Dataset`.
+            order_by = f"{sort} {'DESC' if plan.descending else 'ASC'}" + (f", {keys}" if keys else "")
+            # The page's last sort position is needed for the next cursor.
+            columns += tuple(f for f in (plan.sort_key, *table.primary_key) if f not in columns)
+            if plan.after is not None:
+                value, tiebreak = plan.after
+                if len(tiebreak) != len(table.primary_key):
+                    raise CursorError("Cursor does not match the primary key.")
+                op = "<" if plan.descending else ">"
+                tie = f"({keys}) > ({', '.join('?' * len(tiebreak))})"
+                conditions.append(f"({sort} {op} ? OR ({sort} = ? AND {tie}))")
+                params += [value, value, *tiebreak]
+
+        sql = f"SELECT {', '.join(_quote(c) for c in columns)} FROM {_quote(table.name)}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return sql + f" ORDER BY {order_by}", params, columns
+
+    def _count(self, conn: sqlite3.Connection, filters: Dict[str, Any]) -> int:
+        where, params = where_clause(self.table, filters)
+        sql = f"SELECT COUNT(*) FROM {_quote(self.table.name)}" + (f" WHERE {where}" if where else "")
+        return conn.execute(sql, params).fetchone()[0]
+
+    def fetch(self, **filters) -> List[Dict[str, Any]]:
+        return self.execute(QueryPlan(filters=filters)).rows
+
+    def execute(self, plan: QueryPlan) -> QueryResult:
+        start = metrics.clock()
+        sql, params, columns = self._select_sql(plan)
+        if plan.limit is not None:
+            # One extra row tells whether another page follows.
+            sql += " LIMIT ? OFFSET ?"
+            params += [plan.limit + 1, plan.offset]
+        elif plan.offset:
+            sql += " LIMIT -1 OFFSET ?"
+            params.append(plan.offset)
+
+        with get_pool().connection() as conn:
+            rows = [dict(zip(columns, row)) for row in conn.execute(sql, params)]
+            total = self._count(conn, plan.filters)
+
+        has_more = plan.limit is not None and len(rows) > plan.limit
+        if has_more:
+            rows.pop()
+        last_key = None
+        if plan.sort_key is not None and rows:
+            last = rows[-1]
+            last_key = (last[plan.sort_key], tuple(last[f] for f in self.primary_key))
+
+        metrics.lap(self.table.name, "query", start)
+        metrics.count_rows(self.table.name, scanned=total, returned=len(rows))
+        return QueryResult(
+            rows=project(rows, plan.fields),
+            total=total,
+            has_more=has_more,
+            last_key=last_key,
+        )
+
+    def iter_rows(self, plan: QueryPlan) -> Iterator[Dict[str, Any]]:
+        # Exports can run for a long time, so they read on their own
+        # connection instead of holding one of the pooled readers.
+        sql, params, columns = self._select_sql(plan)
+        conn = connect(database_path())
+        cursor = conn.execute(sql, params)
+
+        def rows() -> Iterator[Dict[str, Any]]:
+            try:
+                window = islice(cursor, plan.offset, plan.end)
+                for row in window:
+                    record = dict(zip(columns, row))
+                    yield record if plan.fields is None else {f: record[f] for f in plan.fields if f in record}
+            finally:
+                conn.close()
+
+        return rows()
+
+    def _files(self) -> List[Path]:
+        path = database_path()
+        return [path, path.with_name(path.name + "-wal")]
+
+    def data_version(self) -> str | None:
+        # Commits in WAL mode touch the -wal file before the database itself.
+        database, wal = self._files()
+        try:
+            parts = list(file_signature(database))
+        except OSError:
+            return None
+        try:
+            parts += file_signature(wal)
+        except OSError:
+            pass
+        return "-".join(str(part) for part in parts)
+
+    def last_updated(self) -> datetime | None:
+        times = []
+        for path in self._files():
+            try:
+                times.append(path.stat().st_mtime)
+            except OSError:
+                pass
+        if not times:
+            return None
+        return datetime.fromtimestamp(max(times), tz=timezone.utc)
+
+
+class SQLiteAnalyticsConnector(SQLiteConnector):
+
+    def __init__(self) -> None:
+        super().__init__(ANALYTICS_TABLE)
+
+    def series(self, metric: str) -> Optional[MetricSeries]:
+        """Date-ordered columns for one metric (for the aggregation endpoint)."""
+        sql = f'SELECT "date", "value", rowid FROM {_quote(self.table.name)} WHERE "metric" = ? ORDER BY "date", rowid'
+        with get_pool().connection() as conn:
+            points = [
+                (date.fromisoformat(raw_date).toordinal(), value, row_id)
+                for raw_date, value, row_id in conn.execute(sql, (metric,))
+            ]
+        if not points:
+            return None
+        return MetricSeries.from_points(*(list(column) for column in zip(*points)))
+
+
+# -----------------------
+# IMPORT
+# -----------------------
+
+def import_json(
+    table: SQLiteTable,
+    db_path: Optional[Path] = None,
+    json_path: Optional[Path] = None,
+) -> int:
+    """
+    (Re)create `table` from a JSON array file in one transaction, streaming
+    the file in batches; indexes are built after the bulk insert. Returns the
+    number of rows imported.
+    """
+    db_path = db_path or database_path()
+    json_path = json_path or table.json_path
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    name = _quote(table.name)
+    columns = table.columns
+
+    conn = connect(db_path, readonly=False)
+    # sqlite3 commits DDL immediately under its default isolation level, so
+    # readers could see the table dropped or empty mid-import. Manage the
+    # transaction explicitly instead: readers keep the old table until COMMIT.
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+            definitions = ", ".join(f"{_quote(c)} {table.column_type(c)}" for c in columns)
+            conn.execute(f"CREATE TABLE {name} ({definitions})")
+
+            insert = f"INSERT INTO {name} VALUES ({', '.join('?' * len(columns))})"
+            records = iter_json_array(json_path)
+            count = 0
+            while True:
+                batch = [tuple(record.get(c) for c in columns) for record in islice(records, IMPORT_BATCH_SIZE)]
+                if not batch:
+                    break
+                conn.executemany(insert, batch)
+                count += len(batch)
+
+            for field in table.index_fields:
+                conn.execute(f"CREATE INDEX {_quote(f'{table.name}_{field}')} ON {name} ({_quote(field)})")
+            for field in table.sort_fields:
+                keys = ", ".join(_quote(f) for f in dict.fromkeys((field, *table.primary_key)))
+                conn.execute(f"CREATE INDEX {_quote(f'{table.name}_by_{field}')} ON {name} ({keys})")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import data/*.json into the SQLite connector database.")
+    parser.add_argument("sources", nargs="*", help=f"sources to import (default: all of {', '.join(TABLES)})")
+    parser.add_argument("--db", type=Path, help="database file (default: SQLITE_PATH)")
+    args = parser.parse_args()
+
+    unknown = set(args.sources) - set(TABLES)
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(sorted(unknown))}")
+
+    for name in args.sources or list(TABLES):
+        start = time.perf_counter()
+        count = import_json(TABLES[name], db_path=args.db)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"{name}: {count} rows -> {args.db or database_path()} ({elapsed_ms:.0f}ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import codecs
+import heapq
+import json
+import mmap
+import os
+import re
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Sequence
+
+from app.config import settings
+from app.services.business_rules import value_key
+
+from .query import QueryPlan, QueryResult, is_after, project, project_row
+
+
+CHUNK_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decode_value = json.JSONDecoder().raw_decode
+
+
+def use_streaming(path: Path) -> bool:
+    """Whether `path` is large enough to be scanned incrementally instead of loaded."""
+    threshold = settings.STREAMING_MIN_FILE_BYTES
+    return threshold > 0 and os.stat(path).st_size >= threshold
+
+
+def iter_json_array(path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time. The file is
+    memory-mapped and decoded `chunk_size` bytes at a time, so memory follows
+    the largest element rather than the file. Stopping early stops the read.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise json.JSONDecodeError("Expecting value", "", 0)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from _iter_elements(mapped, chunk_size)
+
+
+def _iter_elements(data: mmap.mmap, chunk_size: int) -> Iterator[Any]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    size = len(data)
+    read = 0
+    text = ""
+    pos = 0
+
+    def fill() -> bool:
+        # Drop the consumed prefix and append the next decoded chunk.
+        nonlocal text, pos, read
+        if read >= size:
+            return False
+        chunk = data[read:read + chunk_size]
+        read += len(chunk)
+        text = text[pos:] + decoder.decode(chunk, final=read >= size)
+        pos = 0
+        return True
+
+    def next_token() -> str:
+        # First non-whitespace character at or after `pos` ("" at end of file).
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos < len(text) or not fill():
+                return text[pos:pos + 1]
+
+    if next_token() != "[":
+        raise json.JSONDecodeError("Expecting a top-level JSON array", text, pos)
+    pos += 1
+
+    first = True
+    while True:
+        token = next_token()
+        if token == "]" and first:
+            pos += 1
+            break
+        if not first:
+            if token == "]":
+                pos += 1
+                break
+            if token != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, pos)
+            pos += 1
+            next_token()
+
+        while True:
+            try:
+                value, end = _decode_value(text, pos)
+            except json.JSONDecodeError:
+                # Most likely an element cut by the chunk boundary.
+                if not fill():
+                    raise
+                continue
+            # A value ending exactly at the buffer end may be a truncated number.
+            if end == len(text) and fill():
+                continue
+            break
+        pos = end
+        first = False
+        yield value
+
+    if next_token():
+        raise json.JSONDecodeError("Extra data", text, pos)
+
+
+def match_rows(rows: Iterable[Dict[str, Any]], **equals: Any) -> Iterator[Dict[str, Any]]:
+    """Rows whose fields equal every non-None value given (streaming `Dataset.match`)."""
+    equals = {field: value for field, value in equals.items() if value is not None}
+    if not equals:
+        return iter(rows)
+    return (row for row in rows if all(row.get(f) == v for f, v in equals.items()))
+
+
+class _Reversed:
+    """Inverts ordering of a sort value, so descending keys can share a heap."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __eq__(self, other: object) -> bool:
+        return self.value == other.value  # type: ignore[attr-defined]
+
+    def __lt__(self, other: "_Reversed") -> bool:
+        return other.value < self.value
+
+
+def execute_stream(
+    rows: Iterable[Dict[str, Any]],
+    plan: QueryPlan,
+    primary_key: Sequence[str] = (),
+) -> QueryResult:
+    """
+    Run `plan` over filtered rows in a single pass, holding at most one page
+    window. Unsorted plans stop reading as soon as the page (plus one row, to
+    set `has_more`) is complete, so their `total` is only a lower bound.
+    Sorted plans read everything through a bounded heap.
+    """
+    end = plan.end
+
+    if plan.sort_key is None:
+        seen = 0
+        page = []
+        has_more = False
+        for row in rows:
+            seen += 1
+            if seen <= plan.offset:
+                continue
+            if end is not None and seen > end:
+                has_more = True
+                break
+            page.append(row)
+        return QueryResult(
+            rows=project(page, plan.fields),
+            total=seen,
+            has_more=has_more,
+            total_exact=not has_more,
+        )
+
+    total = 0
+    remaining = 0
+    after = plan.after
+    if after is not None:
+        after = (after[0], tuple(after[1]))
+
+    def candidates() -> Iterator[tuple]:
+        nonlocal total, remaining
+        for row_id, row in enumerate(rows):
+            total += 1
+            # Same tie-breaker as `Dataset`: the primary key, else file order.
+            tiebreak = tuple(row.get(f) for f in primary_key) if primary_key else (row_id,)
+            position = (row.get(plan.sort_key), tiebreak)
+            if after is not None and not is_after(position, after, plan.descending):
+                continue
+            remaining += 1
+            yield position, row
+
+    if plan.descending:
+        key = lambda item: (_Reversed(value_key(item[0][0])), item[0][1])  # noqa: E731
+    else:
+        key = lambda item: (value_key(item[0][0]), item[0][1])  # noqa: E731
+
+    if end is None:
+        window = sorted(candidates(), key=key)
+    else:
+        window = heapq.nsmallest(end, candidates(), key=key)
+    page = window[plan.offset:]
+
+    return QueryResult(
+        rows=project([row for _, row in page], plan.fields),
+        total=total,
+        has_more=end is not None and end < remaining,
+        last_key=page[-1][0] if page else None,
+    )
+
+
+def iter_stream(
+    rows: Iterable[Dict[str, Any]],
+    plan: QueryPlan,
+    primary_key: Sequence[str] = (),
+) -> Iterator[Dict[str, Any]]:
+    """Lazy counterpart of `execute_stream` for exports; unsorted plans never buffer."""
+    if plan.sort_key is None:
+        return (project_row(row, plan.fields) for row in islice(rows, plan.offset, plan.end))
+    return iter(execute_stream(rows, plan, primary_key).rows)
+
@@ -1,33 +1,52 @@
-import json
+from functools import partial
 from pathlib import Path
-from datetime import datetime, timezone
-from typing import List, Dict, Any
 
-from .base import BaseConnector
+from .columnar import compact_dataset
+from .file_connector import FileConnector
+from .snapshot import load_dataset
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 DATA_PATH = BASE_DIR / "data" / "support_tickets.json"
 
-
-class SupportConnector(BaseConnector):
-
-    def fetch(self, status=None, priority=None, **kwargs) -> List[Dict[str, Any]]:
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        if status:
-            data = [d for d in data if d.get("status") == status]
-
-        if priority:
-            data = [d for d in data if d.get("priority") == priority]
-
-        return data
-
-    def last_updated(self) -> datetime | None:
-        try:
-            ts = DATA_PATH.stat().st_mtime
-        except OSError:
-            return None
-        return datetime.fromtimestamp(ts, tz=timezone.utc)
-
+SOURCE = "support"
+PRIMARY_KEY = ("ticket_id",)
+INDEX_FIELDS = ("status", "priority")
+SORT_FIELDS = (
+    "ticket_id",
+    "customer_id",
+    "subject",
+    "priority",
+    "created_at",
+    "status",
+)
+# Low-cardinality / timestamp fields for the compact column store.
+ENUM_FIELDS = ("status", "priority")
+TIMESTAMP_FIELDS = ("created_at",)
+
+
+build_dataset = partial(
+    compact_dataset,
+    index_fields=INDEX_FIELDS,
+    sort_fields=SORT_FIELDS,
+    primary_key=PRIMARY_KEY,
+    enum_fields=ENUM_FIELDS,
+    timestamp_fields=TIMESTAMP_FIELDS,
+)
+load_snapshot = partial(
+    load_dataset,
+    primary_key=PRIMARY_KEY,
+    index_fields=INDEX_FIELDS,
+    sort_fields=SORT_FIELDS,
+)
+
+
+class SupportConnector(FileConnector):
+
+    source = SOURCE
+    data_path = DATA_PATH
+    primary_key = PRIMARY_KEY
+    index_fields = INDEX_FIELDS
+    sort_fields = SORT_FIELDS
+    build_dataset = build_dataset
+    load_snapshot = load_snapshot
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.logging import get_logger
+
+from .base import BaseConnector
+
+try:  # optional: event-driven watching on Linux
+    from inotify_simple import INotify, flags
+except ImportError:  # pragma: no cover - exercised when inotify_simple is absent
+    INotify = None
+
+
+logger = get_logger(__name__)
+
+
+class DataWatcher:
+    """
+    Background thread that keeps file-backed connectors current. It reacts to
+    inotify events when `inotify_simple` is available and polls file
+    signatures every `interval` seconds otherwise. Each change is applied via
+    `connector.refresh()`, which builds the new version beside the old one and
+    swaps it in; requests keep reading the old version until then.
+    """
+
+    def __init__(self, connectors: Iterable[BaseConnector], interval: float = 1.0):
+        self.connectors = [c for c in connectors if c.data_path is not None]
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        # Load and pin everything up front so the first requests are warm.
+        self.poll()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def poll(self, connectors: Optional[Iterable[BaseConnector]] = None) -> List[BaseConnector]:
+        """Refresh the given connectors (default: all); returns those that changed."""
+        changed = []
+        for connector in self.connectors if connectors is None else connectors:
+            try:
+                if connector.refresh():
+                    changed.append(connector)
+                    logger.info("Data reloaded", extra={"path": connector.data_path})
+            except Exception:
+                # Typically a file caught mid-write; retried on the next event/poll.
+                logger.exception("Data reload failed", extra={"path": connector.data_path})
+        return changed
+
+    def _run(self) -> None:
+        if INotify is not None:
+            self._run_inotify()
+            return
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def _run_inotify(self) -> None:
+        inotify = INotify()
+        watched: Dict[Tuple[int, str], BaseConnector] = {}
+        directories: Dict[str, int] = {}
+        # Watch directories, not files: writers often replace files by rename.
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.DELETE
+        for connector in self.connectors:
+            directory = str(connector.data_path.parent)
+            if directory not in directories:
+                directories[directory] = inotify.add_watch(directory, mask)
+            watched[(directories[directory], connector.data_path.name)] = connector
+
+        try:
+            while not self._stop.is_set():
+                events = inotify.read(timeout=int(self.interval * 1000))
+                touched = {watched[key] for key in ((e.wd, e.name) for e in events) if key in watched}
+                if touched:
+                    self.poll(touched)
+        finally:
+            inotify.close()
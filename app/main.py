@@ -3,46 +3,121 @@ from __future__ import annotations
 
 import time
 import uuid
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.routers import health, data
-from app.utils.logging import configure_logging, get_logger
+from app.config import settings
+from app.connectors.watcher import DataWatcher
+from app.routers import health, data, metrics
+from app.utils.logging import configure_logging, get_logger, sample_access_log
+from app.utils.profiling import RequestProfile, should_profile
 
 configure_logging()
 logger = get_logger("app")
+access_logger = get_logger("app.access")
 
-app = FastAPI(title="Universal Data Connector")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    watcher = None
+    if settings.DATA_WATCH_INTERVAL_SECONDS > 0:
+        watcher = DataWatcher(data.connector_map.values(), settings.DATA_WATCH_INTERVAL_SECONDS)
+        watcher.start()
+    try:
+        yield
+    finally:
+        if watcher is not None:
+            watcher.stop()
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+
+app = FastAPI(title="Universal Data Connector", lifespan=lifespan)
+
+
+class RequestLoggingMiddleware:
+    """
+    Request id propagation, timing/access logging, 500 shaping and on-demand
+    profiling, as a plain ASGI middleware: the app runs in the caller's task
+    and response messages pass straight through, so streamed bodies are not
+    buffered or re-wrapped.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id") or str(uuid.uuid4())
         start = time.perf_counter()
+        profile = None
+        if should_profile(headers.get("x-profile")):
+            profile = RequestProfile.start(request_id)
+        status_code = 500
+        response_started = False
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                response_headers = MutableHeaders(scope=message)
+                response_headers["x-request-id"] = request_id
+                if profile is not None:
+                    # Streaming responses send from a child task, so the
+                    # profile is finished below, in this task, once the body
+                    # is done; its file name is already known here.
+                    response_headers["x-profile-file"] = profile.path.name
+            await send(message)
+
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_with_request_id)
         except Exception:
             duration_ms = int((time.perf_counter() - start) * 1000)
             logger.exception(
-                f"Unhandled error | request_id={request_id} | {request.method} {request.url.path} | {duration_ms}ms"
+                "Unhandled error",
+                extra={
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "duration_ms": duration_ms,
+                },
             )
-            return JSONResponse(
+            if response_started:
+                raise
+            response = JSONResponse(
                 status_code=500,
                 content={
                     "detail": "Internal server error",
                     "request_id": request_id,
                 },
             )
+            await response(scope, receive, send_with_request_id)
+            return
+        finally:
+            if profile is not None:
+                profile.finish()
 
+        if status_code < 500 and not sample_access_log():
+            return
         duration_ms = int((time.perf_counter() - start) * 1000)
-        logger.info(
-            f"Request | request_id={request_id} | {request.method} {request.url.path} | {response.status_code} | {duration_ms}ms"
+        access_logger.info(
+            "Request",
+            extra={
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": duration_ms,
+            },
         )
-        response.headers["x-request-id"] = request_id
-        return response
 
 
 app.add_middleware(RequestLoggingMiddleware)
@@ -51,9 +126,13 @@ app.add_middleware(RequestLoggingMiddleware)
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     # Compact validation error shape; includes request path for debugging.
-    logger.warning(f"Validation error | {request.method} {request.url.path} | {exc.errors()}")
+    logger.warning(
+        "Validation error",
+        extra={"method": request.method, "path": request.url.path, "errors": exc.errors()},
+    )
     return JSONResponse(status_code=422, content={"detail": exc.errors()})
 
 
 app.include_router(health.router)
 app.include_router(data.router)
+app.include_router(metrics.router)
@@ -1,8 +1,26 @@
 from pydantic import BaseModel
 from datetime import date
+from typing import List, Optional, Union
 
 
 class AnalyticsMetric(BaseModel):
     metric: str
     date: date
     value: int
+
+
+class AggregateBucket(BaseModel):
+    start: date
+    end: date
+    count: int
+    value: Union[int, float]
+
+
+class AggregateResponse(BaseModel):
+    source: str
+    metric: str
+    agg: str
+    group_by: Optional[str] = None
+    points: Optional[int] = None
+    buckets: List[AggregateBucket]
+    voice_hint: Optional[str] = None
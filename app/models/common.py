@@ -1,19 +1,24 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Any, List, Optional
 
+from app.config import settings
+
 
 class Metadata(BaseModel):
     total_results: int
-    page: int
+    # Offset pagination only; null on cursor (keyset) pages.
+    page: Optional[int]
     page_size: int
     returned_results: int
-    total_pages: int
+    total_pages: Optional[int]
     has_more: bool
     data_freshness: str
     # Optional voice/context helpers
     data_last_updated: Optional[str] = None
     data_staleness_seconds: Optional[int] = None
     voice_hint: Optional[str] = None
+    # Keyset pagination: pass back as `cursor` to fetch the next page.
+    next_cursor: Optional[str] = None
 
 
 class DataResponse(BaseModel):
@@ -22,3 +27,41 @@ class DataResponse(BaseModel):
     data: List[Any]
     metadata: Metadata
 
+
+class DataQuery(BaseModel):
+    """One `/data` query; mirrors the GET /data query parameters."""
+
+    source: str
+    page: int = Field(1, ge=1)
+    page_size: int = Field(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE)
+    voice_mode: bool = True
+    summarize: bool = False
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    metric: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    sort_by: Optional[str] = None
+    order: str = Field("desc", pattern="^(asc|desc)$")
+    cursor: Optional[str] = None
+    # Comma-separated projection, e.g. "name,status"; None returns every field.
+    fields: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    queries: List[DataQuery] = Field(..., min_length=1, max_length=settings.MAX_BATCH_QUERIES)
+
+
+class BatchError(BaseModel):
+    status_code: int
+    detail: Any
+
+
+class BatchItem(BaseModel):
+    # Exactly one of `response` / `error` is set.
+    response: Optional[DataResponse] = None
+    error: Optional[BatchError] = None
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchItem]
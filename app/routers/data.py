@@ -1,23 +1,65 @@
 
 
-from fastapi import APIRouter, Query, HTTPException
+import asyncio
+import json
+from dataclasses import dataclass
+
+from fastapi import APIRouter, Query, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from enum import Enum
-from typing import Optional
-from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from datetime import date, datetime, timezone
 
 from app.connectors.crm_connector import CRMConnector
 from app.connectors.support_connector import SupportConnector
 from app.connectors.analytics_connector import AnalyticsConnector
-
-from app.models.common import DataResponse, Metadata
+from app.connectors.base import BaseConnector, run_in_connector_pool
+from app.connectors.sqlite_connector import (
+    CRM_TABLE,
+    SUPPORT_TABLE,
+    SQLiteAnalyticsConnector,
+    SQLiteConnector,
+)
+from app.connectors.query import CursorError, QueryPlan
+
+from app.models.analytics import AggregateResponse
+from app.models.common import (
+    BatchError,
+    BatchItem,
+    BatchRequest,
+    BatchResponse,
+    DataQuery,
+    DataResponse,
+    Metadata,
+)
+from app.services.aggregation import aggregate_series, parse_aggregation
+from app.services.coalescing import SingleFlight
 from app.services.data_identifier import identify_data_type
 from app.services.business_rules import (
+    decode_cursor,
+    encode_cursor,
     enforce_page_size,
-    paginate,
+    page_counts,
+    page_window,
     should_summarize,
 )
-from app.services.voice_optimizer import summarize_for_voice
+from app.services.response_cache import (
+    CachedBody,
+    ResponseCache,
+    cache_key,
+    etag_matches,
+    http_date,
+    make_etag,
+    not_modified_since,
+)
+from app.services.voice_optimizer import (
+    normalize_for_voice,
+    summarize_for_voice,
+    summary_projection,
+)
 from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+from app.utils.serialization import FastJSONResponse
 from app.config import settings
 
 logger = get_logger(__name__)
@@ -49,11 +91,18 @@ class DataSource(str, Enum):
 # CONNECTOR MAP
 # -----------------------
 
-connector_map = {
-    DataSource.crm: CRMConnector(),
-    DataSource.support: SupportConnector(),
-    DataSource.analytics: AnalyticsConnector(),
-}
+if settings.CONNECTOR_BACKEND == "sqlite":
+    connector_map = {
+        DataSource.crm: SQLiteConnector(CRM_TABLE),
+        DataSource.support: SQLiteConnector(SUPPORT_TABLE),
+        DataSource.analytics: SQLiteAnalyticsConnector(),
+    }
+else:
+    connector_map = {
+        DataSource.crm: CRMConnector(),
+        DataSource.support: SupportConnector(),
+        DataSource.analytics: AnalyticsConnector(),
+    }
 
 
 # -----------------------
@@ -66,19 +115,80 @@ SOURCE_ALLOWED_FILTERS = {
     DataSource.analytics: {"metric", "start_date", "end_date"},
 }
 
-SOURCE_ALLOWED_SORT_FIELDS = {
-    DataSource.crm: {"customer_id", "name", "email", "created_at", "status"},
-    DataSource.support: {
+SOURCE_FIELDS = {
+    DataSource.crm: ("customer_id", "name", "email", "created_at", "status"),
+    DataSource.support: (
         "ticket_id",
         "customer_id",
         "subject",
         "priority",
         "created_at",
         "status",
-    },
-    DataSource.analytics: {"metric", "date", "value"},
+    ),
+    DataSource.analytics: ("metric", "date", "value"),
 }
 
+SOURCE_ALLOWED_SORT_FIELDS = {source: set(fields) for source, fields in SOURCE_FIELDS.items()}
+
+
+# -----------------------
+# SHARED VALIDATION
+# -----------------------
+
+def validate_filters(source: DataSource, provided_filters: Dict[str, Any]) -> None:
+    allowed_filters = SOURCE_ALLOWED_FILTERS[source]
+
+    for key, value in provided_filters.items():
+        if value is not None and key not in allowed_filters:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Filter '{key}' is not allowed for source '{source.value}'."
+            )
+
+
+def parse_date_range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[Optional[date], Optional[date]]:
+    """Parse optional YYYY-MM-DD bounds (empty means unbounded); 400 if malformed."""
+    try:
+        start = date.fromisoformat(start_date) if start_date else None
+        end = date.fromisoformat(end_date) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD.")
+    return start, end
+
+
+def resolve_sort(source: DataSource, sort_by: Optional[str], order: str) -> Tuple[str, str]:
+    allowed_sort_fields = SOURCE_ALLOWED_SORT_FIELDS[source]
+
+    if sort_by is not None:
+        if sort_by not in allowed_sort_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot sort by '{sort_by}' for source '{source.value}'."
+            )
+        return sort_by, order
+
+    # Default prioritization: most recent first when available
+    if source == DataSource.analytics:
+        return "date", "desc"
+    return "created_at", "desc"
+
+
+def resolve_fields(source: DataSource, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Parse a comma-separated `fields` selection; None means every field."""
+    if fields is None:
+        return None
+    selected = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    if not selected:
+        raise HTTPException(status_code=400, detail="fields must name at least one field.")
+    allowed_fields = SOURCE_FIELDS[source]
+    for field in selected:
+        if field not in allowed_fields:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Field '{field}' is not available for source '{source.value}'."
+            )
+    return selected
+
 
 # -----------------------
 # ROUTE
@@ -100,6 +210,8 @@ Source-specific filters:
 """
 )
 async def get_data(
+    request: Request,
+
     source: DataSource = Query(
         ...,
         description="Data source to query: crm, support, analytics."
@@ -169,9 +281,150 @@ async def get_data(
         pattern="^(asc|desc)$",
         description="Sorting order: asc or desc."
     ),
+
+    cursor: Optional[str] = Query(
+        None,
+        description=(
+            "Opaque keyset cursor from a previous response's metadata.next_cursor. "
+            "Continues right after that response's last row; stable when the data changes. "
+            "Takes precedence over page."
+        ),
+    ),
+
+    fields: Optional[str] = Query(
+        None,
+        description=(
+            "Comma-separated fields to return (e.g. name,status); other fields are "
+            "never read. Allowed values are the same as for sort_by."
+        ),
+    ),
 ):
 
-    logger.info(f"Incoming request | source={source}")
+    return await respond_with_cache(
+        request,
+        DataQuery(
+            source=source.value,
+            page=page,
+            page_size=page_size,
+            voice_mode=voice_mode,
+            summarize=summarize,
+            status=status,
+            priority=priority,
+            metric=metric,
+            start_date=start_date,
+            end_date=end_date,
+            sort_by=sort_by,
+            order=order,
+            cursor=cursor,
+            fields=fields,
+        ),
+    )
+
+
+# -----------------------
+# CONDITIONAL GET + RESPONSE CACHE
+# -----------------------
+
+response_cache = ResponseCache(max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES)
+single_flight = SingleFlight(enabled=settings.REQUEST_COALESCING_ENABLED)
+
+
+async def respond_with_cache(request: Request, query: DataQuery) -> Response:
+    """
+    Serve `query` from the response cache when the dataset version is unchanged,
+    answering conditional requests with 304. The ETag covers the dataset
+    version and the normalized query; the time-derived metadata fields are
+    filled in per response and are not part of it.
+
+    Concurrent misses for the same key share one pipeline run (`single_flight`):
+    the first request computes the body and the others wait for it.
+    """
+    # Validate first: an invalid query is a 400 even when it would match.
+    prepared = prepare_query(query)
+    source, connector = prepared.source, prepared.connector
+    version = connector.data_version()
+    if version is None:
+        response = await execute_query(prepared)
+        start = metrics.clock()
+        rendered = FastJSONResponse(response)
+        metrics.lap(source.value, "serialize", start)
+        return rendered
+
+    key = cache_key(source.value, version, query.model_dump(exclude={"source"}))
+    last_updated = connector.last_updated()
+    if not response_cache.enabled:
+        cached = await single_flight.run(key, lambda: _compute_body(prepared))
+        return Response(cached.render(last_updated), media_type="application/json")
+
+    headers = {"ETag": make_etag(key)}
+    if last_updated:
+        headers["Last-Modified"] = http_date(last_updated)
+
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, headers["ETag"]) or (
+        if_none_match is None
+        and not_modified_since(request.headers.get("if-modified-since"), last_updated)
+    ):
+        response_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+
+    cached = response_cache.get(key)
+    if cached is None:
+        cached = await single_flight.run(key, lambda: _compute_body(prepared, key))
+
+    return Response(cached.render(last_updated), media_type="application/json", headers=headers)
+
+
+async def _compute_body(prepared: "PreparedQuery", cache_as: Optional[str] = None) -> CachedBody:
+    response = await execute_query(prepared)
+    start = metrics.clock()
+    cached = CachedBody.from_model(response)
+    metrics.lap(prepared.source.value, "serialize", start)
+    # Stored here rather than by the caller, so the body is cached even if
+    # every waiting request has gone away.
+    if cache_as is not None:
+        response_cache.put(cache_as, cached)
+    return cached
+
+
+# -----------------------
+# QUERY PIPELINE
+# -----------------------
+
+@dataclass(frozen=True)
+class PreparedQuery:
+    """A validated `/data` query and the connector plan derived from it."""
+
+    source: DataSource
+    connector: BaseConnector
+    plan: QueryPlan
+    page: int
+    page_size: int
+    sort_key: str
+    sort_order: str
+    summarize: bool
+    summary_fields: Optional[Tuple[str, ...]]
+
+
+async def run_query(query: DataQuery) -> DataResponse:
+    """The `/data` pipeline for one query; shared by GET /data and POST /data/batch."""
+    return await execute_query(prepare_query(query))
+
+
+def prepare_query(query: DataQuery) -> PreparedQuery:
+    """
+    Validate `query` and build its plan without touching any data; every 400
+    the pipeline can produce is raised here (except for cursors that cannot
+    be compared with the data).
+    """
+
+    try:
+        source = DataSource(query.source)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid data source.")
+
+    logger.info("Incoming request", extra={"source": source.value})
+    start = metrics.clock()
 
     connector = connector_map.get(source)
     if not connector:
@@ -182,84 +435,129 @@ async def get_data(
     # -----------------------
 
     provided_filters = {
-        "status": status,
-        "priority": priority,
-        "metric": metric,
-        "start_date": start_date,
-        "end_date": end_date,
+        "status": query.status,
+        "priority": query.priority,
+        "metric": query.metric,
+        "start_date": query.start_date,
+        "end_date": query.end_date,
     }
 
-    allowed_filters = SOURCE_ALLOWED_FILTERS[source]
+    validate_filters(source, provided_filters)
+    parse_date_range(query.start_date, query.end_date)
 
-    for key, value in provided_filters.items():
-        if value is not None and key not in allowed_filters:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Filter '{key}' is not allowed for source '{source.value}'."
-            )
+    # -----------------------
+    # SORTING (default prioritization for voice)
+    # -----------------------
+
+    sort_key, sort_order = resolve_sort(source, query.sort_by, query.order)
 
     # -----------------------
-    # FETCH DATA
+    # PROJECTION (pushed down to the connector)
     # -----------------------
 
-    raw_data = connector.fetch(
-        status=status,
-        priority=priority,
-        metric=metric,
-        start_date=start_date,
-        end_date=end_date,
-    )
+    fields = resolve_fields(source, query.fields)
+    summarize = should_summarize(query.summarize)
+    summary_fields = summary_projection(source.value, fields) if summarize else None
+    if summary_fields is not None:
+        # The summary is a projection too; rows come back already reduced.
+        fields = summary_fields
 
     # -----------------------
-    # SORTING (default prioritization for voice)
+    # PAGINATION (voice-first constraints)
     # -----------------------
 
-    allowed_sort_fields = SOURCE_ALLOWED_SORT_FIELDS[source]
+    page = query.page
+    page_size = enforce_page_size(query.page_size)
+    if query.voice_mode:
+        page_size = min(page_size, settings.DEFAULT_PAGE_SIZE)
 
-    if sort_by is not None:
-        if sort_by not in allowed_sort_fields:
+    # -----------------------
+    # KEYSET CURSOR (optional)
+    # -----------------------
+
+    after = None
+    if query.cursor is not None:
+        try:
+            cursor_sort_key, cursor_order, cursor_value, cursor_tiebreak = decode_cursor(query.cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor.")
+        if (cursor_sort_key, cursor_order) != (sort_key, sort_order):
             raise HTTPException(
                 status_code=400,
-                detail=f"Cannot sort by '{sort_by}' for source '{source.value}'."
+                detail="Cursor does not match the requested sort_by/order.",
             )
+        after = (cursor_value, cursor_tiebreak)
 
-        sort_key = sort_by
-        sort_order = order
-    else:
-        # Default prioritization: most recent first when available
-        if source == DataSource.analytics:
-            sort_key = "date"
-        else:
-            sort_key = "created_at"
-        sort_order = "desc"
+    # -----------------------
+    # QUERY PLAN
+    # -----------------------
+
+    # The connector filters, sorts and cuts the page itself, so only the
+    # requested rows come back along with the total match count.
+    offset, limit = page_window(page, page_size)
+    plan = QueryPlan(
+        filters={k: v for k, v in provided_filters.items() if v is not None},
+        sort_key=sort_key,
+        descending=(sort_order == "desc"),
+        offset=0 if after is not None else offset,
+        limit=limit,
+        fields=fields,
+        after=after,
+    )
+    metrics.lap(source.value, "validate", start)
+    return PreparedQuery(
+        source=source,
+        connector=connector,
+        plan=plan,
+        page=page,
+        page_size=page_size,
+        sort_key=sort_key,
+        sort_order=sort_order,
+        summarize=summarize,
+        summary_fields=summary_fields,
+    )
+
+
+async def execute_query(prepared: PreparedQuery) -> DataResponse:
+    """Fetch the page for a prepared query and build its response."""
 
-    if sort_key in allowed_sort_fields:
-        raw_data = sorted(
-            raw_data,
-            key=lambda x: x.get(sort_key) or "",
-            reverse=(sort_order == "desc"),
-        )
+    source, connector = prepared.source, prepared.connector
+    page, page_size = prepared.page, prepared.page_size
+    start = metrics.clock()
 
     # -----------------------
-    # PAGINATION (voice-first constraints)
+    # FETCH DATA
     # -----------------------
 
-    page_size = enforce_page_size(page_size)
-    if voice_mode:
-        page_size = min(page_size, settings.DEFAULT_PAGE_SIZE)
-
-    paginated_data, total, total_pages, has_more = paginate(
-        raw_data,
-        page,
-        page_size,
-    )
+    try:
+        result = await connector.aexecute(prepared.plan)
+    except CursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    start = metrics.lap(source.value, "execute", start)
+
+    paginated_data = result.rows
+    total = result.total
+    total_pages, has_more = page_counts(total, page, page_size)
+    if prepared.plan.after is not None or not result.total_exact:
+        has_more = result.has_more
+    if prepared.plan.after is not None:
+        # A keyset page has no page number in the offset sense.
+        page, total_pages = None, None
+
+    next_cursor = None
+    if has_more and result.last_key is not None:
+        next_cursor = encode_cursor(prepared.sort_key, prepared.sort_order, *result.last_key)
 
     # -----------------------
     # OPTIONAL SUMMARIZATION
     # -----------------------
 
-    if should_summarize(summarize):
-        paginated_data = summarize_for_voice(source.value, paginated_data)
+    if prepared.summarize:
+        if prepared.summary_fields is not None:
+            paginated_data = normalize_for_voice(source.value, paginated_data)
+        else:
+            paginated_data = summarize_for_voice(source.value, paginated_data)
+        start = metrics.lap(source.value, "summarize", start)
 
     # -----------------------
     # RESPONSE
@@ -272,7 +570,9 @@ async def get_data(
         last_updated_iso = last_updated.isoformat()
         staleness_seconds = int((datetime.now(timezone.utc) - last_updated).total_seconds())
 
-    metadata = Metadata(
+    # Every value below is produced by this pipeline, so the models are built
+    # without re-validation and serialized directly (see FastJSONResponse).
+    metadata = Metadata.model_construct(
         total_results=total,
         page=page,
         page_size=page_size,
@@ -283,11 +583,208 @@ async def get_data(
         data_last_updated=last_updated_iso,
         data_staleness_seconds=staleness_seconds,
         voice_hint=f"Showing {len(paginated_data)} of {total} results",
+        next_cursor=next_cursor,
     )
 
-    return DataResponse(
+    response = DataResponse.model_construct(
         source=source.value,
-        data_type=identify_data_type(raw_data),
+        data_type=identify_data_type(paginated_data, source.value),
         data=paginated_data,
         metadata=metadata,
     )
+    metrics.lap(source.value, "response", start)
+    return response
+
+
+# -----------------------
+# BATCH (concurrent fan-out)
+# -----------------------
+
+async def _run_batch_item(query: DataQuery) -> BatchItem:
+    try:
+        return BatchItem.model_construct(response=await run_query(query), error=None)
+    except HTTPException as exc:
+        error = BatchError.model_construct(status_code=exc.status_code, detail=exc.detail)
+    except Exception:
+        logger.exception("Batch query failed", extra={"source": query.source})
+        error = BatchError.model_construct(status_code=500, detail="Internal server error")
+    return BatchItem.model_construct(response=None, error=error)
+
+
+@router.post(
+    "/data/batch",
+    response_model=BatchResponse,
+    summary="Run several /data queries in one call",
+    description="""
+Accepts a list of `/data`-style queries (same fields as the GET parameters) and
+runs them concurrently, so total latency follows the slowest source rather than
+the sum. Results come back in request order; a failing query yields an `error`
+entry without affecting the others.
+""",
+)
+async def get_data_batch(batch: BatchRequest):
+
+    logger.info("Batch request", extra={"queries": len(batch.queries)})
+
+    results = await asyncio.gather(*(_run_batch_item(query) for query in batch.queries))
+    return FastJSONResponse(BatchResponse.model_construct(results=list(results)))
+
+
+# -----------------------
+# ANALYTICS AGGREGATION
+# -----------------------
+
+def _aggregate_metric(
+    metric: str,
+    agg: str,
+    start: Optional[date],
+    end: Optional[date],
+    group_by: Optional[str],
+    points: Optional[int],
+) -> List[Dict[str, Any]]:
+    connector = connector_map[DataSource.analytics]
+    series = connector.series(metric)
+    if series is None:
+        return []
+    return aggregate_series(series, agg, start, end, group_by=group_by, points=points)
+
+
+@router.get(
+    "/data/analytics/aggregate",
+    response_model=AggregateResponse,
+    summary="Aggregate an analytics metric over a date window",
+    description="""
+Computes sum, avg, min, max, count or a percentile (`p50`, `p90`, `p99`, ...)
+of one metric over an optional date range, either as a single value, grouped
+by day/week/month, or downsampled to `points` equal-width windows.
+""",
+)
+async def aggregate_analytics(
+    metric: str = Query(..., description="Metric name (e.g., daily_active_users)."),
+    agg: str = Query("avg", description="sum, avg, min, max, count, or pNN (e.g., p95)."),
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD), inclusive."),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD), inclusive."),
+    group_by: Optional[str] = Query(
+        None,
+        pattern="^(day|week|month)$",
+        description="Calendar bucket: day, week (ISO, Monday start) or month.",
+    ),
+    points: Optional[int] = Query(
+        None,
+        ge=1,
+        le=settings.MAX_AGGREGATE_POINTS,
+        description="Downsample to at most this many equal-width windows.",
+    ),
+):
+
+    logger.info("Aggregate request", extra={"metric": metric, "agg": agg})
+
+    try:
+        parse_aggregation(agg)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if group_by is not None and points is not None:
+        raise HTTPException(status_code=400, detail="Use either group_by or points, not both.")
+    start, end = parse_date_range(start_date, end_date)
+
+    buckets = await run_in_connector_pool(
+        _aggregate_metric, metric, agg, start, end, group_by, points
+    )
+
+    voice_hint = None
+    if len(buckets) == 1:
+        voice_hint = f"{agg} of {metric} is {buckets[0]['value']} over {buckets[0]['count']} data points"
+    elif buckets:
+        voice_hint = f"{len(buckets)} {agg} values for {metric}"
+
+    return AggregateResponse(
+        source=DataSource.analytics.value,
+        metric=metric,
+        agg=agg,
+        group_by=group_by,
+        points=points,
+        buckets=buckets,
+        voice_hint=voice_hint,
+    )
+
+
+# -----------------------
+# BULK EXPORT (streaming)
+# -----------------------
+
+EXPORT_BATCH_SIZE = 500
+
+
+def _ndjson_chunks(rows: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    # Batch lines so each chunk is a reasonable write, without ever holding
+    # more than EXPORT_BATCH_SIZE encoded rows.
+    batch: List[str] = []
+    for row in rows:
+        batch.append(json.dumps(row, default=str))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield ("\n".join(batch) + "\n").encode("utf-8")
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode("utf-8")
+
+
+@router.get(
+    "/data/export",
+    summary="Stream every matching record as NDJSON",
+    description="""
+Bulk export for back-office sync jobs. Accepts the same source, filters,
+sorting and field selection as `/data`, but streams every matching record as
+newline-delimited JSON (one object per line) instead of returning a single page.
+
+Without `sort_by`, records stream in source (file) order in constant memory.
+A sorted export of a file too large to load holds every matching row while
+sorting.
+""",
+    response_class=StreamingResponse,
+)
+async def export_data(
+    source: DataSource = Query(
+        ...,
+        description="Data source to export: crm, support, analytics."
+    ),
+    status: Optional[str] = Query(None, description="Status filter (CRM, Support)."),
+    priority: Optional[str] = Query(None, description="Support only: priority filter."),
+    metric: Optional[str] = Query(None, description="Analytics only: metric name filter."),
+    start_date: Optional[str] = Query(None, description="Analytics only: start date (YYYY-MM-DD)."),
+    end_date: Optional[str] = Query(None, description="Analytics only: end date (YYYY-MM-DD)."),
+    sort_by: Optional[str] = Query(
+        None,
+        description="Field name to sort by (same values as /data); omit to export in source order.",
+    ),
+    order: str = Query("desc", pattern="^(asc|desc)$", description="Sorting order: asc or desc."),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to export (same values as /data); other fields are never read.",
+    ),
+):
+
+    logger.info("Export request", extra={"source": source.value})
+
+    connector = connector_map[source]
+
+    provided_filters = {
+        "status": status,
+        "priority": priority,
+        "metric": metric,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    validate_filters(source, provided_filters)
+    parse_date_range(start_date, end_date)
+    # No default sort here: source order streams without buffering.
+    sort_key = resolve_sort(source, sort_by, order)[0] if sort_by is not None else None
+
+    plan = QueryPlan(
+        filters={k: v for k, v in provided_filters.items() if v is not None},
+        sort_key=sort_key,
+        descending=(order == "desc"),
+        fields=resolve_fields(source, fields),
+    )
+    rows = await connector.aiter_rows(plan)
+
+    return StreamingResponse(_ndjson_chunks(rows), media_type="application/x-ndjson")
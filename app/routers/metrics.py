@@ -0,0 +1,75 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.connectors.cache import dataset_cache
+from app.routers.data import response_cache, single_flight
+from app.utils.metrics import metrics
+
+router = APIRouter(tags=["Operations"])
+
+
+def _cache_samples(stats: dict, keys: tuple) -> list:
+    return [({"event": key}, stats[key]) for key in keys]
+
+
+def _hit_ratio(stats: dict) -> list:
+    hits = stats["hits"] + stats.get("pinned_hits", 0)
+    lookups = hits + stats["misses"] + stats.get("reloads", 0)
+    return [({}, hits / lookups if lookups else 0.0)]
+
+
+metrics.register(
+    "udc_dataset_cache_events_total",
+    "counter",
+    "Parsed-dataset cache lookups by outcome (pinned_hits: served a watched, pinned dataset), and evictions.",
+    lambda: _cache_samples(dataset_cache.stats(), ("hits", "pinned_hits", "misses", "reloads", "evictions")),
+)
+metrics.register(
+    "udc_dataset_cache_hit_ratio",
+    "gauge",
+    "Share of dataset cache lookups served without loading.",
+    lambda: _hit_ratio(dataset_cache.stats()),
+)
+metrics.register(
+    "udc_dataset_cache_bytes",
+    "gauge",
+    "Estimated size of the evictable (unpinned) cached datasets.",
+    lambda: [({}, dataset_cache.stats()["bytes"])],
+)
+metrics.register(
+    "udc_response_cache_events_total",
+    "counter",
+    "Response cache lookups by outcome, and 304 Not Modified answers.",
+    lambda: _cache_samples(response_cache.stats(), ("hits", "misses", "not_modified")),
+)
+metrics.register(
+    "udc_response_cache_hit_ratio",
+    "gauge",
+    "Share of response cache lookups served from the cache.",
+    lambda: _hit_ratio(response_cache.stats()),
+)
+
+metrics.register(
+    "udc_coalesced_requests_total",
+    "counter",
+    "/data cache misses by outcome: executed the pipeline, or coalesced onto an identical in-flight query.",
+    lambda: _cache_samples(single_flight.stats(), ("executed", "coalesced")),
+)
+metrics.register(
+    "udc_coalescing_in_flight",
+    "gauge",
+    "Distinct /data queries currently being computed.",
+    lambda: [({}, single_flight.stats()["in_flight"])],
+)
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    description="Per-stage latency histograms, row counts and cache statistics in the Prometheus text format.",
+)
+def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,174 @@
+
+from __future__ import annotations
+
+import re
+from datetime import date, timedelta
+from math import ceil
+from typing import Any, Dict, List, Optional
+
+from app.connectors.columnar import MetricSeries, np, search
+
+
+GROUPINGS = ("day", "week", "month")
+BASIC_AGGREGATIONS = ("sum", "avg", "min", "max", "count")
+_PERCENTILE = re.compile(r"^p(\d{1,2}(?:\.\d+)?|100)$")
+
+
+def parse_aggregation(agg: str) -> Optional[float]:
+    """
+    Validate an aggregation name. Returns the percentile (0-100) for `pNN`
+    names, None for the basic ones; raises ValueError otherwise.
+    """
+    if agg in BASIC_AGGREGATIONS:
+        return None
+    match = _PERCENTILE.match(agg)
+    if not match:
+        raise ValueError(f"Unknown aggregation '{agg}'.")
+    return float(match.group(1))
+
+
+def _calendar_start(ordinal: int, group_by: str) -> int:
+    day = date.fromordinal(ordinal)
+    if group_by == "week":
+        return ordinal - day.weekday()  # ISO weeks start on Monday
+    if group_by == "month":
+        return day.replace(day=1).toordinal()
+    return ordinal
+
+
+def _next_calendar_start(ordinal: int, group_by: str) -> int:
+    if group_by == "week":
+        return ordinal + 7
+    if group_by == "month":
+        day = date.fromordinal(ordinal)
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1).toordinal()
+    return ordinal + 1
+
+
+def bucket_boundaries(
+    first: int,
+    last: int,
+    group_by: Optional[str] = None,
+    points: Optional[int] = None,
+) -> List[int]:
+    """
+    Ascending day ordinals where buckets start, covering [first, last].
+    `points` splits the span into that many equal-width windows; `group_by`
+    uses calendar days/ISO weeks/months; neither gives one bucket.
+    """
+    if points is not None:
+        width = max(1, ceil((last - first + 1) / points))
+        return list(range(first, last + 1, width))
+    if group_by is None:
+        return [first]
+
+    boundaries = []
+    ordinal = _calendar_start(first, group_by)
+    while ordinal <= last:
+        boundaries.append(ordinal)
+        ordinal = _next_calendar_start(ordinal, group_by)
+    return boundaries
+
+
+def _percentile(values: List[float], q: float) -> float:
+    # Linear interpolation between closest ranks (NumPy's default method).
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def _reduce(series: MetricSeries, starts: List[int], stops: List[int], agg: str) -> List[Any]:
+    """Aggregate each non-empty [start, stop) window of the series' values."""
+    counts = [stop - start for start, stop in zip(starts, stops)]
+    prefix = series.prefix
+
+    if agg == "count":
+        return counts
+
+    if np is not None and isinstance(series.values, np.ndarray):
+        lo = np.asarray(starts)
+        hi = np.asarray(stops)
+        if agg in ("sum", "avg"):
+            sums = prefix[hi] - prefix[lo]
+            result = sums / (hi - lo) if agg == "avg" else sums
+        elif agg in ("min", "max"):
+            # Windows are contiguous, so one reduceat over their span covers all.
+            ufunc = np.minimum if agg == "min" else np.maximum
+            result = ufunc.reduceat(series.values[starts[0]:stops[-1]], lo - starts[0])
+        else:
+            q = parse_aggregation(agg)
+            result = [np.percentile(series.values[a:b], q) for a, b in zip(starts, stops)]
+        return [v.item() if hasattr(v, "item") else v for v in result]
+
+    if agg in ("sum", "avg"):
+        sums = [prefix[b] - prefix[a] for a, b in zip(starts, stops)]
+        if agg == "sum":
+            return sums
+        return [total / count for total, count in zip(sums, counts)]
+
+    values = series.values
+    if agg == "min":
+        return [min(values[a:b]) for a, b in zip(starts, stops)]
+    if agg == "max":
+        return [max(values[a:b]) for a, b in zip(starts, stops)]
+    q = parse_aggregation(agg)
+    return [_percentile(values[a:b], q) for a, b in zip(starts, stops)]
+
+
+def aggregate_series(
+    series: MetricSeries,
+    agg: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    group_by: Optional[str] = None,
+    points: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Aggregate a metric over [start_date, end_date], optionally per calendar
+    bucket or downsampled to `points` windows. Sums/averages come from the
+    series prefix sums (O(1) per window); bucket edges are binary searches.
+    Empty buckets are omitted.
+    """
+    parse_aggregation(agg)
+    lo, hi = series.span(start_date, end_date)
+    if lo == hi:
+        return []
+
+    dates = series.dates
+    first, last = int(dates[lo]), int(dates[hi - 1])
+    if start_date is not None and points is not None:
+        first = start_date.toordinal()
+    if end_date is not None and points is not None:
+        last = end_date.toordinal()
+
+    boundaries = bucket_boundaries(first, last, group_by, points)
+    edges = [max(lo, min(hi, search(dates, b, "left"))) for b in boundaries] + [hi]
+    if group_by is not None and points is None:
+        ends = boundaries[1:] + [_next_calendar_start(boundaries[-1], group_by)]
+    else:
+        ends = boundaries[1:] + [last + 1]
+
+    windows = [
+        (edges[i], edges[i + 1], boundaries[i], ends[i] - 1)
+        for i in range(len(boundaries))
+        if edges[i + 1] > edges[i]
+    ]
+    if not windows:
+        return []
+
+    starts, stops, bucket_starts, bucket_ends = (list(column) for column in zip(*windows))
+    values = _reduce(series, starts, stops, agg)
+
+    return [
+        {
+            "start": date.fromordinal(bucket_start).isoformat(),
+            "end": date.fromordinal(bucket_end).isoformat(),
+            "count": stop - start,
+            "value": value,
+        }
+        for start, stop, bucket_start, bucket_end, value in zip(
+            starts, stops, bucket_starts, bucket_ends, values
+        )
+    ]
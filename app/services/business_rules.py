@@ -1,3 +1,6 @@
+import base64
+import heapq
+import json
 from typing import List, Dict, Any, Tuple
 from math import ceil
 from app.config import settings
@@ -9,6 +12,45 @@ def enforce_page_size(page_size: int) -> int:
     return page_size
 
 
+def value_key(value: Any) -> Tuple[bool, Any]:
+    """
+    Sort key for one field value: missing/None sorts before every present
+    value, and present values (including 0 and "") compare as themselves.
+    """
+    return value is not None, value
+
+
+def sort_value(item: Dict[str, Any], sort_key: str) -> Tuple[bool, Any]:
+    return value_key(item.get(sort_key))
+
+
+def top_k(
+    data: List[Dict[str, Any]],
+    sort_key: str,
+    descending: bool,
+    k: int,
+) -> List[Dict[str, Any]]:
+    """
+    First `k` items of `data` in sort order, without sorting the whole list.
+    Same result (including tie order) as a stable full sort sliced to `k`.
+    """
+    if k >= len(data):
+        return sorted(data, key=lambda x: sort_value(x, sort_key), reverse=descending)
+    select = heapq.nlargest if descending else heapq.nsmallest
+    return select(k, data, key=lambda x: sort_value(x, sort_key))
+
+
+def page_window(page: int, page_size: int) -> Tuple[int, int]:
+    """(offset, limit) of a 1-based page."""
+    return (page - 1) * page_size, page_size
+
+
+def page_counts(total: int, page: int, page_size: int) -> Tuple[int, bool]:
+    """(total_pages, has_more) for a result of `total` rows."""
+    total_pages = ceil(total / page_size) if total > 0 else 1
+    return total_pages, page < total_pages
+
+
 def paginate(
     data: List[Dict[str, Any]],
     page: int,
@@ -16,16 +58,35 @@ def paginate(
 ) -> Tuple[List[Dict[str, Any]], int, int, bool]:
 
     total = len(data)
-    total_pages = ceil(total / page_size) if total > 0 else 1
-
-    start = (page - 1) * page_size
-    end = start + page_size
+    total_pages, has_more = page_counts(total, page, page_size)
 
-    paginated_data = data[start:end]
-    has_more = page < total_pages
+    start, limit = page_window(page, page_size)
+    paginated_data = data[start:start + limit]
 
     return paginated_data, total, total_pages, has_more
 
 
+def encode_cursor(sort_key: str, order: str, value: Any, tiebreak: Tuple[Any, ...]) -> str:
+    """
+    Opaque keyset cursor: the sort field/order plus the last row's sort value
+    and primary-key tie-breaker.
+    """
+    payload = json.dumps(
+        {"s": sort_key, "o": order, "v": value, "t": list(tiebreak)},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, Any, Tuple[Any, ...]]:
+    """Inverse of `encode_cursor`; raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return payload["s"], payload["o"], payload["v"], tuple(payload["t"])
+    except Exception as exc:
+        raise ValueError("Invalid cursor.") from exc
+
+
 def should_summarize(summarize: bool) -> bool:
     return summarize
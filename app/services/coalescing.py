@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical work: while a computation for a key is in
+    flight, further callers with the same key await its result instead of
+    starting their own. The entry is dropped as soon as it completes, so
+    results are never reused across time (that is the response cache's job).
+
+    The computation runs as its own task, so a caller that disconnects or is
+    cancelled does not cancel it for the others. Used from the event loop
+    only; no locking needed.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        self.executed = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        if not self.enabled:
+            return await compute()
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # Mark the exception retrieved even if every waiter was cancelled.
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
@@ -1,8 +1,20 @@
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
-def identify_data_type(data: List[Dict[str, Any]]) -> str:
+# Data type of each known source's schema. Rows may be projected (`fields`)
+# or the page empty, so known sources are not inferred from their rows.
+SOURCE_DATA_TYPES: Dict[str, str] = {
+    "crm": "tabular_crm",
+    "support": "tabular_support",
+    "analytics": "time_series",
+}
+
+
+def identify_data_type(data: List[Dict[str, Any]], source: Optional[str] = None) -> str:
+    if source in SOURCE_DATA_TYPES:
+        return SOURCE_DATA_TYPES[source]
+
     if not data:
         return "unknown"
 
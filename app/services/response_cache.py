@@ -0,0 +1,161 @@
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.utils.serialization import dumps, trusted_payload
+
+
+# Placeholders for the time-derived metadata fields. Cached bodies are stored
+# with these in place and filled in per response, so the cache never serves a
+# stale `data_freshness` / `data_staleness_seconds`.
+_FRESHNESS_TOKEN = "@@data_freshness@@"
+_STALENESS_TOKEN = "@@data_staleness_seconds@@"
+_FRESHNESS_PART = json.dumps(_FRESHNESS_TOKEN).encode("utf-8")
+_STALENESS_PART = json.dumps(_STALENESS_TOKEN).encode("utf-8")
+
+
+def cache_key(source: str, version: str, query: Dict[str, Any]) -> str:
+    """Dataset version + normalized query; also the basis of the ETag."""
+    normalized = json.dumps(query, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{source}|{version}|{normalized}"
+
+
+def make_etag(key: str) -> str:
+    return '"' + hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as RFC 9110 requires for If-None-Match.
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified_since(if_modified_since: Optional[str], last_updated: Optional[datetime]) -> bool:
+    if not if_modified_since or last_updated is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have second resolution.
+    return last_updated.replace(microsecond=0) <= since
+
+
+class CachedBody:
+    """A serialized JSON response with its volatile metadata left as slots."""
+
+    __slots__ = ("parts", "nbytes")
+
+    def __init__(self, payload: Dict[str, Any]):
+        metadata = payload["metadata"]
+        metadata["data_freshness"] = _FRESHNESS_TOKEN
+        if metadata.get("data_staleness_seconds") is not None:
+            metadata["data_staleness_seconds"] = _STALENESS_TOKEN
+
+        body = dumps(payload)
+        self.parts = self._split(body)
+        self.nbytes = len(body)
+
+    @staticmethod
+    def _split(body: bytes) -> List[Any]:
+        # Alternating literal byte chunks and slot names. Metadata is serialized
+        # after `data`, so the last occurrence of each token is the real slot
+        # even if a record happens to contain the same text.
+        slots = sorted(
+            (body.rfind(token), token, name)
+            for token, name in ((_FRESHNESS_PART, "freshness"), (_STALENESS_PART, "staleness"))
+            if body.rfind(token) >= 0
+        )
+        parts: List[Any] = []
+        cursor = 0
+        for index, token, name in slots:
+            parts.append(body[cursor:index])
+            parts.append(name)
+            cursor = index + len(token)
+        parts.append(body[cursor:])
+        return parts
+
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "CachedBody":
+        return cls(trusted_payload(model))
+
+    def render(self, last_updated: Optional[datetime]) -> bytes:
+        now = datetime.now(timezone.utc)
+        values = {
+            "freshness": json.dumps(now.isoformat()).encode("utf-8"),
+            "staleness": str(
+                int((now - last_updated).total_seconds()) if last_updated else 0
+            ).encode("utf-8"),
+        }
+        return b"".join(values[p] if isinstance(p, str) else p for p in self.parts)
+
+
+class ResponseCache:
+    """Bounded LRU of serialized `/data` bodies, keyed by `cache_key`."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedBody) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
@@ -2,7 +2,42 @@
 from __future__ import annotations
 
 from datetime import date
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Fields kept per source when summarizing: identity + recency + actionability.
+# These are plain projections, so the router passes them down to the
+# connector (`QueryPlan.fields`) and the other columns are never built.
+SUMMARY_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "crm": ("customer_id", "name", "status", "created_at", "email"),
+    "support": ("ticket_id", "subject", "priority", "status", "created_at", "customer_id"),
+    # canonical time-series keys
+    "analytics": ("metric", "date", "value"),
+}
+
+
+def summary_projection(
+    source: str,
+    fields: Optional[Sequence[str]] = None,
+) -> Optional[Tuple[str, ...]]:
+    """
+    The projection a summarized response needs: the source's summary fields,
+    narrowed to `fields` (in that order) when the caller also selected fields.
+    None for sources without a fixed summary.
+    """
+    summary = SUMMARY_FIELDS.get(source)
+    if summary is None or fields is None:
+        return summary
+    return tuple(f for f in fields if f in summary)
+
+
+def normalize_for_voice(source: str, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Finish rows already projected to the summary fields."""
+    if source == "analytics":
+        # Normalize date to ISO for consistent voice reading
+        for item in data:
+            if isinstance(item.get("date"), date):
+                item["date"] = item["date"].isoformat()
+    return data
 
 
 def summarize_for_voice(source: str, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -10,42 +45,8 @@ def summarize_for_voice(source: str, data: List[Dict[str, Any]]) -> List[Dict[st
     Reduce payload size for voice/low-bandwidth responses while keeping
     fields that preserve identity + recency + actionability.
     """
-    summarized: List[Dict[str, Any]] = []
-
-    for item in data:
-        reduced_item: Dict[str, Any] = {}
-
-        if source == "crm":
-            for key in ["customer_id", "name", "status", "created_at", "email"]:
-                if key in item:
-                    reduced_item[key] = item[key]
-
-        elif source == "support":
-            for key in [
-                "ticket_id",
-                "subject",
-                "priority",
-                "status",
-                "created_at",
-                "customer_id",
-            ]:
-                if key in item:
-                    reduced_item[key] = item[key]
-
-        elif source == "analytics":
-            # keep canonical time-series keys
-            for key in ["metric", "date", "value"]:
-                if key in item:
-                    reduced_item[key] = item[key]
-            # Normalize date to ISO for consistent voice reading
-            if isinstance(reduced_item.get("date"), date):
-                reduced_item["date"] = reduced_item["date"].isoformat()
-
-        else:
-            # fallback: keep a small, stable subset
-            for key in list(item.keys())[:6]:
-                reduced_item[key] = item[key]
-
-        summarized.append(reduced_item)
-
-    return summarized
+    fields = SUMMARY_FIELDS.get(source)
+    if fields is None:
+        # fallback: keep a small, stable subset
+        return [{key: item[key] for key in list(item)[:6]} for item in data]
+    return normalize_for_voice(source, [{f: item[f] for f in fields if f in item} for item in data])
@@ -1,32 +1,121 @@
 from __future__ import annotations
 
+import atexit
+import itertools
 import logging
 import logging.config
-from typing import Any, Dict
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.utils.serialization import dumps
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and
+# is emitted as a structured field.
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[QueueListener] = None
+_access_counter = itertools.count()
+
+
+def record_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    """`TEXT_FORMAT` followed by ` | key=value` for each structured field."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = record_fields(record)
+        if not fields:
+            return line
+        # Fields go on the first line; multi-line messages keep their body below.
+        head, sep, body = line.partition("\n")
+        return head + "".join(f" | {key}={value}" for key, value in fields.items()) + sep + body
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and structured fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **record_fields(record),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return dumps(entry).decode("utf-8")
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread untouched. The stock QueueHandler
+    formats the message on the calling thread (so it can be pickled); here
+    the queue is in-process, so interpolation, formatting and the stream
+    write all happen on the listener. Log arguments should therefore be
+    values that are not mutated after the call.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def sample_access_log() -> bool:
+    """Whether this request's access-log line is kept (1 in ACCESS_LOG_SAMPLE_RATE)."""
+    rate = settings.ACCESS_LOG_SAMPLE_RATE
+    return rate > 0 and next(_access_counter) % rate == 0
+
+
+@atexit.register
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _console_handler() -> logging.Handler:
+    # Built inside dictConfig (not before it), which closes existing handlers.
+    global _listener
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter(TEXT_FORMAT)
+    stream = logging.StreamHandler()
+    stream.setFormatter(formatter)
+    if not settings.LOG_QUEUE_ENABLED:
+        return stream
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    return NonBlockingQueueHandler(log_queue)
 
 
 def configure_logging():
     """
     Configure app + uvicorn logging with a consistent format.
-    Keeps setup dependency-free and production-friendly.
+    Keeps setup dependency-free and production-friendly: callers only put
+    records on a queue, and a background listener formats and writes them
+    (LOG_QUEUE_ENABLED=false writes on the calling thread instead).
     """
+    stop_logging()
     config: Dict[str, Any] = {
         "version": 1,
         "disable_existing_loggers": False,
-        "formatters": {
-            "default": {
-                "format": "%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-            }
-        },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "formatter": "default",
-            }
-        },
+        "handlers": {"console": {"()": _console_handler}},
         "root": {
             "handlers": ["console"],
-            "level": "INFO",
+            "level": settings.LOG_LEVEL,
         },
         # Ensure uvicorn logs use the same handler/format
         "loggers": {
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from app.config import settings
+
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit.
+BUCKETS: Tuple[float, ...] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels: str) -> str:
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Metrics:
+    """
+    In-process request metrics rendered in the Prometheus text format.
+
+    Instrumented code brackets each stage with `clock()` / `lap()`:
+
+        start = metrics.clock()
+        ...                              # stage work
+        start = metrics.lap(source, "filter", start)
+
+    When disabled both calls return a constant without touching the clock or
+    allocating, so instrumentation is free unless metrics are being scraped.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stages: Dict[Tuple[str, str], Histogram] = {}
+        self._rows: Dict[Tuple[str, str], int] = {}
+        # Extra samples computed at scrape time: name -> (type, help, collect).
+        self._collectors: Dict[str, Tuple[str, str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = {}
+
+    def clock(self) -> float:
+        return perf_counter() if self.enabled else 0.0
+
+    def lap(self, source: str, stage: str, start: float) -> float:
+        """Record the time since `start` for `stage`; returns the new start."""
+        if not self.enabled:
+            return 0.0
+        now = perf_counter()
+        key = (source, stage)
+        with self._lock:
+            histogram = self._stages.get(key)
+            if histogram is None:
+                histogram = self._stages[key] = Histogram()
+            histogram.observe(now - start)
+        return now
+
+    def count_rows(self, source: str, scanned: int, returned: int) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            for kind, n in (("scanned", scanned), ("returned", returned)):
+                self._rows[(source, kind)] = self._rows.get((source, kind), 0) + n
+
+    def register(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+    ) -> None:
+        """Add a gauge/counter whose samples (labels, value) are read at scrape time."""
+        self._collectors[name] = (kind, help_text, collect)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._rows.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            stages = {key: (list(h.counts), h.sum, h.count) for key, h in self._stages.items()}
+            rows = dict(self._rows)
+
+        lines: List[str] = [
+            "# HELP udc_stage_duration_seconds Time spent in each /data pipeline stage.",
+            "# TYPE udc_stage_duration_seconds histogram",
+        ]
+        for (source, stage), (counts, total, count) in sorted(stages.items()):
+            cumulative = 0
+            for bound, n in zip((*BUCKETS, "+Inf"), counts):
+                cumulative += n
+                labels = _labels(source=source, stage=stage, le=str(bound))
+                lines.append(f"udc_stage_duration_seconds_bucket{labels} {cumulative}")
+            labels = _labels(source=source, stage=stage)
+            lines.append(f"udc_stage_duration_seconds_sum{labels} {total}")
+            lines.append(f"udc_stage_duration_seconds_count{labels} {count}")
+
+        lines += [
+            "# HELP udc_rows_total Rows considered after index filtering (scanned) and returned, per source.",
+            "# TYPE udc_rows_total counter",
+        ]
+        for (source, kind), n in sorted(rows.items()):
+            lines.append(f"udc_rows_total{_labels(source=source, kind=kind)} {n}")
+
+        for name, (kind, help_text, collect) in sorted(self._collectors.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in collect():
+                lines.append(f"{name}{_labels(**labels) if labels else ''} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics(enabled=settings.METRICS_ENABLED)
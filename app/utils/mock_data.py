@@ -1,48 +1,68 @@
 import random
 from datetime import date, datetime, timedelta, timezone
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
+# Generators take an optional `rng` and reference time so callers (tests,
+# benchmarks) can produce identical data on every run; by default they use
+# the global `random` module and the current time.
 
-def generate_customers(n: int = 30) -> List[Dict[str, Any]]:
+
+def generate_customers(
+    n: int = 30,
+    rng: Optional[random.Random] = None,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    rng = rng or random
     statuses = ["active", "inactive"]
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
     return [
         {
             "customer_id": i,
             "name": f"Customer {i}",
             "email": f"user{i}@example.com",
-            "created_at": (now - timedelta(days=random.randint(1, 365))).isoformat(),
-            "status": random.choice(statuses),
+            "created_at": (now - timedelta(days=rng.randint(1, 365))).isoformat(),
+            "status": rng.choice(statuses),
         }
         for i in range(1, n + 1)
     ]
 
 
-def generate_support_tickets(n: int = 50) -> List[Dict[str, Any]]:
+def generate_support_tickets(
+    n: int = 50,
+    rng: Optional[random.Random] = None,
+    now: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    rng = rng or random
     statuses = ["open", "closed", "pending"]
     priorities = ["low", "medium", "high"]
-    now = datetime.now(timezone.utc)
+    now = now or datetime.now(timezone.utc)
 
     return [
         {
             "ticket_id": i,
-            "customer_id": random.randint(1, 50),
+            "customer_id": rng.randint(1, 50),
             "subject": f"Issue {i}",
-            "status": random.choice(statuses),
-            "priority": random.choice(priorities),
-            "created_at": (now - timedelta(days=random.randint(0, 30))).isoformat(),
+            "status": rng.choice(statuses),
+            "priority": rng.choice(priorities),
+            "created_at": (now - timedelta(days=rng.randint(0, 30))).isoformat(),
         }
         for i in range(1, n + 1)
     ]
 
 
-def generate_analytics_metrics(metric: str = "daily_active_users", days: int = 30) -> List[Dict[str, Any]]:
-    today = date.today()
+def generate_analytics_metrics(
+    metric: str = "daily_active_users",
+    days: int = 30,
+    rng: Optional[random.Random] = None,
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    rng = rng or random
+    today = today or date.today()
     return [
         {
             "metric": metric,
             "date": (today - timedelta(days=i)).isoformat(),
-            "value": random.randint(100, 1000),
+            "value": rng.randint(100, 1000),
         }
         for i in range(days)
     ]
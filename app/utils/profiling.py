@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import cProfile
+import contextvars
+import functools
+import hmac
+import io
+import itertools
+import pstats
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, List, Optional, TypeVar
+
+from app.config import settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Frames listed in the log line written for each profiled request.
+TOP_FRAMES = 15
+
+_active: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "active_profile", default=None
+)
+_sample_counter = itertools.count(1)
+# One profile at a time: cProfile on the event-loop thread also sees every
+# other request running concurrently, so overlapping profiles would be noise.
+_busy = threading.Lock()
+
+
+def should_profile(profile_header: Optional[str]) -> bool:
+    """
+    Whether to profile this request: profiling must be enabled, and the
+    request either carries the admin token in `x-profile` or is picked by
+    1-in-N sampling.
+    """
+    if not settings.PROFILING_ENABLED:
+        return False
+    token = settings.PROFILING_TOKEN
+    if token and profile_header and hmac.compare_digest(profile_header, token):
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and next(_sample_counter) % rate == 0
+
+
+class RequestProfile:
+    """
+    cProfile run for one request. The event-loop part is profiled directly;
+    work the request sends to the connector pool is profiled in the worker
+    thread (see `profiled`) and merged into the same report.
+    """
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self._profile = cProfile.Profile()
+        self._workers: List[cProfile.Profile] = []
+        self._token: Optional[contextvars.Token] = None
+
+    @classmethod
+    def start(cls, request_id: str) -> Optional["RequestProfile"]:
+        """Begin profiling, or return None if another request is being profiled."""
+        if not _busy.acquire(blocking=False):
+            return None
+        profile = cls(request_id)
+        profile._token = _active.set(profile)
+        profile._profile.enable()
+        return profile
+
+    def add_worker(self, profile: cProfile.Profile) -> None:
+        self._workers.append(profile)
+
+    @property
+    def path(self) -> Path:
+        """Where `finish` writes the report (known before the request ends)."""
+        return Path(settings.PROFILING_DIR) / f"{_safe_name(self.request_id)}.prof"
+
+    def finish(self) -> Path:
+        """
+        Stop profiling and write `<PROFILING_DIR>/<request id>.prof`. Must run
+        in the task that called `start` (it resets the context variable).
+        """
+        try:
+            self._profile.disable()
+            if self._token is not None:
+                _active.reset(self._token)
+            stats = pstats.Stats(self._profile)
+            for worker in self._workers:
+                stats.add(worker)
+
+            path = self.path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            stats.dump_stats(path)
+
+            report = io.StringIO()
+            stats.stream = report
+            stats.sort_stats("cumulative").print_stats(TOP_FRAMES)
+            logger.info(
+                "Profile\n%s", report.getvalue(), extra={"request_id": self.request_id, "file": path}
+            )
+            return path
+        finally:
+            _busy.release()
+
+
+def profiled(func: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wrap `func` (about to run on a worker thread) so it is profiled there when
+    the calling request is being profiled; otherwise return it unchanged.
+    """
+    request_profile = _active.get()
+    if request_profile is None:
+        return func
+
+    @functools.wraps(func)
+    def run(*args: Any, **kwargs: Any) -> T:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            request_profile.add_worker(profile)
+
+    return run
+
+
+def _safe_name(request_id: str) -> str:
+    # Request ids may come from the client; never let them shape the path.
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", request_id)[:64].lstrip(".") or "request"
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:  # optional: much faster encoding of plain dict/list payloads
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+
+def dumps(payload: Any) -> bytes:
+    """Compact UTF-8 JSON, via orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(
+        payload,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    ).encode("utf-8")
+
+
+def trusted_payload(value: Any, rows_field: str = "data") -> Any:
+    """
+    JSON-ready form of a response model built from trusted values. Nested
+    models are unpacked recursively, but any `rows_field` list (the records)
+    is passed through as-is instead of being copied and re-validated row by row.
+    """
+    if isinstance(value, BaseModel):
+        return {
+            name: (
+                getattr(value, name)
+                if name == rows_field
+                else trusted_payload(getattr(value, name), rows_field)
+            )
+            for name in type(value).model_fields
+        }
+    if isinstance(value, list):
+        return [trusted_payload(item, rows_field) for item in value]
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response for payloads the app already built and trusts. Returning
+    it from a route skips FastAPI's `response_model` validation/serialization
+    pass; the model stays declared for the OpenAPI schema only.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            content = trusted_payload(content)
+        return dumps(content)
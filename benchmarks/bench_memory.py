@@ -0,0 +1,107 @@
+"""
+Memory per row of CRM and support data: one parsed dict per row versus the
+compact `RecordColumns` store (dictionary-encoded enums, epoch-int
+timestamps), for the records alone and for the whole indexed `Dataset`.
+Sizes are the bytes reachable from each structure, counting shared objects
+once.
+
+    python -m benchmarks.bench_memory [--rows 1000000] [--sources crm support]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import random
+import sys
+from array import array
+from datetime import datetime, timezone
+from types import ModuleType
+from typing import Any
+
+from app.connectors import crm_connector, support_connector
+from app.connectors.columnar import RecordColumns
+from app.connectors.dataset import Dataset
+from app.utils.mock_data import generate_customers, generate_support_tickets
+
+SEED = 20240101
+REFERENCE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+SOURCES = {
+    "crm": (crm_connector, generate_customers),
+    "support": (support_connector, generate_support_tickets),
+}
+
+
+def deep_size(root: Any) -> int:
+    """
+    Bytes reachable from `root`, counting every object once (shared strings,
+    small ints and dictionary entries are not double-counted). Functions
+    and classes are not followed.
+    """
+    seen = set()
+    total = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or callable(obj) or isinstance(obj, ModuleType):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, (str, bytes, int, float, array)):
+            continue
+        else:
+            if hasattr(obj, "__dict__"):
+                stack.append(vars(obj))
+            for cls in type(obj).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    if hasattr(obj, slot):
+                        stack.append(getattr(obj, slot))
+    return total
+
+
+def per_row(value: Any, rows: int) -> float:
+    gc.collect()
+    return deep_size(value) / rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sources", nargs="+", default=list(SOURCES), choices=list(SOURCES))
+    args = parser.parse_args()
+
+    print(f"{'source':<8} {'variant':<10} {'dicts B/row':>12} {'compact B/row':>14} {'ratio':>7}")
+    for source in args.sources:
+        module, generate = SOURCES[source]
+        # Parse from JSON text so rows own their strings, as when loading a file.
+        text = json.dumps(generate(args.rows, rng=random.Random(SEED), now=REFERENCE_TIME))
+        layout = dict(enum_fields=module.ENUM_FIELDS, timestamp_fields=module.TIMESTAMP_FIELDS)
+        indexes = dict(
+            index_fields=module.INDEX_FIELDS,
+            sort_fields=module.SORT_FIELDS,
+            primary_key=module.PRIMARY_KEY,
+        )
+
+        records = json.loads(text)
+        columns = RecordColumns.from_records(records, **layout)
+        report(source, "records", per_row(records, args.rows), per_row(columns, args.rows))
+        report(
+            source,
+            "dataset",
+            per_row(Dataset(records, **indexes), args.rows),
+            per_row(Dataset(columns, **indexes), args.rows),
+        )
+
+
+def report(source: str, variant: str, dicts: float, compact: float) -> None:
+    print(f"{source:<8} {variant:<10} {dicts:>12.1f} {compact:>14.1f} {dicts / compact:>6.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Throughput of the request middleware: the pure ASGI `RequestLoggingMiddleware`
+versus the previous `BaseHTTPMiddleware` implementation, on /health and
+/data, driven in-process through httpx's ASGI transport.
+
+    python -m benchmarks.bench_middleware [--requests 2000] [--concurrency 32]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.main import RequestLoggingMiddleware, logger
+from app.routers import data, health
+
+
+class BaseHTTPRequestLoggingMiddleware(BaseHTTPMiddleware):
+    """The middleware as it was before the ASGI rewrite (profiling omitted)."""
+
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        except Exception:
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            logger.exception(
+                f"Unhandled error | request_id={request_id} | {request.method} {request.url.path} | {duration_ms}ms"
+            )
+            return JSONResponse(
+                status_code=500,
+                content={"detail": "Internal server error", "request_id": request_id},
+            )
+
+        duration_ms = int((time.perf_counter() - start) * 1000)
+        logger.info(
+            f"Request | request_id={request_id} | {request.method} {request.url.path} | {response.status_code} | {duration_ms}ms"
+        )
+        response.headers["x-request-id"] = request_id
+        return response
+
+
+def make_app(middleware) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(middleware)
+    app.include_router(health.router)
+    app.include_router(data.router)
+    return app
+
+
+async def throughput(app: FastAPI, url: str, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(url)  # warm caches
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one() -> None:
+            async with semaphore:
+                response = await client.get(url)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    # Measure the middleware, not the log handler.
+    logging.disable(logging.INFO)
+
+    apps = {
+        "BaseHTTPMiddleware": make_app(BaseHTTPRequestLoggingMiddleware),
+        "pure ASGI": make_app(RequestLoggingMiddleware),
+    }
+    print(f"{'endpoint':<22} {'middleware':<20} {'req/s':>10}")
+    for url in ("/health", "/data?source=crm"):
+        rates = {}
+        for name, app in apps.items():
+            rates[name] = asyncio.run(throughput(app, url, args.requests, args.concurrency))
+            print(f"{url:<22} {name:<20} {rates[name]:>10.0f}")
+        print(f"{'':<22} {'speedup':<20} {rates['pure ASGI'] / rates['BaseHTTPMiddleware']:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
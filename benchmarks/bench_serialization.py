@@ -0,0 +1,80 @@
+"""
+Compare the two ways a `/data` response can be serialized:
+
+* validated: build the models with validation, then FastAPI's
+  `response_model` pass (dump -> validate -> dump to JSON-able -> json.dumps);
+* fast: `model_construct` + `trusted_payload` + `dumps` (orjson if installed),
+  which is what the router returns now.
+
+    python -m benchmarks.bench_serialization [--rounds N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import timeit
+
+from pydantic import TypeAdapter
+
+from app.models.common import DataResponse, Metadata
+from app.utils.mock_data import generate_support_tickets
+from app.utils.serialization import dumps, orjson, trusted_payload
+
+SIZES = (10, 50, 10_000)
+
+_adapter = TypeAdapter(DataResponse)
+
+
+def _metadata(rows):
+    return dict(
+        total_results=len(rows),
+        page=1,
+        page_size=len(rows),
+        returned_results=len(rows),
+        total_pages=1,
+        has_more=False,
+        data_freshness="2024-01-01T00:00:00+00:00",
+        voice_hint=f"Showing {len(rows)} of {len(rows)} results",
+    )
+
+
+def validated(rows) -> bytes:
+    response = DataResponse(
+        source="support", data_type="support_tickets", data=rows, metadata=Metadata(**_metadata(rows))
+    )
+    content = _adapter.validate_python(response.model_dump())
+    payload = _adapter.dump_python(content, mode="json")
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast(rows) -> bytes:
+    response = DataResponse.model_construct(
+        source="support",
+        data_type="support_tickets",
+        data=rows,
+        metadata=Metadata.model_construct(**_metadata(rows)),
+    )
+    return dumps(trusted_payload(response))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"{'rows':>8} {'validated ms':>14} {'fast ms':>10} {'speedup':>8}")
+    for size in SIZES:
+        rows = generate_support_tickets(size)
+        assert json.loads(validated(rows)) == json.loads(fast(rows))
+        rounds = max(1, args.rounds * 50 // max(size, 50))
+        slow_ms = min(timeit.repeat(lambda: validated(rows), number=rounds, repeat=3)) / rounds * 1e3
+        fast_ms = min(timeit.repeat(lambda: fast(rows), number=rounds, repeat=3)) / rounds * 1e3
+        print(f"{size:>8} {slow_ms:>14.3f} {fast_ms:>10.3f} {slow_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
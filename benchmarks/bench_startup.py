@@ -0,0 +1,65 @@
+"""
+Cold-start cost of a connector's dataset: parsing the JSON file and building
+its indexes, versus mapping a compiled snapshot. Both variants finish by
+serving one sorted page, so lazily decoded snapshot rows are paid for too.
+
+    python -m benchmarks.bench_startup [--rows 10000 100000 ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from app.connectors.cache import load_json_records
+from app.connectors.crm_connector import INDEX_FIELDS, PRIMARY_KEY, SORT_FIELDS
+from app.connectors.dataset import Dataset
+from app.connectors.query import QueryPlan
+from app.connectors.snapshot import compile_snapshot, load_dataset
+from app.utils.mock_data import generate_customers
+
+PLAN = QueryPlan(filters={"status": "active"}, sort_key="created_at", descending=True, limit=10)
+FIELDS = dict(primary_key=PRIMARY_KEY, index_fields=INDEX_FIELDS, sort_fields=SORT_FIELDS)
+
+
+def from_json(path: Path) -> list:
+    dataset = Dataset(load_json_records(path), **FIELDS)
+    return dataset.execute(dataset.match(status="active"), PLAN).rows
+
+
+def from_snapshot(path: Path) -> list:
+    dataset = load_dataset(path, **FIELDS)
+    return dataset.execute(dataset.match(status="active"), PLAN).rows
+
+
+def timed(func, *args) -> tuple:
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'json ms':>10} {'compile ms':>11} {'snapshot ms':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            random.seed(0)
+            path = Path(tmp) / f"customers_{rows}.json"
+            path.write_text(json.dumps(generate_customers(rows)), encoding="utf-8")
+
+            json_ms, expected = timed(from_json, path)
+            compile_ms, _ = timed(compile_snapshot, path, *FIELDS.values())
+            snapshot_ms, page = timed(from_snapshot, path)
+            assert page == expected
+            print(f"{rows:>9} {json_ms:>10.1f} {compile_ms:>11.1f} {snapshot_ms:>12.1f} {json_ms / snapshot_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
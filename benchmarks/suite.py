@@ -0,0 +1,258 @@
+"""
+Benchmark suite for the `/data` pipeline on synthetic datasets.
+
+Datasets come from `app.utils.mock_data` with a fixed seed and reference
+date, so every run (and every release) measures identical data. For each
+source and size the suite times the pipeline stages in-process (parse,
+index build, filter, execute, paginate, summarize_for_voice, execute with
+the summary projection pushed down, serialize) and the end-to-end
+GET /data request through the ASGI app, without network. Results are written as JSON, and `--baseline` compares them with
+an earlier run.
+
+    python -m benchmarks.suite --sizes 1000 100000 --output bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 1.25
+
+Sizes up to 10M rows work but need several GB of RAM. Files above
+STREAMING_MIN_FILE_BYTES are served by the streaming path; each result
+records which path was used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.connectors import analytics_connector, crm_connector, support_connector
+from app.connectors.cache import dataset_cache, load_json_records
+from app.connectors.columnar import np
+from app.connectors.query import QueryPlan
+from app.connectors.stream import use_streaming
+from app.main import app
+from app.routers.data import DataSource, connector_map, resolve_sort, response_cache
+from app.services.business_rules import paginate
+from app.services.voice_optimizer import SUMMARY_FIELDS, summarize_for_voice
+from app.utils.mock_data import generate_analytics_metrics, generate_customers, generate_support_tickets
+from app.utils.serialization import dumps, orjson, trusted_payload
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+SEED = 20240101
+# Fixed reference time so generated timestamps do not drift between runs.
+REFERENCE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# Analytics rows are spread over metrics of at most this many days each.
+DAYS_PER_METRIC = 10_000
+
+SOURCES = {
+    "crm": (crm_connector, {"status": "active"}),
+    "support": (support_connector, {"status": "open", "priority": "high"}),
+    "analytics": (
+        analytics_connector,
+        {
+            "metric": "metric_0",
+            "start_date": (REFERENCE_TIME.date() - timedelta(days=365)).isoformat(),
+            "end_date": REFERENCE_TIME.date().isoformat(),
+        },
+    ),
+}
+
+
+def generate(source: str, rows: int) -> List[Dict[str, Any]]:
+    rng = random.Random(f"{SEED}:{source}:{rows}")
+    if source == "crm":
+        return generate_customers(rows, rng=rng, now=REFERENCE_TIME)
+    if source == "support":
+        return generate_support_tickets(rows, rng=rng, now=REFERENCE_TIME)
+    records: List[Dict[str, Any]] = []
+    for k in range(0, rows, DAYS_PER_METRIC):
+        records += generate_analytics_metrics(
+            f"metric_{k // DAYS_PER_METRIC}",
+            days=min(DAYS_PER_METRIC, rows - k),
+            rng=rng,
+            today=REFERENCE_TIME.date(),
+        )
+    return records
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": min(timings), "median_ms": statistics.median(timings)}
+
+
+def bench_source(source: str, rows: int, repeat: int, workdir: Path) -> List[Dict[str, Any]]:
+    module, filters = SOURCES[source]
+    connector = connector_map[DataSource(source)]
+    path = workdir / f"{source}_{rows}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(generate(source, rows), f)
+
+    # Point the connector at the generated file for the duration of the run.
+    original_path = module.DATA_PATH
+    module.DATA_PATH = path
+    dataset_cache.invalidate()
+    client = _InProcessClient()
+    try:
+        streaming = use_streaming(path)
+        sort_key, order = resolve_sort(DataSource(source), None, "desc")
+        page_plan = QueryPlan(filters=filters, sort_key=sort_key, descending=order == "desc", limit=10)
+        # Slow stages over the whole dataset run fewer times at large sizes.
+        heavy = max(1, min(repeat, 1_000_000 // rows))
+
+        stages: Dict[str, Callable[[], Any]] = {}
+        records = load_json_records(path)
+        stages["parse"] = lambda: load_json_records(path)
+        if not streaming:
+            dataset = module.build_dataset(records)
+            stages["build"] = lambda: module.build_dataset(records)
+            stages["filter"] = lambda: connector._select(dataset, filters)
+        stages["execute"] = lambda: connector.execute(page_plan)
+        filtered = connector.fetch(**filters)
+        stages["paginate"] = lambda: paginate(filtered, page=2, page_size=10)
+        page = connector.execute(page_plan).rows
+        stages["summarize_for_voice"] = lambda: summarize_for_voice(source, page)
+        summary_plan = replace(page_plan, fields=SUMMARY_FIELDS[source])
+        stages["execute_summary"] = lambda: connector.execute(summary_plan)
+        bulk = filtered[:10_000]
+        stages["summarize_for_voice_10k"] = lambda: summarize_for_voice(source, bulk)
+        stages["serialize"] = lambda: dumps(trusted_payload({"source": source, "data": page}))
+
+        url = f"/data?source={source}&" + "&".join(f"{k}={v}" for k, v in filters.items())
+        stages["request"] = lambda: client.get(url, cache=False)
+        stages["request_cached"] = lambda: client.get(url, cache=True)
+
+        results = []
+        for stage, func in stages.items():
+            runs = heavy if stage in ("parse", "build") else repeat
+            func()  # warm-up (also fills the dataset / response caches)
+            results.append({
+                "source": source,
+                "rows": rows,
+                "stage": stage,
+                "streaming": streaming,
+                "repeat": runs,
+                **measure(func, runs),
+            })
+        return results
+    finally:
+        client.close()
+        module.DATA_PATH = original_path
+        dataset_cache.invalidate()
+        response_cache.clear()
+
+
+class _InProcessClient:
+    """GET requests straight into the ASGI app on one long-lived event loop."""
+
+    def __init__(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    def get(self, url: str, cache: bool) -> None:
+        max_entries = response_cache.max_entries
+        response_cache.max_entries = max_entries if cache else 0
+        try:
+            response = self._loop.run_until_complete(self._client.get(url))
+        finally:
+            response_cache.max_entries = max_entries
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._loop.run_until_complete(self._client.aclose())
+        self._loop.close()
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np is not None,
+        "orjson": orjson is not None,
+        "seed": SEED,
+        "streaming_min_file_bytes": settings.STREAMING_MIN_FILE_BYTES,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Stages whose median is more than `threshold` times the baseline's."""
+    previous = {(r["source"], r["rows"], r["stage"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["source"], result["rows"], result["stage"]))
+        if before is None or before["median_ms"] <= 0:
+            continue
+        ratio = result["median_ms"] / before["median_ms"]
+        if ratio > threshold:
+            regressions.append(
+                f"{result['source']}/{result['rows']}/{result['stage']}: "
+                f"{before['median_ms']:.3f}ms -> {result['median_ms']:.3f}ms ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the /data pipeline on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--sources", nargs="+", default=list(SOURCES), choices=list(SOURCES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="earlier --output file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="regression ratio (default 1.25)")
+    args = parser.parse_args(argv)
+
+    # Request logging would dominate the in-process request timings.
+    logging.disable(logging.INFO)
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for source in args.sources:
+            for rows in args.sizes:
+                for result in bench_source(source, rows, args.repeat, Path(tmp)):
+                    results.append(result)
+                    print(
+                        f"{result['source']:>9} {result['rows']:>9} {result['stage']:<24}"
+                        f" min {result['min_ms']:>10.3f}ms  median {result['median_ms']:>10.3f}ms",
+                        file=sys.stderr,
+                    )
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+from statistics import mean
+
+import pytest
+
+from app.connectors.columnar import MetricSeries
+from app.services.aggregation import aggregate_series, bucket_boundaries, parse_aggregation
+
+
+START = date(2025, 1, 1)
+
+
+def _series(values):
+    ordinals = [(START + timedelta(days=i)).toordinal() for i in range(len(values))]
+    return MetricSeries.from_points(ordinals, values, list(range(len(values))))
+
+
+VALUES = [(i * 37) % 101 for i in range(120)]
+
+
+def _window(first, last):
+    return [v for i, v in enumerate(VALUES) if first <= START + timedelta(days=i) <= last]
+
+
+def test_parse_aggregation():
+    assert parse_aggregation("avg") is None
+    assert parse_aggregation("p95") == 95.0
+    with pytest.raises(ValueError):
+        parse_aggregation("median")
+
+
+@pytest.mark.parametrize(
+    "agg, reference",
+    [
+        ("sum", sum),
+        ("avg", mean),
+        ("min", min),
+        ("max", max),
+        ("count", len),
+    ],
+)
+def test_monthly_buckets_match_reference(agg, reference):
+    buckets = aggregate_series(_series(VALUES), agg, group_by="month")
+
+    assert [b["start"] for b in buckets] == ["2025-01-01", "2025-02-01", "2025-03-01", "2025-04-01"]
+    for bucket in buckets:
+        expected = reference(
+            _window(date.fromisoformat(bucket["start"]), date.fromisoformat(bucket["end"]))
+        )
+        assert bucket["value"] == pytest.approx(expected)
+
+
+def test_window_percentile_and_range():
+    first, last = date(2025, 2, 3), date(2025, 2, 20)
+    [bucket] = aggregate_series(_series(VALUES), "p50", first, last)
+
+    window = sorted(_window(first, last))
+    assert bucket["count"] == len(window)
+    assert bucket["value"] == pytest.approx((window[8] + window[9]) / 2)
+
+
+def test_downsampling_covers_every_point_once():
+    buckets = aggregate_series(_series(VALUES), "count", points=7)
+
+    assert len(buckets) <= 7
+    assert sum(b["value"] for b in buckets) == len(VALUES)
+
+
+def test_week_boundaries_start_on_monday():
+    first = date(2025, 1, 1).toordinal()  # a Wednesday
+    boundaries = bucket_boundaries(first, first + 20, group_by="week")
+
+    assert all(date.fromordinal(b).weekday() == 0 for b in boundaries)
+    assert boundaries[0] <= first < boundaries[1]
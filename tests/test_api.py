@@ -1,5 +1,12 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.routers.data import DataSource, connector_map, response_cache, single_flight
 
 client = TestClient(app)
 
@@ -127,6 +134,34 @@ def test_summarize_true():
         assert "status" in first
 
 
+def test_fields_projection():
+    full = client.get("/data?source=support&sort_by=ticket_id&order=asc&page_size=5").json()
+    response = client.get("/data?source=support&sort_by=ticket_id&order=asc&page_size=5&fields=subject,ticket_id")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["data"] == [{"subject": r["subject"], "ticket_id": r["ticket_id"]} for r in full["data"]]
+    assert body["metadata"]["next_cursor"] == full["metadata"]["next_cursor"]
+
+    # Summaries are projections too; an explicit selection narrows them.
+    response = client.get("/data?source=support&summarize=true&fields=priority,email_unused")
+    assert response.status_code == 400
+    response = client.get("/data?source=support&summarize=true&fields=priority,customer_id")
+    assert all(list(row) == ["priority", "customer_id"] for row in response.json()["data"])
+
+    assert client.get("/data?source=crm&fields=ticket_id").status_code == 400
+    assert client.get("/data?source=crm&fields=,").status_code == 400
+
+
+def test_data_type_follows_source_not_projection():
+    cases = (
+        ("/data?source=analytics&fields=metric,value", "time_series"),
+        ("/data?source=crm&fields=status", "tabular_crm"),
+        ("/data?source=support&status=no-such-status", "tabular_support"),
+    )
+    for url, data_type in cases:
+        assert client.get(url).json()["data_type"] == data_type
+
+
 # -------------------------
 # INVALID SOURCE
 # -------------------------
@@ -135,3 +170,489 @@ def test_invalid_source():
     response = client.get("/data?source=invalid")
     assert response.status_code in [400, 422]
 
+
+
+# -------------------------
+# KEYSET CURSOR PAGINATION
+# -------------------------
+
+def test_cursor_pagination_walks_all_rows():
+    by_page = client.get(
+        "/data?source=support&sort_by=priority&order=asc&page_size=50&voice_mode=false"
+    ).json()["data"]
+
+    seen = []
+    url = "/data?source=support&sort_by=priority&order=asc&page_size=7&voice_mode=false"
+    body = client.get(url).json()
+    while True:
+        seen.extend(body["data"])
+        cursor = body["metadata"]["next_cursor"]
+        if cursor is None:
+            break
+        body = client.get(f"{url}&cursor={cursor}").json()
+        assert body["metadata"]["page"] is None and body["metadata"]["total_pages"] is None
+
+    assert [r["ticket_id"] for r in seen] == [r["ticket_id"] for r in by_page]
+
+
+def test_cursor_must_match_sort():
+    body = client.get("/data?source=crm&page_size=5").json()
+    cursor = body["metadata"]["next_cursor"]
+    assert cursor is not None
+
+    response = client.get("/data", params={"source": "crm", "sort_by": "name", "cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_invalid_cursor():
+    response = client.get("/data?source=crm&cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+def test_cursor_with_mismatched_types_is_rejected():
+    from app.services.business_rules import encode_cursor
+
+    cursor = encode_cursor("created_at", "desc", 42, ("not-an-id", 1))
+    response = client.get("/data", params={"source": "crm", "cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor."
+
+
+def test_malformed_dates_are_rejected_everywhere():
+    cursor = client.get("/data?source=analytics&page_size=2").json()["metadata"]["next_cursor"]
+    for params in (
+        {"source": "analytics", "start_date": "yesterday"},
+        {"source": "analytics", "end_date": "2024-13-01", "cursor": cursor},
+    ):
+        response = client.get("/data", params=params)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Dates must be YYYY-MM-DD."
+
+    assert client.get("/data/export?source=analytics&start_date=yesterday").status_code == 400
+    results = client.post(
+        "/data/batch", json={"queries": [{"source": "analytics", "start_date": "yesterday"}]}
+    ).json()["results"]
+    assert results[0]["error"] == {"status_code": 400, "detail": "Dates must be YYYY-MM-DD."}
+
+
+# -------------------------
+# STREAMING EXPORT
+# -------------------------
+
+def test_export_streams_all_matching_rows_as_ndjson():
+    response = client.get("/data/export?source=support&status=open&sort_by=ticket_id&order=asc")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    total = client.get("/data?source=support&status=open").json()["metadata"]["total_results"]
+    assert len(rows) == total
+    assert all(r["status"] == "open" for r in rows)
+    assert [r["ticket_id"] for r in rows] == sorted(r["ticket_id"] for r in rows)
+
+
+def test_export_projects_fields_and_defaults_to_source_order(monkeypatch):
+    response = client.get("/data/export?source=crm&fields=name,status")
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [{"name": r["name"], "status": r["status"]} for r in connector_map[DataSource.crm].fetch()]
+
+    assert client.get("/data/export?source=crm&fields=priority").status_code == 400
+
+    # Streaming-size files: the unsorted export never materializes the result.
+    monkeypatch.setattr("app.connectors.stream.settings.STREAMING_MIN_FILE_BYTES", 1)
+    monkeypatch.setattr(
+        "app.connectors.stream.execute_stream",
+        lambda *args, **kwargs: pytest.fail("export buffered the rows"),
+    )
+    streamed = client.get("/data/export?source=crm&fields=name,status")
+    assert [json.loads(line) for line in streamed.text.splitlines()] == rows
+
+
+def test_export_rejects_invalid_filter():
+    response = client.get("/data/export?source=crm&priority=high")
+    assert response.status_code == 400
+
+
+# -------------------------
+# CONCURRENCY
+# -------------------------
+
+def test_slow_fetch_does_not_block_other_requests(monkeypatch):
+    crm = connector_map[DataSource.crm]
+
+    class SlowCRMConnector(type(crm)):
+        def execute(self, plan):
+            time.sleep(0.5)  # blocking I/O / parse stand-in
+            return super().execute(plan)
+
+    monkeypatch.setitem(connector_map, DataSource.crm, SlowCRMConnector())
+    monkeypatch.setattr(response_cache, "max_entries", 0)
+
+    async def timed_get(http, url):
+        response = await http.get(url)
+        return response.status_code, time.perf_counter()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            start = time.perf_counter()
+            slow = asyncio.create_task(timed_get(http, "/data?source=crm"))
+            await asyncio.sleep(0.05)
+            fast = await timed_get(http, "/data?source=support")
+            return start, fast, await slow
+
+    start, (fast_status, fast_done), (slow_status, slow_done) = asyncio.run(scenario())
+
+    assert fast_status == 200 and slow_status == 200
+    assert fast_done - start < 0.4
+    assert fast_done < slow_done
+
+
+# -------------------------
+# BATCH
+# -------------------------
+
+def test_batch_returns_per_query_results_and_errors():
+    response = client.post(
+        "/data/batch",
+        json={
+            "queries": [
+                {"source": "crm", "status": "active"},
+                {"source": "support", "status": "open", "priority": "high"},
+                {"source": "analytics", "priority": "high"},
+            ]
+        },
+    )
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert [r["response"]["source"] for r in results[:2]] == ["crm", "support"]
+    assert results[0]["error"] is None
+    assert results[2]["response"] is None
+    assert results[2]["error"]["status_code"] == 400
+
+
+def test_batch_validates_body():
+    assert client.post("/data/batch", json={"queries": []}).status_code == 422
+    response = client.post("/data/batch", json={"queries": [{"source": "crm", "page": 0}]})
+    assert response.status_code == 422
+
+
+def test_batch_runs_queries_concurrently(monkeypatch):
+    for source in (DataSource.crm, DataSource.support):
+        connector = connector_map[source]
+
+        class SlowConnector(type(connector)):
+            def execute(self, plan):
+                time.sleep(0.3)
+                return super().execute(plan)
+
+        monkeypatch.setitem(connector_map, source, SlowConnector())
+
+    start = time.perf_counter()
+    response = client.post(
+        "/data/batch", json={"queries": [{"source": "crm"}, {"source": "support"}]}
+    )
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == 200
+    assert all(r["error"] is None for r in response.json()["results"])
+    assert elapsed < 0.55
+
+
+# -------------------------
+# ANALYTICS AGGREGATION
+# -------------------------
+
+def test_analytics_aggregate_average():
+    rows = client.get(
+        "/data/export?source=analytics&metric=daily_active_users"
+        "&start_date=2026-02-10&end_date=2026-02-16"
+    ).text.splitlines()
+    values = [json.loads(line)["value"] for line in rows]
+
+    response = client.get(
+        "/data/analytics/aggregate?metric=daily_active_users&agg=avg"
+        "&start_date=2026-02-10&end_date=2026-02-16"
+    )
+    assert response.status_code == 200
+    [bucket] = response.json()["buckets"]
+    assert bucket["count"] == len(values)
+    assert abs(bucket["value"] - sum(values) / len(values)) < 1e-9
+
+
+def test_analytics_aggregate_rejects_bad_params():
+    assert client.get("/data/analytics/aggregate?metric=x&agg=median").status_code == 400
+    assert client.get(
+        "/data/analytics/aggregate?metric=x&group_by=week&points=5"
+    ).status_code == 400
+    assert client.get("/data/analytics/aggregate?metric=x&group_by=year").status_code == 422
+
+
+# -------------------------
+# CONDITIONAL GET / RESPONSE CACHE
+# -------------------------
+
+def test_etag_and_if_none_match():
+    url = "/data?source=support&status=open&sort_by=ticket_id"
+    first = client.get(url)
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"]
+
+    repeat = client.get(url, headers={"If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.headers["etag"] == etag
+    assert repeat.content == b""
+
+    other = client.get(url + "&page=2", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["etag"] != etag
+
+
+def test_if_modified_since():
+    url = "/data?source=crm"
+    last_modified = client.get(url).headers["last-modified"]
+
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get(
+        url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"}
+    ).status_code == 200
+
+
+def test_invalid_query_is_rejected_before_conditional_checks():
+    for url in (
+        "/data?source=crm&priority=high",
+        "/data?source=crm&sort_by=nope",
+        "/data?source=crm&fields=nope",
+        "/data?source=crm&cursor=not-a-cursor",
+    ):
+        for headers in ({"If-None-Match": "*"}, {"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}):
+            assert client.get(url, headers=headers).status_code == 400
+
+
+def test_cached_response_refreshes_volatile_fields():
+    url = "/data?source=analytics&sort_by=value&order=asc"
+    first = client.get(url).json()
+    hits = response_cache.stats()["hits"]
+    time.sleep(0.01)
+    second = client.get(url).json()
+
+    assert response_cache.stats()["hits"] == hits + 1
+    assert second["data"] == first["data"]
+    assert second["metadata"]["data_freshness"] > first["metadata"]["data_freshness"]
+    assert (
+        second["metadata"]["data_staleness_seconds"]
+        >= first["metadata"]["data_staleness_seconds"]
+    )
+
+
+def test_dataset_change_invalidates_etag(monkeypatch):
+    url = "/data?source=crm&status=active"
+    etag = client.get(url).headers["etag"]
+
+    connector = connector_map[DataSource.crm]
+    monkeypatch.setattr(connector, "data_version", lambda: "changed")
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_identical_concurrent_queries_are_coalesced(monkeypatch):
+    crm = connector_map[DataSource.crm]
+    executed = []
+
+    class SlowCRMConnector(type(crm)):
+        def execute(self, plan):
+            executed.append(plan)
+            time.sleep(0.2)
+            return super().execute(plan)
+
+    monkeypatch.setitem(connector_map, DataSource.crm, SlowCRMConnector())
+    response_cache.clear()
+    before = single_flight.stats()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            urls = ["/data?source=crm&status=active&page_size=3"] * 5 + ["/data?source=crm&status=inactive"]
+            return await asyncio.gather(*(http.get(url) for url in urls))
+
+    responses = asyncio.run(scenario())
+
+    assert all(r.status_code == 200 for r in responses)
+    assert len(executed) == 2
+    same = [r.json() for r in responses[:5]]
+    assert all(body["data"] == same[0]["data"] for body in same)
+    assert len({r.headers["etag"] for r in responses}) == 2
+
+    after = single_flight.stats()
+    assert after["coalesced"] - before["coalesced"] == 4
+    assert after["executed"] - before["executed"] == 2
+    assert after["in_flight"] == 0
+    assert 'udc_coalesced_requests_total{event="coalesced"}' in client.get("/metrics").text
+
+
+def test_fast_serialization_matches_validated_model(monkeypatch):
+    from app.models.common import BatchResponse, DataResponse
+
+    monkeypatch.setattr(response_cache, "max_entries", 0)
+    response = client.get("/data?source=support&status=open&summarize=true")
+    assert response.status_code == 200
+    body = response.json()
+    assert DataResponse.model_validate(body).model_dump(mode="json") == body
+
+    batch = client.post(
+        "/data/batch",
+        json={"queries": [{"source": "crm"}, {"source": "nope"}]},
+    ).json()
+    assert BatchResponse.model_validate(batch).model_dump(mode="json") == batch
+
+
+def test_metrics_endpoint_exposes_stage_histograms():
+    client.get("/data?source=support&status=open&summarize=true")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    text = response.text
+    for stage in ("validate", "load", "filter", "sort_page", "execute", "summarize", "response"):
+        assert f'udc_stage_duration_seconds_count{{source="support",stage="{stage}"}}' in text
+    assert 'udc_stage_duration_seconds_bucket{source="support",stage="filter",le="+Inf"}' in text
+    assert 'udc_rows_total{source="support",kind="returned"}' in text
+    assert "udc_response_cache_hit_ratio" in text
+    assert 'udc_dataset_cache_events_total{event="pinned_hits"}' in text
+
+
+def test_metrics_disabled_records_nothing(monkeypatch):
+    from app.utils.metrics import Metrics, metrics
+
+    disabled = Metrics(enabled=False)
+    assert disabled.lap("crm", "filter", disabled.clock()) == 0.0
+    disabled.count_rows("crm", scanned=5, returned=1)
+    assert "crm" not in disabled.render()
+
+    monkeypatch.setattr(metrics, "enabled", False)
+    assert client.get("/metrics").status_code == 404
+
+
+def test_profiling_writes_profile_for_admin_header(monkeypatch, tmp_path):
+    import pstats
+
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(response_cache, "max_entries", 0)
+
+    response = client.get("/data?source=crm", headers={"x-profile": "wrong"})
+    assert "x-profile-file" not in response.headers
+
+    response = client.get(
+        "/data?source=crm",
+        headers={"x-profile": "secret", "x-request-id": "../slow query"},
+    )
+    assert response.status_code == 200
+    assert response.headers["x-profile-file"] == "_slow_query.prof"
+
+    stats = pstats.Stats(str(tmp_path / "_slow_query.prof"))
+    # Includes the connector call that ran on the connector pool thread.
+    assert any(
+        name == "execute" and filename.endswith("file_connector.py")
+        for filename, _, name in stats.stats
+    )
+
+
+def test_profiling_streamed_export(monkeypatch, tmp_path):
+    import pstats
+
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path))
+
+    response = client.get(
+        "/data/export?source=crm",
+        headers={"x-profile": "secret", "x-request-id": "export-1"},
+    )
+    assert response.status_code == 200
+    assert response.text
+    assert response.headers["x-profile-file"] == "export-1.prof"
+    assert pstats.Stats(str(tmp_path / "export-1.prof")).stats
+
+    # The profiler slot was released, so the next request can be profiled.
+    response = client.get("/data/export?source=crm", headers={"x-profile": "secret"})
+    assert response.status_code == 200 and "x-profile-file" in response.headers
+
+
+def test_request_id_is_propagated_and_errors_are_shaped(monkeypatch):
+    response = client.get("/health", headers={"x-request-id": "req-123"})
+    assert response.headers["x-request-id"] == "req-123"
+    assert client.get("/health").headers["x-request-id"]
+
+    def boom(plan):
+        raise RuntimeError("connector exploded")
+
+    monkeypatch.setattr(response_cache, "max_entries", 0)
+    monkeypatch.setattr(connector_map[DataSource.crm], "execute", boom)
+    response = client.get("/data?source=crm", headers={"x-request-id": "req-500"})
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Internal server error", "request_id": "req-500"}
+    assert response.headers["x-request-id"] == "req-500"
+
+
+def test_access_log_is_sampled(monkeypatch, caplog):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 3)
+    with caplog.at_level("INFO", logger="app.access"):
+        for _ in range(6):
+            client.get("/health")
+    access = [r for r in caplog.records if r.name == "app.access"]
+    assert len(access) == 2
+    assert access[0].path == "/health" and access[0].status == 200
+
+    caplog.clear()
+    monkeypatch.setattr(settings, "ACCESS_LOG_SAMPLE_RATE", 0)
+    with caplog.at_level("INFO", logger="app.access"):
+        client.get("/health")
+    assert not [r for r in caplog.records if r.name == "app.access"]
+
+
+def test_queued_records_are_formatted_on_listener_as_json():
+    import io
+    import logging
+    import queue
+    from logging.handlers import QueueListener
+
+    from app.utils.logging import JsonFormatter, NonBlockingQueueHandler
+
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, output)
+
+    logger = logging.getLogger("test.queued")
+    handler = NonBlockingQueueHandler(log_queue)
+    logger.addHandler(handler)
+    try:
+        logger.warning("rows=%s", 42, extra={"source": "crm"})
+        record = log_queue.get_nowait()
+        # Interpolation is left to the listener thread.
+        assert record.msg == "rows=%s" and record.args == (42,)
+        log_queue.put(record)
+
+        listener.start()
+        listener.stop()
+    finally:
+        logger.removeHandler(handler)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "rows=42"
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "test.queued"
+    assert entry["source"] == "crm"
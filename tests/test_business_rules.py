@@ -1,6 +1,8 @@
 from app.services.business_rules import (
     enforce_page_size,
+    page_counts,
     paginate,
+    top_k,
 )
 from app.config import settings
 
@@ -41,3 +43,18 @@ def test_paginate_last_page():
     assert len(paginated) == 5
     assert has_more is False
 
+
+
+def test_page_counts():
+    assert page_counts(42, page=2, page_size=5) == (9, True)
+    assert page_counts(10, page=2, page_size=5) == (2, False)
+    assert page_counts(0, page=1, page_size=5) == (1, False)
+
+
+def test_top_k_matches_stable_sort():
+    data = [{"id": i, "score": i % 4 + 1} for i in range(20)]
+
+    for descending in (False, True):
+        expected = sorted(data, key=lambda x: x["score"], reverse=descending)
+        assert top_k(data, "score", descending, 6) == expected[:6]
+        assert top_k(data, "score", descending, 50) == expected
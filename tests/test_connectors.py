@@ -1,6 +1,24 @@
+import json
+import os
+import random
+
+import pytest
+from datetime import date, timedelta
+
+from app.connectors.base import BaseConnector
 from app.connectors.crm_connector import CRMConnector
 from app.connectors.support_connector import SupportConnector
-from app.connectors.analytics_connector import AnalyticsConnector
+from app.connectors.analytics_connector import AnalyticsConnector, load_snapshot
+from app.connectors.analytics_connector import build_dataset as analytics_build_dataset
+from app.connectors.cache import DatasetCache, estimate_size, load_json_records
+from app.connectors.columnar import AnalyticsColumns, RecordColumns
+from app.connectors.dataset import Dataset, intersect
+from app.connectors.query import QueryPlan
+from app.connectors.snapshot import compile_snapshot, load_dataset
+from app.connectors.stream import execute_stream, iter_json_array
+from app.connectors.watcher import DataWatcher
+from app.routers.data import SOURCE_ALLOWED_SORT_FIELDS, connector_map
+from app.utils.mock_data import generate_analytics_metrics
 
 
 def test_crm_connector_loads_data():
@@ -28,6 +46,16 @@ def test_support_connector_priority_filter():
         assert item["priority"] == "low"
 
 
+def test_support_connector_combined_filters_match_scan():
+    connector = SupportConnector()
+    everything = connector.fetch()
+    expected = [
+        d for d in everything if d["status"] == "open" and d["priority"] == "high"
+    ]
+
+    assert connector.fetch(status="open", priority="high") == expected
+
+
 def test_analytics_connector_metric_filter():
     connector = AnalyticsConnector()
     data = connector.fetch(metric="daily_active_users")
@@ -35,3 +63,758 @@ def test_analytics_connector_metric_filter():
     for item in data:
         assert item["metric"] == "daily_active_users"
 
+
+def _write_records(path, records):
+    path.write_text(json.dumps(records), encoding="utf-8")
+
+
+def test_dataset_cache_reuses_parsed_records(tmp_path):
+    path = tmp_path / "rows.json"
+    _write_records(path, [{"id": 1}, {"id": 2}])
+    cache = DatasetCache(max_bytes=1024 * 1024)
+
+    first = cache.get(path)
+    second = cache.get(path)
+
+    assert first is second
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_dataset_cache_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "rows.json"
+    _write_records(path, [{"id": 1}])
+    cache = DatasetCache(max_bytes=1024 * 1024)
+    cache.get(path)
+
+    _write_records(path, [{"id": 1}, {"id": 2}, {"id": 3}])
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    assert len(cache.get(path)) == 3
+    assert cache.stats()["reloads"] == 1
+
+
+def test_dataset_cache_evicts_least_recently_used(tmp_path):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.json"
+        _write_records(path, [{"id": i, "name": name} for i in range(20)])
+        paths.append(path)
+
+    one_entry = estimate_size(load_json_records(paths[0]))
+    cache = DatasetCache(max_bytes=one_entry * 2)
+    for path in paths:
+        cache.get(path)
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= cache.max_bytes
+
+
+def test_dataset_cache_keeps_oversize_dataset_alone(tmp_path, caplog):
+    small, large = tmp_path / "small.json", tmp_path / "large.json"
+    _write_records(small, [{"id": 1}])
+    _write_records(large, [{"id": i} for i in range(200)])
+    cache = DatasetCache(max_bytes=estimate_size(load_json_records(large)) - 1)
+
+    cache.get(small)
+    with caplog.at_level("WARNING", logger="app.connectors.cache"):
+        first = cache.get(large)
+    assert "exceeds DATASET_CACHE_MAX_BYTES" in caplog.text
+    # Served from the cache (no rebuild per request); everything else evicted.
+    assert cache.get(large) is first
+    assert cache.stats()["entries"] == 1 and cache.stats()["evictions"] == 1
+
+
+def test_execute_matches_full_sort():
+    for source, connector in connector_map.items():
+        # Indexed connectors break sort ties by primary key.
+        everything = sorted(
+            connector.fetch(),
+            key=lambda x: tuple(x[f] for f in connector.primary_key),
+        )
+        for field in SOURCE_ALLOWED_SORT_FIELDS[source]:
+            for descending in (False, True):
+                expected = sorted(
+                    everything, key=lambda x: x.get(field) or "", reverse=descending
+                )
+                plan = QueryPlan(sort_key=field, descending=descending, offset=4, limit=7)
+                result = connector.execute(plan)
+                assert result.rows == expected[4:11]
+                assert result.total == len(everything)
+
+
+def test_execute_with_filters_and_projection():
+    connector = SupportConnector()
+    matches = connector.fetch(status="open")
+    expected = sorted(matches, key=lambda x: x["created_at"], reverse=True)
+
+    plan = QueryPlan(
+        filters={"status": "open"},
+        sort_key="created_at",
+        descending=True,
+        limit=3,
+        fields=("ticket_id", "created_at"),
+    )
+    result = connector.execute(plan)
+
+    assert result.rows == [
+        {"ticket_id": d["ticket_id"], "created_at": d["created_at"]} for d in expected[:3]
+    ]
+    assert result.total == len(matches)
+
+
+def test_base_connector_execute_fallback():
+    class ListConnector(BaseConnector):
+        def fetch(self, **filters):
+            return [{"id": i, "even": i % 2 == 0} for i in range(1, 21)]
+
+    result = ListConnector().execute(
+        QueryPlan(sort_key="id", descending=True, offset=5, limit=5, fields=("id",))
+    )
+
+    assert result.rows == [{"id": i} for i in range(15, 10, -1)]
+    assert result.total == 20
+
+
+def test_dataset_match_intersects_indexes():
+    records = [
+        {"id": 0, "status": "open", "priority": "high", "tag": "a"},
+        {"id": 1, "status": "open", "priority": "low", "tag": "a"},
+        {"id": 2, "status": "closed", "priority": "high", "tag": "b"},
+        {"id": 3, "status": "open", "priority": "high", "tag": "b"},
+    ]
+    dataset = Dataset(records, index_fields=("status", "priority"))
+
+    assert dataset.match() is None
+    assert dataset.match(status="open", priority="high") == [0, 3]
+    assert dataset.match(status="open", priority="high", tag="b") == [3]
+    assert dataset.match(status="missing") == []
+
+
+def test_intersect_sorted_postings():
+    assert intersect([[1, 4, 7, 9], [0, 4, 9, 12], [4, 5, 9]]) == [4, 9]
+    assert intersect([[1, 2], []]) == []
+
+
+def test_keyset_seek_survives_inserted_rows():
+    records = [{"id": i, "score": i % 3 + 1} for i in range(1, 13)]
+    dataset = Dataset(records, sort_fields=("score",), primary_key=("id",))
+    first = dataset.execute(None, QueryPlan(sort_key="score", limit=5))
+
+    # A new row sorting before the cursor must not shift the next page.
+    changed = Dataset(
+        [{"id": 0, "score": 1}] + records, sort_fields=("score",), primary_key=("id",)
+    )
+    second = changed.execute(
+        None, QueryPlan(sort_key="score", limit=5, after=first.last_key)
+    )
+
+    full = sorted(records, key=lambda r: (r["score"], r["id"]))
+    assert first.rows == full[:5]
+    assert second.rows == full[5:10]
+    assert second.has_more is True
+
+
+def test_keyset_seek_with_filters_and_missing_value():
+    records = [{"id": i, "score": i * 10, "kind": "a" if i % 2 else "b"} for i in range(1, 11)]
+    dataset = Dataset(
+        records, index_fields=("kind",), sort_fields=("score",), primary_key=("id",)
+    )
+
+    result = dataset.execute(
+        dataset.match(kind="a"),
+        QueryPlan(sort_key="score", descending=True, limit=2, after=(55, (0,))),
+    )
+
+    assert [r["id"] for r in result.rows] == [5, 3]
+    assert result.has_more is True
+    assert result.last_key == (30, (3,))
+
+
+def test_sort_keeps_zero_values_and_puts_missing_first(tmp_path):
+    records = [
+        {"id": 1, "value": 3},
+        {"id": 2, "value": 0},
+        {"id": 3},
+        {"id": 4, "value": -1.5},
+        {"id": 0, "value": 0},
+    ]
+    fields = dict(sort_fields=("id", "value"), primary_key=("id",))
+    dataset = Dataset(records, **fields)
+    path = tmp_path / "rows.json"
+    _write_records(path, records)
+    compile_snapshot(path, **fields)
+
+    class RowsConnector(BaseConnector):
+        primary_key = ("id",)
+
+        def fetch(self, **filters):
+            return records
+
+    for run in (
+        lambda plan: dataset.execute(None, plan),
+        lambda plan: load_dataset(path, **fields).execute(None, plan),
+        lambda plan: execute_stream(iter(records), plan, ("id",)),
+        RowsConnector().execute,
+    ):
+        ascending = run(QueryPlan(sort_key="value"))
+        assert [r["id"] for r in ascending.rows] == [3, 4, 0, 2, 1]
+        assert [r["id"] for r in run(QueryPlan(sort_key="value", descending=True)).rows] == [1, 0, 2, 4, 3]
+        assert [r["id"] for r in run(QueryPlan(sort_key="id", limit=2)).rows] == [0, 1]
+        # Keyset seek past a zero value.
+        page = run(QueryPlan(sort_key="value", limit=3))
+        assert page.last_key == (0, (0,))
+        assert [r["id"] for r in run(QueryPlan(sort_key="value", after=page.last_key)).rows] == [2, 1]
+
+    analytics = [
+        {"metric": "m", "date": "2024-01-01", "value": 0},
+        {"metric": "m", "date": "2024-01-02", "value": 2},
+    ]
+    result = analytics_build_dataset(analytics).execute(None, QueryPlan(sort_key="value", descending=True))
+    assert [r["value"] for r in result.rows] == [2, 0]
+
+
+def test_iter_rows_is_lazy_and_matches_execute():
+    connector = CRMConnector()
+    plan = QueryPlan(
+        filters={"status": "active"}, sort_key="name", fields=("customer_id", "name")
+    )
+
+    rows = connector.iter_rows(plan)
+
+    assert not isinstance(rows, list)
+    assert list(rows) == connector.execute(plan).rows
+
+
+def test_analytics_columns_range_matches_row_scan():
+    records = generate_analytics_metrics("revenue", days=400) + generate_analytics_metrics(
+        "daily_active_users", days=400
+    )
+    columns = AnalyticsColumns.from_records(records)
+    assert columns is not None
+    assert list(columns) == records
+
+    start, end = date.today() - timedelta(days=120), date.today() - timedelta(days=30)
+    for metric in (None, "revenue", "missing"):
+        expected = [
+            i for i, r in enumerate(records)
+            if (metric is None or r["metric"] == metric)
+            and start <= date.fromisoformat(r["date"]) <= end
+        ]
+        assert columns.range_row_ids(metric, start, end) == expected
+
+    assert columns.nbytes < estimate_size(records) / 3
+
+
+def test_analytics_columns_reject_off_schema_rows():
+    assert AnalyticsColumns.from_records([{"metric": "m", "date": "2026-01-01"}]) is None
+    assert AnalyticsColumns.from_records(
+        [{"metric": "m", "date": "2026-01-01", "value": 1, "extra": True}]
+    ) is None
+
+
+def test_analytics_mixed_int_float_values_keep_their_type(tmp_path):
+    records = [
+        {"metric": "m", "date": "2026-01-01", "value": 872},
+        {"metric": "m", "date": "2026-01-02", "value": 12.5},
+    ]
+    assert AnalyticsColumns.from_records(records) is None
+    assert list(analytics_build_dataset(records).records) == records
+
+    path = tmp_path / "analytics.json"
+    _write_records(path, records)
+    compile_snapshot(path, primary_key=("metric", "date"), index_fields=("metric",), sort_fields=("metric", "date", "value"))
+    rows = list(load_snapshot(path).records)
+    assert rows == records and type(rows[0]["value"]) is int
+
+
+def test_record_columns_match_plain_rows():
+    from datetime import datetime, timezone
+
+    from app.connectors import support_connector
+    from app.utils.mock_data import generate_support_tickets
+
+    records = json.loads(json.dumps(
+        generate_support_tickets(500, rng=random.Random(3), now=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    ))
+    del records[7]["priority"]
+    records[9]["note"] = None
+    columns = RecordColumns.from_records(
+        records,
+        enum_fields=support_connector.ENUM_FIELDS,
+        timestamp_fields=support_connector.TIMESTAMP_FIELDS,
+    )
+    assert list(columns) == records
+    assert sorted(columns.columns["priority"].dictionary) == ["high", "low", "medium"]
+    assert columns.nbytes < estimate_size(records)
+
+    fields = dict(
+        index_fields=support_connector.INDEX_FIELDS,
+        sort_fields=support_connector.SORT_FIELDS,
+        primary_key=support_connector.PRIMARY_KEY,
+    )
+    expected, compact = Dataset(records, **fields), Dataset(columns, **fields)
+    for sort_key in support_connector.SORT_FIELDS:
+        for descending in (False, True):
+            plan = QueryPlan(sort_key=sort_key, descending=descending, offset=3, limit=10, fields=("ticket_id", sort_key))
+            first = expected.execute(expected.match(status="open"), plan)
+            assert compact.execute(compact.match(status="open"), plan) == first
+            after = QueryPlan(sort_key=sort_key, descending=descending, limit=10, after=first.last_key)
+            assert compact.execute(None, after) == expected.execute(None, after)
+
+
+def test_record_columns_keep_off_format_timestamps_as_strings():
+    records = [
+        {"id": 1, "created_at": "2024-01-01T00:00:00.000000"},  # would not round-trip
+        {"id": 2, "created_at": "2024-01-02T00:00:00.500000"},
+    ]
+    columns = RecordColumns.from_records(records, timestamp_fields=("created_at",))
+    assert list(columns) == records
+    assert columns.sort_keys("created_at") is None
+
+
+def test_compact_dataset_threshold(monkeypatch):
+    from app.config import settings
+    from app.connectors.columnar import compact_dataset
+
+    records = [{"id": i, "status": "open"} for i in range(10)]
+    monkeypatch.setattr(settings, "COMPACT_RECORDS_MIN_ROWS", 10)
+    assert isinstance(compact_dataset(records, primary_key=("id",)).records, RecordColumns)
+    monkeypatch.setattr(settings, "COMPACT_RECORDS_MIN_ROWS", 11)
+    assert compact_dataset(records, primary_key=("id",)).records is records
+
+
+def test_analytics_connector_date_range():
+    connector = AnalyticsConnector()
+    data = connector.fetch(
+        metric="daily_active_users", start_date="2026-02-10", end_date="2026-02-16"
+    )
+
+    assert data
+    assert all("2026-02-10" <= d["date"] <= "2026-02-16" for d in data)
+
+
+def test_iter_json_array_matches_json_load(tmp_path):
+    records = [
+        {"id": i, "name": f"Zoë {i} ☃", "score": 10 ** (i % 12), "tags": ["a", {"b": [1.5]}]}
+        for i in range(200)
+    ]
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps(records, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    # Tiny chunks split elements, multi-byte characters and numbers.
+    for chunk_size in (1, 7, 64, 1 << 20):
+        assert list(iter_json_array(path, chunk_size=chunk_size)) == records
+
+    path.write_text(" [ ] ", encoding="utf-8")
+    assert list(iter_json_array(path)) == []
+
+
+def test_iter_json_array_rejects_malformed_input(tmp_path):
+    path = tmp_path / "bad.json"
+    for text in ("", "{}", "[1, 2", "[1 2]", "[1,]", "[1] 2"):
+        path.write_text(text, encoding="utf-8")
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array(path, chunk_size=2))
+
+
+def test_execute_stream_matches_dataset():
+    records = generate_analytics_metrics("revenue", days=40)
+    dataset = Dataset(records, sort_fields=("date", "value"), primary_key=("metric", "date"))
+    for field in ("date", "value"):
+        for descending in (False, True):
+            plan = QueryPlan(sort_key=field, descending=descending, offset=3, limit=5)
+            expected = dataset.execute(None, plan)
+            result = execute_stream(iter(records), plan, ("metric", "date"))
+            assert (result.rows, result.total, result.has_more, result.last_key) == (
+                expected.rows, expected.total, expected.has_more, expected.last_key,
+            )
+
+            after = QueryPlan(sort_key=field, descending=descending, limit=5, after=expected.last_key)
+            assert execute_stream(iter(records), after, ("metric", "date")).rows == (
+                dataset.execute(None, after).rows
+            )
+
+
+def test_execute_stream_unsorted_stops_once_page_is_full():
+    consumed = []
+
+    def rows():
+        for i in range(1000):
+            consumed.append(i)
+            yield {"id": i}
+
+    result = execute_stream(rows(), QueryPlan(offset=10, limit=5, fields=("id",)))
+    assert [r["id"] for r in result.rows] == [10, 11, 12, 13, 14]
+    assert result.has_more and not result.total_exact
+    assert len(consumed) == 16
+
+
+def test_connectors_stream_large_files(monkeypatch):
+    def plan_for(source):
+        return QueryPlan(
+            sort_key="date" if source.value == "analytics" else "created_at",
+            descending=True,
+            offset=2,
+            limit=6,
+        )
+
+    indexed = {source: connector.execute(plan_for(source)) for source, connector in connector_map.items()}
+    series = AnalyticsConnector().series("daily_active_users")
+
+    monkeypatch.setattr("app.connectors.stream.settings.STREAMING_MIN_FILE_BYTES", 1)
+    for source, connector in connector_map.items():
+        result = connector.execute(plan_for(source))
+        assert (result.rows, result.total) == (indexed[source].rows, indexed[source].total)
+        assert list(connector.iter_rows(plan_for(source))) == result.rows
+
+    streamed = SupportConnector().fetch(status="open", priority="high")
+    assert streamed and all(r["status"] == "open" and r["priority"] == "high" for r in streamed)
+    streamed_series = AnalyticsConnector().series("daily_active_users")
+    assert list(streamed_series.values) == list(series.values)
+
+
+def test_analytics_streaming_reads_the_connector_data_path(tmp_path, monkeypatch):
+    path = tmp_path / "analytics.json"
+    records = generate_analytics_metrics("revenue", days=10)
+    _write_records(path, records)
+
+    class LocalAnalytics(AnalyticsConnector):
+        data_path = path
+
+    monkeypatch.setattr("app.connectors.stream.settings.STREAMING_MIN_FILE_BYTES", 1)
+    connector = LocalAnalytics()
+    assert connector.fetch(metric="revenue") == records
+    by_date = sorted(records, key=lambda r: r["date"])
+    assert list(connector.series("revenue").values) == [r["value"] for r in by_date]
+    assert connector.series("daily_active_users") is None
+
+
+def test_snapshot_round_trip_matches_json(tmp_path):
+    records = generate_analytics_metrics("revenue", days=30) + [
+        {"metric": "signups", "date": "2024-02-01", "value": 1.5, "note": "ünïcode"},
+    ]
+    path = tmp_path / "rows.json"
+    _write_records(path, records)
+    fields = dict(primary_key=("metric", "date"), index_fields=("metric",), sort_fields=("date", "value"))
+
+    compile_snapshot(path, **fields)
+    dataset = load_dataset(path, **fields)
+    expected = Dataset(records, **fields)
+
+    assert list(dataset.records) == records
+    for descending in (False, True):
+        plan = QueryPlan(sort_key="value", descending=descending, offset=2, limit=5)
+        for metric in (None, "revenue", "missing"):
+            row_ids = dataset.match(metric=metric)
+            assert dataset.execute(row_ids, plan) == expected.execute(expected.match(metric=metric), plan)
+
+
+def test_column_backed_records_project_only_requested_fields(tmp_path):
+    records = generate_analytics_metrics("revenue", days=30) + [
+        {"metric": "signups", "date": "2024-02-01", "value": 1.5, "note": "x"},
+    ]
+    path = tmp_path / "rows.json"
+    _write_records(path, records)
+    fields = dict(primary_key=("metric", "date"), index_fields=("metric",), sort_fields=("date", "value"))
+    compile_snapshot(path, **fields)
+    snapshot_dataset = load_dataset(path, **fields)
+    expected = Dataset(records, **fields)
+
+    plan = QueryPlan(sort_key="value", descending=True, limit=5, fields=("note", "value", "missing"))
+    result = snapshot_dataset.execute(None, plan)
+    assert result == expected.execute(None, plan)
+    assert all(set(row) <= {"note", "value"} for row in result.rows)
+    assert snapshot_dataset.execute(None, QueryPlan(sort_key="value", limit=1, fields=("note", "value"))).rows == [
+        {"note": "x", "value": 1.5}
+    ]
+
+    columns = AnalyticsColumns.from_records(records[:-1])
+    build = columns.row_builder(("date",))
+    assert [build(i) for i in range(3)] == [{"date": r["date"]} for r in records[:3]]
+    unsorted = Dataset(columns, **fields).execute(None, QueryPlan(offset=1, limit=2, fields=("value",)))
+    assert unsorted.rows == [{"value": r["value"]} for r in records[1:3]]
+
+
+def test_snapshot_is_ignored_when_stale(tmp_path):
+    path = tmp_path / "rows.json"
+    _write_records(path, [{"id": 1, "name": "a"}])
+    compile_snapshot(path, primary_key=("id",))
+    assert load_dataset(path, primary_key=("id",)) is not None
+
+    # Touched but unchanged: still fresh (content digest matches).
+    os.utime(path, ns=(0, 0))
+    assert load_dataset(path, primary_key=("id",)) is not None
+
+    # Same size, different content.
+    _write_records(path, [{"id": 1, "name": "b"}])
+    assert load_dataset(path, primary_key=("id",)) is None
+    # Built with different keys/indexes than requested.
+    compile_snapshot(path, primary_key=("id",))
+    assert load_dataset(path, primary_key=("id",), sort_fields=("name",)) is None
+
+
+def test_shared_datasets_publish_one_snapshot_for_all_workers(tmp_path, monkeypatch):
+    from app.config import settings
+    from app.connectors import snapshot as snapshot_module
+
+    monkeypatch.setattr(settings, "SHARED_DATASETS", True)
+    path = tmp_path / "rows.json"
+    _write_records(path, [{"id": i, "status": "ab"[i % 2]} for i in range(10)])
+    fields = dict(primary_key=("id",), index_fields=("status",))
+
+    # The first worker publishes the snapshot and serves from it.
+    first = load_dataset(path, **fields)
+    assert snapshot_module.snapshot_path(path).exists()
+    assert list(first.match(status="b")) == [1, 3, 5, 7, 9]
+
+    # Other workers map the published file without compiling.
+    def compile_again(*args, **kwargs):
+        raise AssertionError("snapshot compiled twice")
+
+    monkeypatch.setattr(snapshot_module, "compile_snapshot", compile_again)
+    assert list(load_dataset(path, **fields).match(status="a")) == [0, 2, 4, 6, 8]
+    monkeypatch.undo()
+    monkeypatch.setattr(settings, "SHARED_DATASETS", True)
+
+    # A change publishes a new version; the old mapping stays readable.
+    _write_records(path, [{"id": i, "status": "a"} for i in range(12)])
+    second = load_dataset(path, **fields)
+    assert len(second) == 12 and list(second.match(status="b")) == []
+    assert list(first.match(status="b")) == [1, 3, 5, 7, 9]
+    assert first.records[1] == {"id": 1, "status": "b"}
+
+
+def test_analytics_snapshot_uses_typed_columns(tmp_path):
+    path = tmp_path / "analytics.json"
+    _write_records(path, generate_analytics_metrics("revenue", days=20))
+    compile_snapshot(path, primary_key=("metric", "date"), index_fields=("metric",), sort_fields=("metric", "date", "value"))
+
+    dataset = load_snapshot(path)
+    assert isinstance(dataset.records, AnalyticsColumns)
+    assert list(dataset.records) == json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_snapshot_values_are_read_from_the_mapping(tmp_path, monkeypatch):
+    from app.connectors import snapshot as snap
+
+    path = tmp_path / "analytics.json"
+    records = [{"metric": f"m{i}", "date": "2026-01-01", "value": i} for i in range(50)]
+    _write_records(path, records)
+    compile_snapshot(path, primary_key=("metric", "date"), index_fields=("metric",), sort_fields=("metric", "date", "value"))
+
+    monkeypatch.setattr(snap, "DECODED_VALUES_CACHE_SIZE", 8)
+    columns = load_snapshot(path).records
+    # Numeric columns stay views of the mapping rather than per-process copies.
+    assert isinstance(columns.values, memoryview) or columns.values.base is not None
+    names = snap.open_snapshot(path, ("metric", "date"), ("metric",), ("metric", "date", "value")).column("metric")[1]
+    assert [names[i] for i in range(len(names))] == [r["metric"] for r in records]
+    assert names[-1] == "m49" and names[2:4] == ["m2", "m3"]
+    assert names._decode.cache_info().currsize <= 8
+
+
+def test_dataset_with_changes_matches_rebuild():
+    rng = random.Random(7)
+    records = [
+        {"id": i, "status": rng.choice(["open", "closed"]), "score": rng.randint(1, 20)}
+        for i in range(1, 201)
+    ]
+    fields = dict(index_fields=("status",), sort_fields=("score", "id"), primary_key=("id",))
+    dataset = Dataset(records, **fields)
+    before = dataset.execute(dataset.match(status="open"), QueryPlan(sort_key="score", limit=20))
+
+    changed = [dict(r) for r in records if r["id"] % 7]  # deletes
+    for record in changed[::5]:  # updates
+        record["score"] = rng.randint(1, 20)
+        record["status"] = "pending"
+    changed += [{"id": 1000 + i, "status": "open", "score": i % 20 + 1} for i in range(15)]  # inserts
+
+    patched = dataset.with_changes(changed)
+    rebuilt = Dataset(changed, **fields)
+    assert patched is not None and len(patched) == len(rebuilt)
+    for status in (None, "open", "pending"):
+        for field in ("score", "id"):
+            for descending in (False, True):
+                plan = QueryPlan(sort_key=field, descending=descending, offset=3, limit=30)
+                assert patched.execute(patched.match(status=status), plan) == (
+                    rebuilt.execute(rebuilt.match(status=status), plan)
+                )
+
+    # The original is untouched (readers may still hold it).
+    assert dataset.execute(dataset.match(status="open"), QueryPlan(sort_key="score", limit=20)) == before
+    assert dataset.with_changes(records) is dataset
+    assert dataset.with_changes(records[:10]) is None  # mostly deleted: rebuild instead
+
+
+def test_dataset_cache_refresh_pins_and_swaps(tmp_path):
+    path = tmp_path / "rows.json"
+    records = [{"id": i, "status": "a"} for i in range(20)]
+    _write_records(path, records)
+    cache = DatasetCache(max_bytes=10**9)
+    build = lambda rows: Dataset(rows, index_fields=("status",), primary_key=("id",))  # noqa: E731
+
+    assert cache.refresh(path, build=build, update=Dataset.with_changes)
+    first = cache.get(path, build=build)
+    assert not cache.refresh(path, build=build, update=Dataset.with_changes)
+
+    records[3] = {"id": 3, "status": "b"}
+    _write_records(path, records)
+    os.utime(path, ns=(1, 1))
+    # Pinned: served as-is until the watcher refreshes, without touching the file.
+    assert cache.get(path, build=build) is first
+    assert cache.refresh(path, build=build, update=Dataset.with_changes)
+    second = cache.get(path, build=build)
+    assert second is not first and second.match(status="b") == [3]
+    assert first.match(status="b") == []
+    assert cache.stats()["pinned"] == 1
+    assert cache.stats()["pinned_hits"] == 3 and cache.stats()["hits"] == 0
+
+
+def test_dataset_cache_budget_covers_pinned_entries(tmp_path, caplog):
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.json"
+        _write_records(path, [{"id": i, "name": name} for i in range(20)])
+        paths.append(path)
+    one_entry = estimate_size(load_json_records(paths[0]))
+    cache = DatasetCache(max_bytes=one_entry * 2)
+
+    assert cache.refresh(paths[0]) and cache.refresh(paths[1])
+    assert cache.stats()["bytes"] == one_entry * 2
+    with caplog.at_level("WARNING", logger="app.connectors.cache"):
+        assert cache.refresh(paths[2])
+    assert "releasing them to on-demand caching" in caplog.text
+
+    stats = cache.stats()
+    assert stats["pinned"] == 2 and stats["evictions"] == 1
+    assert stats["bytes"] <= cache.max_bytes
+    # The released path is served on demand and no longer re-pinned.
+    assert not cache.refresh(paths[0])
+    assert cache.get(paths[0]) == load_json_records(paths[0])
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_data_watcher_poll_reports_changes_and_survives_errors(tmp_path):
+    class FileConnector(BaseConnector):
+        def __init__(self, path, fail=False):
+            self.data_path = path
+            self.fail = fail
+            self.cache = DatasetCache(max_bytes=10**9)
+
+        def fetch(self, **filters):
+            return list(self.cache.get(self.data_path))
+
+        def refresh(self):
+            if self.fail:
+                raise ValueError("half-written file")
+            return self.cache.refresh(self.data_path)
+
+    path = tmp_path / "rows.json"
+    _write_records(path, [{"id": 1}])
+    good, bad = FileConnector(path), FileConnector(path, fail=True)
+    watcher = DataWatcher([good, bad])
+
+    assert watcher.poll() == [good]
+    assert watcher.poll() == []
+    _write_records(path, [{"id": 1}, {"id": 2}])
+    assert watcher.poll() == [good]
+    assert good.fetch() == [{"id": 1}, {"id": 2}]
+
+
+def test_refresh_does_not_pin_streaming_files(monkeypatch):
+    from app.connectors.cache import dataset_cache
+
+    connector = CRMConnector()
+    connector.refresh()
+    assert dataset_cache.stats()["pinned"] >= 1
+    pinned = dataset_cache.stats()["pinned"]
+
+    monkeypatch.setattr("app.connectors.stream.settings.STREAMING_MIN_FILE_BYTES", 1)
+    monkeypatch.setattr("app.connectors.cache.load_json_records", lambda path: pytest.fail("file was loaded"))
+    assert connector.refresh() is False
+    assert DataWatcher([connector]).poll() == []
+    assert dataset_cache.stats()["pinned"] == pinned - 1
+    assert connector.execute(QueryPlan(limit=1)).rows
+
+
+def test_sqlite_connector_matches_json_connectors(tmp_path, monkeypatch):
+    from app.config import settings
+    from app.connectors import sqlite_connector as sql
+
+    monkeypatch.setattr(settings, "SQLITE_PATH", str(tmp_path / "udc.sqlite3"))
+    for table in sql.TABLES.values():
+        assert sql.import_json(table) == len(load_json_records(table.json_path))
+
+    pairs = [
+        (CRMConnector(), sql.SQLiteConnector(sql.CRM_TABLE), {"status": "active"}),
+        (SupportConnector(), sql.SQLiteConnector(sql.SUPPORT_TABLE), {"status": "open", "priority": "high"}),
+        (AnalyticsConnector(), sql.SQLiteAnalyticsConnector(), {"metric": "daily_active_users", "start_date": "2026-02-01"}),
+    ]
+    for json_connector, sqlite_connector, filters in pairs:
+        for sort_key in (*sqlite_connector.table.sort_fields, None):
+            for descending in (False, True):
+                for plan_filters in ({}, filters):
+                    plan = QueryPlan(filters=plan_filters, sort_key=sort_key, descending=descending, offset=2, limit=7)
+                    expected = json_connector.execute(plan)
+                    assert sqlite_connector.execute(plan) == expected
+                    assert list(sqlite_connector.iter_rows(plan)) == list(json_connector.iter_rows(plan))
+                    if expected.last_key is not None:
+                        after = QueryPlan(
+                            filters=plan_filters,
+                            sort_key=sort_key,
+                            descending=descending,
+                            limit=5,
+                            after=expected.last_key,
+                            fields=(sort_key,),
+                        )
+                        assert sqlite_connector.execute(after) == json_connector.execute(after)
+
+    expected_series = AnalyticsConnector().series("daily_active_users")
+    series = sql.SQLiteAnalyticsConnector().series("daily_active_users")
+    assert list(series.dates) == list(expected_series.dates)
+    assert list(series.values) == list(expected_series.values)
+    assert sql.SQLiteConnector(sql.CRM_TABLE).data_version() is not None
+
+
+def test_sqlite_reimport_is_atomic_for_readers(tmp_path, monkeypatch):
+    import sqlite3
+    import threading
+    import time
+
+    from app.connectors import sqlite_connector as sql
+
+    db_path = tmp_path / "udc.sqlite3"
+    table = sql.CRM_TABLE
+    expected = sql.import_json(table, db_path=db_path)
+    counts = []
+    done = threading.Event()
+
+    def slow_rows(path):
+        time.sleep(0.05)  # hold the import open between CREATE and the inserts
+        yield from iter_json_array(path)
+
+    monkeypatch.setattr(sql, "iter_json_array", slow_rows)
+
+    def read():
+        conn = sql.connect(db_path)
+        try:
+            while not done.is_set():
+                try:
+                    counts.append(conn.execute(f"SELECT COUNT(*) FROM {table.name}").fetchone()[0])
+                except sqlite3.OperationalError as exc:  # e.g. "no such table"
+                    counts.append(str(exc))
+        finally:
+            conn.close()
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for _ in range(5):
+            assert sql.import_json(table, db_path=db_path) == expected
+    finally:
+        done.set()
+        reader.join()
+    assert counts and set(counts) == {expected}